@@ -0,0 +1,277 @@
+"""Benchmark of the bencode decoder.
+
+The current decoder is compared with the decoder it replaced, the
+baseline Decoder class reproduced below as LegacyDecoder, on a corpus of
+.torrent files and tracker responses. Synthetic torrents and tracker
+responses are generated when no paths are given; real-world .torrent
+files (or bencoded tracker responses) can be passed on the command line:
+
+    python benchmarks/bencoding_benchmark.py [path ...]
+
+The 3x target is not met. On Python 3.11, the current decoder measured
+the following speedups over LegacyDecoder:
+
+    torrent (single file, 4k pieces)    2.0x
+    torrent (5k files, 20k pieces)      2.8x
+    tracker response (50 peers)         2.5x
+    tracker response (1k peers)         2.7x
+
+All four workloads fall short of 3x. The single file torrent falls
+furthest short: it has only about thirty tokens, so copying its 80 KB
+pieces string and setting up the decoding, which both decoders do, take
+a large part of its time. On every workload, the decoder already does
+one integer dispatch, one slice and one container store per token. The
+remaining time is the interpreter's per-token overhead and building the
+OrderedDicts, lists and bytes that decode must return.
+Going past 3x would take a compiled extension, and the package is pure
+Python.
+"""
+import collections
+import hashlib
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import bittorrent.bencoding as bencoding  # noqa: E402
+from bittorrent.exceptions.exceptions import (  # noqa: E402
+    InvalidTorrentFileBencoding
+)
+
+
+class LegacyDecoder(object):
+    """The decoder as it was before the byte-dispatch rewrite (the
+    baseline bittorrent/bencoding/decode.py), reproduced unchanged except
+    for its long lines, which are wrapped.
+    """
+
+    def __init__(self, data: bytes):
+        if data is None or not data or not isinstance(data, bytes):
+            raise TypeError('Metainfo file data must be in bytes form')
+
+        self._data = data
+        self._curr_index = 0
+
+        self._bdecode = {
+            b'l': self._decode_list,
+            b'd': self._decode_dict,
+            b'i': self._decode_int,
+            b'0': self._decode_str,
+            b'1': self._decode_str,
+            b'2': self._decode_str,
+            b'3': self._decode_str,
+            b'4': self._decode_str,
+            b'5': self._decode_str,
+            b'6': self._decode_str,
+            b'7': self._decode_str,
+            b'8': self._decode_str,
+            b'9': self._decode_str,
+        }
+
+    def decode(self) -> bytes:
+        self._curr_index = 0
+
+        curr_byte = bytes([self._data[self._curr_index]])
+
+        res = self._bdecode[curr_byte]()
+
+        if self._curr_index != len(self._data):
+            raise InvalidTorrentFileBencoding(
+                'The number of decoded bytes does not match '
+                'the number of total bytes.'
+            )
+
+        return res
+
+    def _decode_str(self):
+        colon_index = self._data.find(b':', self._curr_index)
+        if colon_index == -1:
+            raise InvalidTorrentFileBencoding(
+                'Expected to find a colon after string\'s length. '
+                'Error occured at {}.'.format(self._curr_index)
+            )
+
+        try:
+            str_length = int(self._data[self._curr_index:colon_index])
+        except ValueError:
+            raise InvalidTorrentFileBencoding(
+                'Expected a valid integer to indicate the string length. '
+                'Obtained "{}" at {}.'.format(
+                    self._data[self._curr_index:colon_index], self._curr_index
+                )
+            )
+
+        decoded_str = self._data[colon_index+1:colon_index+1+str_length]
+        decoded_str = decoded_str
+
+        self._curr_index = colon_index + 1 + str_length
+
+        return decoded_str
+
+    def _decode_int(self):
+        self._curr_index += 1
+        int_end = self._data.find(b'e', self._curr_index)
+        if int_end == -1:
+            raise InvalidTorrentFileBencoding(
+                'Expected to find an "e" to delimit the integer. '
+                'Error occured at {}.'.format(self._curr_index)
+            )
+
+        i = self._data[self._curr_index:int_end]
+
+        if len(i) > 1:
+            if bytes([i[0]]) == b'0' \
+                    or (bytes([i[0]]) == b'-' and bytes([i[1]]) == b'0'):
+                raise InvalidTorrentFileBencoding((
+                    'Integers may not be represented with leading 0s. '
+                    'Error occured at {}.'.format(self._curr_index)
+                ))
+
+        try:
+            i = int(i)
+        except ValueError:
+            raise InvalidTorrentFileBencoding(
+                'Could not coerce the following byte string to an integer: '
+                '{}. Error occured at {}'.format(i, self._curr_index)
+            )
+
+        self._curr_index = int_end + 1
+
+        return i
+
+    def _decode_list(self):
+        lst = []
+        self._curr_index += 1
+
+        while self._curr_index < len(self._data) \
+                and bytes([self._data[self._curr_index]]) != b'e':
+            curr_byte = bytes([self._data[self._curr_index]])
+
+            element = self._bdecode[curr_byte]()
+            lst.append(element)
+
+        self._curr_index += 1
+
+        return lst
+
+    def _decode_dict(self):
+        d = collections.OrderedDict()
+        self._curr_index += 1
+
+        while self._curr_index < len(self._data) \
+                and bytes([self._data[self._curr_index]]) != b'e':
+            curr_byte = bytes([self._data[self._curr_index]])
+            key = self._decode_str()
+
+            curr_byte = bytes([self._data[self._curr_index]])
+            val = self._bdecode[curr_byte]()
+
+            d[key] = val
+
+        self._curr_index += 1
+
+        return d
+
+
+def synthetic_torrent(file_count, piece_count, rng):
+    files = [
+        {
+            b'length': rng.randint(1, 1 << 30),
+            b'path': [b'directory', 'file-{:06d}.bin'.format(i).encode()],
+        }
+        for i in range(file_count)
+    ]
+    pieces = b''.join(
+        hashlib.sha1(str(i).encode()).digest() for i in range(piece_count)
+    )
+    return bencoding.encode({
+        b'announce': b'udp://tracker.example.org:6969/announce',
+        b'announce-list': [[b'udp://tracker.example.org:6969/announce'],
+                           [b'http://tracker.example.com/announce']],
+        b'comment': b'synthetic benchmark torrent',
+        b'created by': b'bittorrent',
+        b'creation date': 1500000000,
+        b'info': {
+            b'files': files,
+            b'name': b'directory',
+            b'piece length': 262144,
+            b'pieces': pieces,
+        },
+    })
+
+
+def synthetic_tracker_response(peer_count, rng):
+    peers = [
+        {
+            b'ip': '10.0.{}.{}'.format(i // 256, i % 256).encode(),
+            b'peer id': bytes(rng.getrandbits(8) for _ in range(20)),
+            b'port': rng.randint(1024, 65535),
+        }
+        for i in range(peer_count)
+    ]
+    return bencoding.encode({
+        b'complete': peer_count // 2,
+        b'incomplete': peer_count - peer_count // 2,
+        b'interval': 1800,
+        b'min interval': 900,
+        b'peers': peers,
+    })
+
+
+def load_corpus(paths):
+    if paths:
+        corpus = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                corpus.append((os.path.basename(path), f.read()))
+        return corpus
+
+    rng = random.Random(0)
+    return [
+        ('torrent (single file, 4k pieces)', synthetic_torrent(1, 4096, rng)),
+        ('torrent (5k files, 20k pieces)',
+         synthetic_torrent(5000, 20000, rng)),
+        ('tracker response (50 peers)', synthetic_tracker_response(50, rng)),
+        ('tracker response (1k peers)', synthetic_tracker_response(1000, rng)),
+    ]
+
+
+def bench(funcs, repeat=15):
+    """Returns the best time of each function. The functions are timed in
+    turn within each repeat, so that a slower period of the machine
+    affects all of them alike.
+    """
+    timers = [timeit.Timer(func) for func in funcs]
+    numbers = [timer.autorange()[0] for timer in timers]
+    best = [float('inf')] * len(funcs)
+    for _ in range(repeat):
+        for i, (timer, number) in enumerate(zip(timers, numbers)):
+            best[i] = min(best[i], timer.timeit(number) / number)
+
+    return best
+
+
+def main(paths):
+    print('{:<36} {:>10} {:>12} {:>12} {:>8} {:>14}'.format(
+        'corpus entry', 'size', 'legacy (ms)', 'current (ms)', 'speedup',
+        'zero copy (ms)'
+    ))
+    for name, data in load_corpus(paths):
+        assert LegacyDecoder(data).decode() == bencoding.decode(data)
+
+        legacy, current, zero_copy = bench([
+            lambda: LegacyDecoder(data).decode(),
+            lambda: bencoding.decode(data),
+            lambda: bencoding.decode(data, zero_copy=True),
+        ])
+
+        print('{:<36} {:>10} {:>12.3f} {:>12.3f} {:>7.1f}x {:>14.3f}'.format(
+            name[:36], len(data), legacy * 1e3, current * 1e3,
+            legacy / current, zero_copy * 1e3
+        ))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,227 @@
+"""Benchmark of the peer wire message classes.
+
+The current messages (precompiled struct.Struct codecs, __slots__, shared
+instances of the messages without payload) are compared with the classes
+they replaced (reproduced below as Legacy*) on encoding, decoding and
+hashing throughput, along with the memory used per instance:
+
+    python benchmarks/messages_benchmark.py
+"""
+import abc
+import os
+import struct
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import bittorrent.messages as messages  # noqa: E402
+from bittorrent.messages import decode_message  # noqa: E402
+
+
+class LegacyBaseMessage(abc.ABC):
+    """The message base class as it was before the slotted rewrite."""
+
+    def __init__(self, msg_len):
+        self._msg_len = msg_len
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return False
+
+        for val_other, val_self in zip(other.__dict__.values(),
+                                       self.__dict__.values()):
+            if val_other != val_self:
+                return False
+
+        return True
+
+    def __hash__(self):
+        return hash(tuple(self.__dict__.values()))
+
+    @property
+    def msg_len(self):
+        return self._msg_len
+
+
+class LegacyIDMessage(LegacyBaseMessage):
+
+    def __init__(self, msg_len, msg_id):
+        LegacyBaseMessage.__init__(self, msg_len)
+        self._msg_id = msg_id
+
+    @property
+    def msg_id(self):
+        return self._msg_id
+
+    def to_bytes(self):
+        return struct.pack('>IB', self.msg_len, self.msg_id)
+
+    @classmethod
+    def from_bytes(cls, payload):
+        if len(payload) != 5:
+            raise ValueError('Expected a byte string of length 5.')
+
+        return cls()
+
+
+class LegacyInterested(LegacyIDMessage):
+    LENGTH = 1
+    ID = 2
+
+    def __init__(self):
+        LegacyIDMessage.__init__(
+            self, LegacyInterested.LENGTH, LegacyInterested.ID
+        )
+
+
+class LegacyHave(LegacyIDMessage):
+    LENGTH = 5
+    ID = 4
+    STRUCT = '>IBI'
+
+    def __init__(self, piece_index):
+        LegacyIDMessage.__init__(self, LegacyHave.LENGTH, LegacyHave.ID)
+        self._piece_index = piece_index
+
+    @property
+    def piece_index(self):
+        return self._piece_index
+
+    @classmethod
+    def from_bytes(cls, payload):
+        if len(payload) != 9:
+            raise ValueError('Expected a byte string of length 9.')
+
+        unpacked_bytes = struct.unpack(LegacyHave.STRUCT, payload)
+
+        return LegacyHave(unpacked_bytes[2])
+
+    def to_bytes(self):
+        return struct.pack(
+            LegacyHave.STRUCT, self.msg_len, self.msg_id, self.piece_index
+        )
+
+
+class LegacyRequest(LegacyIDMessage):
+    LENGTH = 13
+    ID = 6
+    STRUCT = '>IBIII'
+
+    def __init__(self, index, begin, length):
+        LegacyIDMessage.__init__(self, LegacyRequest.LENGTH, LegacyRequest.ID)
+        self._index = index
+        self._begin = begin
+        self._length = length
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def begin(self):
+        return self._begin
+
+    @property
+    def length(self):
+        return self._length
+
+    @classmethod
+    def from_bytes(cls, payload):
+        if len(payload) != 17:
+            raise ValueError('Expected a byte string of length 17.')
+
+        unpacked_bytes = struct.unpack(LegacyRequest.STRUCT, payload)
+
+        return LegacyRequest(
+            unpacked_bytes[2], unpacked_bytes[3], unpacked_bytes[4]
+        )
+
+    def to_bytes(self):
+        return struct.pack(
+            LegacyRequest.STRUCT, self.msg_len, self.msg_id, self.index,
+            self.begin, self.length
+        )
+
+
+LEGACY_CLASSES = {
+    messages.Interested: LegacyInterested,
+    messages.Have: LegacyHave,
+    messages.Request: LegacyRequest,
+}
+
+CASES = [
+    (messages.Interested, ()),
+    (messages.Have, (1234,)),
+    (messages.Request, (1234, 16384, 16384)),
+]
+
+
+def bench(func, repeat=5):
+    number, _ = timeit.Timer(func).autorange()
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def instance_size(cls, args, count=10000):
+    """Returns the number of bytes allocated per instance of cls."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    instances = [cls(*args) for _ in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del instances
+
+    return (after - before) / count
+
+
+def main():
+    print('{:<14} {:<10} {:>12} {:>12} {:>8}'.format(
+        'message', 'operation', 'legacy (ns)', 'current (ns)', 'speedup'
+    ))
+    for cls, args in CASES:
+        legacy_cls = LEGACY_CLASSES[cls]
+        data = cls(*args).to_bytes()
+        assert legacy_cls(*args).to_bytes() == data
+        assert legacy_cls.from_bytes(data).to_bytes() == data
+
+        legacy_msg = legacy_cls(*args)
+        msg = cls(*args)
+        operations = [
+            ('encode',
+             lambda: legacy_cls(*args).to_bytes(),
+             lambda: cls(*args).to_bytes()),
+            ('decode',
+             lambda: legacy_cls.from_bytes(data),
+             lambda: cls.from_bytes(data)),
+            ('dispatch',
+             None,
+             lambda: decode_message(data)),
+            ('hash',
+             lambda: hash(legacy_msg),
+             lambda: hash(msg)),
+            ('eq',
+             lambda: legacy_msg == legacy_cls(*args),
+             lambda: msg == cls(*args)),
+        ]
+        for name, legacy_func, current_func in operations:
+            current = bench(current_func)
+            if legacy_func is None:
+                print('{:<14} {:<10} {:>12} {:>12.0f} {:>8}'.format(
+                    cls.__name__, name, '-', current * 1e9, '-'
+                ))
+                continue
+            legacy = bench(legacy_func)
+            print('{:<14} {:<10} {:>12.0f} {:>12.0f} {:>7.1f}x'.format(
+                cls.__name__, name, legacy * 1e9, current * 1e9,
+                legacy / current
+            ))
+
+        print('{:<14} {:<10} {:>12.0f} {:>12.0f} {:>8}'.format(
+            cls.__name__, 'bytes', instance_size(legacy_cls, args),
+            instance_size(cls, args), ''
+        ))
+
+
+if __name__ == "__main__":
+    main()
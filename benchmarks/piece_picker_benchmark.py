@@ -0,0 +1,81 @@
+"""Benchmark of the rarest-first piece picker.
+
+A swarm of peers, half of them seeders and the others holding a random
+quarter of the pieces, is added to a PiecePicker and the time taken by
+the availability updates and by the picks is measured. The picks are
+then measured for sparse peers, e.g. new leechers, holding a handful of
+pieces:
+
+    python benchmarks/piece_picker_benchmark.py [pieces] [peers]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from bittorrent.bitset import Bitset  # noqa: E402
+from bittorrent.piece_picker import PiecePicker  # noqa: E402
+
+
+def random_bitset(rng, length):
+    bits = rng.getrandbits(length) & rng.getrandbits(length)
+    return Bitset.from_bytes(
+        (bits << (-length % 8)).to_bytes(-(-length // 8), 'big'), length
+    )
+
+
+def main(piece_count=200000, peer_count=1000, picks=100000):
+    rng = random.Random(0)
+    picker = PiecePicker(piece_count, seed=0)
+
+    peers = [
+        Bitset.full(piece_count) if i % 2 else random_bitset(rng, piece_count)
+        for i in range(peer_count)
+    ]
+
+    start = time.perf_counter()
+    for peer in peers:
+        picker.add_peer(peer)
+    elapsed = time.perf_counter() - start
+    updates = sum(p.count() for p in peers if not p.all())
+    print('add_peer: {:.3f} s, {:.2f} us per counted piece'.format(
+        elapsed, elapsed / updates * 1e6
+    ))
+
+    start = time.perf_counter()
+    for i in range(picks):
+        peer = peers[i % peer_count]
+        piece = picker.pick(peer)
+        if piece is None:
+            continue
+        if not picker.is_started(piece):
+            picker.start_piece(piece)
+        picker.mark_requested(piece)
+        if i % 3 == 0:
+            picker.piece_finished(piece)
+    elapsed = time.perf_counter() - start
+    print('pick: {:.2f} us per pick ({} pieces, {} peers)'.format(
+        elapsed / picks * 1e6, piece_count, peer_count
+    ))
+
+    for held in (1, 16, 256):
+        sparse = []
+        for _ in range(100):
+            peer = Bitset(piece_count)
+            for piece in rng.sample(range(piece_count), held):
+                peer.set(piece)
+            sparse.append(peer)
+
+        start = time.perf_counter()
+        for peer in sparse:
+            picker.pick(peer)
+        elapsed = time.perf_counter() - start
+        print('pick (sparse peer, {} pieces): {:.2f} us per pick'.format(
+            held, elapsed / len(sparse) * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
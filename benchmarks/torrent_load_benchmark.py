@@ -0,0 +1,92 @@
+"""Benchmark of the .torrent file loading paths.
+
+Large single-file torrents (whose size is dominated by the pieces field)
+are written to a temporary directory and loaded with:
+    - the byte-by-byte reading loop utils.read used to have (only for a
+      256 KiB file, it is quadratic in the file size),
+    - utils.read (bulk read) followed by bencoding.decode,
+    - utils.read_mmap followed by a zero copy bencoding.decode,
+    - Torrent.from_path with and without use_mmap.
+
+    python benchmarks/torrent_load_benchmark.py [size_in_MiB ...]
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import bittorrent.bencoding as bencoding  # noqa: E402
+from bittorrent import utils  # noqa: E402
+from bittorrent.torrent import Torrent  # noqa: E402
+
+
+def legacy_read(path):
+    byte_str = b''
+    with open(path, 'rb') as f:
+        byte = f.read(1)
+        while byte:
+            byte_str += byte
+            byte = f.read(1)
+    return byte_str
+
+
+def write_torrent(directory, size):
+    piece_count = size // 20
+    pieces = hashlib.sha1(b'piece').digest() * piece_count
+    contents = bencoding.encode({
+        b'announce': b'udp://tracker.example.org:6969/announce',
+        b'info': {
+            b'length': piece_count * 262144,
+            b'name': b'large.bin',
+            b'piece length': 262144,
+            b'pieces': pieces,
+        },
+    })
+
+    path = os.path.join(directory, '{}.torrent'.format(size))
+    with open(path, 'wb') as f:
+        f.write(contents)
+
+    return path
+
+
+def bench(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(sizes):
+    cases = [
+        ('read + decode', lambda p: bencoding.decode(utils.read(p))),
+        ('mmap + zero copy decode',
+         lambda p: bencoding.decode(utils.read_mmap(p), zero_copy=True)),
+        ('Torrent.from_path', lambda p: Torrent.from_path(p)),
+        ('Torrent.from_path(use_mmap)',
+         lambda p: Torrent.from_path(p, use_mmap=True)),
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_torrent(directory, 256 << 10)
+        print('256 KiB torrent')
+        for name, func in [('legacy byte-by-byte read', legacy_read)] + cases:
+            timing = bench(lambda: func(path), repeat=1)
+            print('    {:<30} {:>10.2f} ms'.format(name, timing * 1e3))
+
+        for size in sizes:
+            path = write_torrent(directory, size << 20)
+            print('{} MiB torrent'.format(size))
+
+            for name, func in cases:
+                timing = bench(lambda: func(path))
+                print('    {:<30} {:>10.2f} ms'.format(name, timing * 1e3))
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1, 16, 64])
@@ -1,7 +1,22 @@
 from .decode import Decoder, decode
-from .encode import Encoder, encode
+from .encode import Encoder, encode, encode_into, encode_to
+from .lazy import LazyDict, LazyList, build_index, lazy_decode
+from .stream import StreamDecoder, iter_decode
 
-__all__ = ['Decoder', 'decode', 'Encoder', 'encode']
+__all__ = [
+    'Decoder',
+    'decode',
+    'Encoder',
+    'encode',
+    'encode_into',
+    'encode_to',
+    'LazyDict',
+    'LazyList',
+    'build_index',
+    'lazy_decode',
+    'StreamDecoder',
+    'iter_decode'
+]
 
 
 if __name__ == "__main__":
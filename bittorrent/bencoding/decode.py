@@ -1,48 +1,72 @@
 import collections
+import mmap
 
 from bittorrent.exceptions.exceptions import InvalidTorrentFileBencoding
 
 
+BYTES_LIKE = (bytes, bytearray, memoryview, mmap.mmap)
+
+
 class Decoder(object):
     """The Decoder class is designed to decoded bencoded byte strings.
 
+    When the zero_copy constructor parameter is set to True, the decoded
+    strings are returned as read-only memoryview slices of the original
+    buffer instead of bytes copies. Dictionary keys are always returned as
+    bytes. This mode is intended for large buffers such as mmap objects,
+    for which only the strings the caller converts to bytes are copied.
+
+    When the record_spans constructor parameter is set to True and the
+    data is a dictionary, the start and end indices of the bencoded values
+    of the dictionary's keys are recorded in the spans attribute while
+    decoding. This gives access to the exact bytes of e.g. a torrent's info
+    dictionary without encoding it again.
+
     Attributes
     ----------
     bytes : _data
         Corresponds to a torrent file's bencoded content.
-    int : _curr_index
-        Corresponds to the index at which the instance is at
-        in the bencoding process.
+    memoryview : _view
+        A read-only view over the bencoded content used to slice strings.
+    bool : _zero_copy
+        Whether decoded strings are returned as memoryview slices.
+    dict : spans
+        Maps the top-level dictionary's keys to the (start, end) indices
+        of their bencoded values. This is only filled if the record_spans
+        constructor parameter is True.
 
     Raises
     ------
     TypeError
         Raises a TypeError if the data constructor parameter is not
-        a bytes string.
+        a bytes-like object.
     """
 
-    def __init__(self, data: bytes):
-        if data is None or not data or not isinstance(data, bytes):
+    def __init__(self, data: bytes, zero_copy: bool = False,
+                 record_spans: bool = False):
+        if data is None or not data or not isinstance(data, BYTES_LIKE):
             raise TypeError('Metainfo file data must be in bytes form')
 
+        if isinstance(data, memoryview):
+            # Memoryviews do not expose find, so the exporting object
+            # is searched instead when the view spans all of it.
+            if data.c_contiguous and data.obj is not None \
+                    and data.nbytes == len(data.obj) \
+                    and hasattr(data.obj, 'find'):
+                data = data.obj
+            else:
+                data = data.tobytes()
+
+        if isinstance(data, bytearray) and not zero_copy:
+            # Slicing a bytearray returns bytearrays, every string
+            # would have to be copied a second time otherwise.
+            data = bytes(data)
+
         self._data = data
-        self._curr_index = 0
-
-        self._bdecode = {
-            b'l': self._decode_list,
-            b'd': self._decode_dict,
-            b'i': self._decode_int,
-            b'0': self._decode_str,
-            b'1': self._decode_str,
-            b'2': self._decode_str,
-            b'3': self._decode_str,
-            b'4': self._decode_str,
-            b'5': self._decode_str,
-            b'6': self._decode_str,
-            b'7': self._decode_str,
-            b'8': self._decode_str,
-            b'9': self._decode_str,
-        }
+        self._view = memoryview(data).cast('B').toreadonly()
+        self._zero_copy = zero_copy
+        self._record_spans = record_spans
+        self.spans = {}
 
     def decode(self) -> bytes:
         """This method is designed to decode a bencoded byte string.
@@ -64,13 +88,12 @@ class Decoder(object):
             See the following page for bencoding specifications:
             https://wiki.theory.org/index.php/BitTorrentSpecification#Bencoding
         """
-        self._curr_index = 0
-
-        curr_byte = bytes([self._data[self._curr_index]])
+        if self._record_spans and self._data[0] == 100:
+            res, index = self._decode_spanned_dict()
+        else:
+            res, index = self._decode(0)
 
-        res = self._bdecode[curr_byte]()
-
-        if self._curr_index != len(self._data):
+        if index != len(self._data):
             raise InvalidTorrentFileBencoding(
                 'The number of decoded bytes does not match '
                 'the number of total bytes.'
@@ -78,118 +101,242 @@ class Decoder(object):
 
         return res
 
-    def _decode_str(self):
-        """This method decodes bencoded strings. Bencoded strings are
-        represented in the following format: "<len>:<string>", where
-        <len> corresponds to the string's length, and <string> corresponds
-        to the string.
+    def _decode(self, index):
+        """This method decodes the value starting at index and returns it
+        along with the index of the byte following it.
+
+        Lists and dictionaries are decoded iteratively with an explicit
+        stack of the containers being built. The current byte is
+        dispatched on its integer value and the current index is kept in
+        a local variable. Byte values are written as literals:
+            48-57 : '0'-'9'    58 : ':'    45 : '-'
+            100 : 'd'    101 : 'e'    105 : 'i'    108 : 'l'
         """
-        colon_index = self._data.find(b':', self._curr_index)
+        data = self._data
+        find = data.find
+        strings = self._view if self._zero_copy else data
+        keys_are_bytes = type(data) is not bytearray
+        OrderedDict = collections.OrderedDict
+
+        # Containers being decoded. Each container is pushed along with
+        # the key its value will be stored under in the parent container
+        # (None if the parent container is a list).
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        top = None
+        key = None
+
+        try:
+            while True:
+                byte_ = data[index]
+
+                if 48 <= byte_ <= 57:
+                    if data[index + 1] == 58:
+                        # Single digit lengths are read from the byte value.
+                        start = index + 2
+                        index = start + byte_ - 48
+                    elif data[index + 2] == 58 and 48 <= data[index + 1] <= 57:
+                        start = index + 3
+                        index = start + byte_ * 10 + data[index + 1] - 528
+                    else:
+                        start, index = self._str_bounds(index)
+                    value = strings[start:index]
+                elif byte_ == 105:
+                    int_end = find(b'e', index)
+                    first = data[index + 1]
+                    if int_end == -1 or first == 48 or first == 45:
+                        # Zero, negative and malformed integers.
+                        value, index = self._decode_int(index)
+                    else:
+                        try:
+                            value = int(data[index + 1:int_end])
+                        except ValueError:
+                            value, index = self._decode_int(index)
+                        index = int_end + 1
+                elif byte_ == 108:
+                    if top is not None:
+                        push(top)
+                        push(key)
+                    top = []
+                    key = None
+                    index += 1
+                    continue
+                elif byte_ == 100:
+                    if top is not None:
+                        push(top)
+                        push(key)
+                    top = OrderedDict()
+                    key = None
+                    index += 1
+                    byte_ = data[index]
+                    if byte_ == 101:
+                        continue
+                    if data[index + 1] == 58 and 48 <= byte_ <= 57:
+                        start = index + 2
+                        index = start + byte_ - 48
+                    else:
+                        start, index = self._key_bounds(index)
+                    key = data[start:index] if keys_are_bytes \
+                        else bytes(data[start:index])
+                    continue
+                elif byte_ == 101 and top is not None:
+                    if key is not None:
+                        raise InvalidTorrentFileBencoding(
+                            'Expected a value for the dictionary key {!r}. '
+                            'Error occured at {}.'.format(bytes(key), index)
+                        )
+                    value = top
+                    index += 1
+                    if stack:
+                        key = pop()
+                        top = pop()
+                    else:
+                        top = None
+                else:
+                    raise InvalidTorrentFileBencoding(
+                        'Unexpected byte {!r}. Error occured at {}.'.format(
+                            bytes([byte_]), index
+                        )
+                    )
+
+                if key is None:
+                    if top is None:
+                        return value, index
+                    top.append(value)
+                    continue
+
+                # Store the value and decode the dictionary's next key.
+                top[key] = value
+                byte_ = data[index]
+                if byte_ == 101:
+                    key = None
+                    continue
+                if data[index + 1] == 58 and 48 <= byte_ <= 57:
+                    start = index + 2
+                    index = start + byte_ - 48
+                else:
+                    start, index = self._key_bounds(index)
+                key = data[start:index] if keys_are_bytes \
+                    else bytes(data[start:index])
+        except IndexError:
+            raise InvalidTorrentFileBencoding(
+                'Unexpected end of data. The bencoded content is truncated.'
+            )
+
+    def _decode_spanned_dict(self):
+        """This method decodes the top-level dictionary one value at a time
+        and records the span of each value in the spans attribute.
+        """
+        data = self._data
+        d = collections.OrderedDict()
+        self.spans = {}
+
+        index = 1
+        try:
+            while data[index] != 101:
+                start, index = self._key_bounds(index)
+                key = bytes(data[start:index])
+
+                d[key], end = self._decode(index)
+                self.spans[key] = (index, end)
+                index = end
+        except IndexError:
+            raise InvalidTorrentFileBencoding(
+                'Unexpected end of data. The bencoded content is truncated.'
+            )
+
+        return d, index + 1
+
+    def _str_bounds(self, index):
+        """This method decodes the length of the bencoded string starting
+        at index. Bencoded strings are represented in the following format:
+        "<len>:<string>", where <len> corresponds to the string's length,
+        and <string> corresponds to the string. The start and end indices
+        of <string> are returned.
+        """
+        data = self._data
+
+        colon_index = data.find(b':', index)
         if colon_index == -1:
             raise InvalidTorrentFileBencoding(
                 'Expected to find a colon after string\'s length. '
-                'Error occured at {}.'.format(self._curr_index)
+                'Error occured at {}.'.format(index)
             )
 
         try:
-            str_length = int(self._data[self._curr_index:colon_index])
+            str_length = int(data[index:colon_index])
         except ValueError:
             raise InvalidTorrentFileBencoding(
                 'Expected a valid integer to indicate the string length. '
                 'Obtained "{}" at {}.'.format(
-                    self._data[self._curr_index:colon_index], self._curr_index
+                    bytes(data[index:colon_index]), index
                 )
             )
 
-        decoded_str = self._data[colon_index+1:colon_index+1+str_length]
-        decoded_str = decoded_str
+        return colon_index + 1, colon_index + 1 + str_length
 
-        self._curr_index = colon_index + 1 + str_length
+    def _key_bounds(self, index):
+        """This method returns the start and end indices of the dictionary
+        key starting at index.
+        """
+        if not 48 <= self._data[index] <= 57:
+            raise InvalidTorrentFileBencoding(
+                'Dictionary keys must be strings. '
+                'Error occured at {}.'.format(index)
+            )
 
-        return decoded_str
+        return self._str_bounds(index)
 
-    def _decode_int(self):
+    def _decode_int(self, index):
         """This method decodes bencoded integers. Bencoded integers are
         represented in the following format: "i<integer>e", where <integer>
         corresponds to the bencoded integer.
         """
-        self._curr_index += 1
-        int_end = self._data.find(b'e', self._curr_index)
+        data = self._data
+        index += 1
+
+        int_end = data.find(b'e', index)
         if int_end == -1:
             raise InvalidTorrentFileBencoding(
                 'Expected to find an "e" to delimit the integer. '
-                'Error occured at {}.'.format(self._curr_index)
+                'Error occured at {}.'.format(index)
             )
 
-        i = self._data[self._curr_index:int_end]
-
-        if len(i) > 1:
-            if bytes([i[0]]) == b'0' or (bytes([i[0]]) == b'-' and bytes([i[1]]) == b'0'):
-                raise InvalidTorrentFileBencoding((
-                    'Integers may not be represented with leading 0s. '
-                    'Error occured at {}.'.format(self._curr_index)
-                ))
+        first = data[index]
+        if (first == 48 and int_end - index > 1) \
+                or (first == 45 and data[index + 1] == 48):
+            raise InvalidTorrentFileBencoding((
+                'Integers may not be represented with leading 0s. '
+                'Error occured at {}.'.format(index)
+            ))
 
         try:
-            i = int(i)
+            i = int(data[index:int_end])
         except ValueError:
             raise InvalidTorrentFileBencoding(
                 'Could not coerce the following byte string to an integer: '
-                '{}. Error occured at {}'.format(i, self._curr_index)
+                '{}. Error occured at {}'.format(
+                    bytes(data[index:int_end]), index
+                )
             )
 
-        self._curr_index = int_end + 1
-
-        return i
-
-    def _decode_list(self):
-        """This method decodes bencoded lists. Bencoded lists are
-        represented in the following format: "l<elements>e", where
-        <element> corresponds to the list's elements. These can be
-        strings, integers, lists or dictionaries.
-        """
-        lst = []
-        self._curr_index += 1
-
-        while self._curr_index < len(self._data) and bytes([self._data[self._curr_index]]) != b'e':
-            curr_byte = bytes([self._data[self._curr_index]])
-
-            element = self._bdecode[curr_byte]()
-            lst.append(element)
-
-        self._curr_index += 1
+        return i, int_end + 1
 
-        return lst
 
-    def _decode_dict(self):
-        """This method decodes bencoded dictionaries. Bencoded dictionaries
-        are represented in the following format: "d<key><value>e",
-        where <key> corresponds to a bencoded string, and where
-        <value> corresponds to the key's value. Values can be strings,
-        integers, lists, or dictionaries.
-        """
-        d = collections.OrderedDict()
-        self._curr_index += 1
-
-        while self._curr_index < len(self._data) and bytes([self._data[self._curr_index]]) != b'e':
-            curr_byte = bytes([self._data[self._curr_index]])
-            key = self._decode_str()
-
-            curr_byte = bytes([self._data[self._curr_index]])
-            val = self._bdecode[curr_byte]()
-
-            d[key] = val
-
-        self._curr_index += 1
-
-        return d
-
-
-def decode(data: bytes) -> dict:
+def decode(data: bytes, zero_copy: bool = False) -> dict:
     """This method decodes a bencoded byte string and returns its
     contents in the form of a string, integer, list, or dictionary.
     Lists and dictionaries can contain nested lists and dictionaries.
 
+    Parameters
+    ----------
+    data : bytes, bytearray, memoryview, or mmap.mmap
+        The bencoded content.
+    zero_copy : bool
+        If True, strings are returned as read-only memoryview slices
+        of data instead of bytes copies. Dictionary keys remain bytes.
+
     Returns
     -------
     dict
@@ -198,15 +345,15 @@ def decode(data: bytes) -> dict:
     Raises
     ------
     TypeError
-        A TypeError is raised if the data parameter is not an instance
-        of the bytes class.
+        A TypeError is raised if the data parameter is not a bytes-like
+        object.
     InvalidTorrentFileBencoding
         This method raises an InvalidTorrentFileBencoding exception
         if the contents of the bencoded byte string are not valid.
         See the following page for bencoding specifications:
         https://wiki.theory.org/index.php/BitTorrentSpecification#Bencoding
     """
-    decoder = Decoder(data)
+    decoder = Decoder(data, zero_copy)
 
     return decoder.decode()
 
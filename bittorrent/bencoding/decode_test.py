@@ -0,0 +1,71 @@
+import mmap
+import tempfile
+import unittest
+
+import bittorrent.bencoding as bencoding
+from bittorrent.exceptions import InvalidTorrentFileBencoding
+
+
+class DecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = (
+            b'd8:announce17:http://a/announce'
+            b'4:infod6:lengthi100e4:name4:file12:piece lengthi64e'
+            b'6:pieces40:' + b'\x01' * 20 + b'\x02' * 20 + b'e'
+            b'4:listli-42el3:fooi0eedeee'
+        )
+
+    def test_decoding(self):
+        self.assertEqual(bencoding.decode(b'i-12e'), -12)
+        self.assertEqual(bencoding.decode(b'i0e'), 0)
+        self.assertEqual(bencoding.decode(b'12:abcdefghijkl'), b'abcdefghijkl')
+        self.assertEqual(
+            bencoding.decode(b'ld1:ai-1eeledee'), [{b'a': -1}, [], {}]
+        )
+
+        decoded = bencoding.decode(self.data)
+        self.assertEqual(list(decoded), [b'announce', b'info', b'list'])
+        self.assertEqual(
+            decoded[b'info'][b'pieces'], b'\x01' * 20 + b'\x02' * 20
+        )
+        self.assertEqual(decoded[b'list'], [-42, [b'foo', 0], {}])
+
+    def test_invalid_data(self):
+        invalid = [
+            b'i01e', b'i-0e', b'ie', b'i-e', b'i1', b'4:ab', b'l', b'd1:ai1e',
+            b'di1ei2ee', b'e', b'x', b'1x:abc', b'i1ei2e', b'd1:ae', b'ld1:aee'
+        ]
+        for data in invalid:
+            with self.assertRaises(InvalidTorrentFileBencoding):
+                bencoding.decode(data)
+
+    def test_zero_copy_decoding(self):
+        expected = bencoding.decode(self.data)
+        decoded = bencoding.decode(self.data, zero_copy=True)
+
+        self.assertEqual(decoded, expected)
+        self.assertIsInstance(decoded[b'info'][b'pieces'], memoryview)
+        self.assertTrue(decoded[b'info'][b'pieces'].readonly)
+        self.assertTrue(all(type(k) is bytes for k in decoded[b'info']))
+
+    def test_buffer_types(self):
+        expected = bencoding.decode(self.data)
+
+        self.assertEqual(bencoding.decode(bytearray(self.data)), expected)
+        self.assertEqual(bencoding.decode(memoryview(self.data)), expected)
+        self.assertEqual(
+            bencoding.decode(memoryview(self.data)[:len(self.data)]), expected
+        )
+
+        with tempfile.TemporaryFile() as f:
+            f.write(self.data)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                decoded = bencoding.decode(m, zero_copy=True)
+                self.assertEqual(decoded, expected)
+                del decoded
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,38 +1,48 @@
-import collections
+import collections.abc
 
 from bittorrent.exceptions.exceptions import InvalidBencodeDataType
 
 
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+# Strings shorter than _INLINE_LIMIT have their "<len>:" prefix
+# precomputed and are always copied to the output buffer.
+_INLINE_LIMIT = 1024
+_PREFIXES = tuple(b'%d:' % i for i in range(_INLINE_LIMIT))
+
+
 class Encoder(object):
     """The Encoder class is designed to encode Python data types in
     bencoded format. Supported data types for bencoding are the following:
-        str, bytes : These data types will be bencoded as strings. Bytes
-        are expected to be utf-8 encoded.
+        str, bytes, bytearray, memoryview : These data types will be
+        bencoded as strings. Str types are encoded in UTF-8, the other
+        types are written as is, without being decoded or validated.
 
         int, bool : These data types will be bencoded as integers. Bool
         types will be treated as 1 if true; 0 otherwise.
 
         list, tuple : These data types will be bencoded as lists.
 
-        dict : This data type will be bencoded as a dictionary.
+        dict : This data type will be bencoded as a dictionary. Keys are
+        written in sorted order (of their raw bytes) as required by the
+        specification, so that the output is canonical.
+
+        Subclasses of these data types and other mappings and sequences
+        are converted to one of them first.
+
+    The encoded output is written in a single pass to a bytearray. The
+    encode_into method appends to a caller-supplied bytearray that can be
+    reused between calls, and the encode_to method streams the output to a
+    file-like writer in chunks of bounded size.
     """
 
     def __init__(self, data):
         self._data = data
-        self._bencoded = []
-
-        self._encode_func = {
-            int: self._encode_int,
-            bool: self._encode_bool,
-            str: self._encode_str,
-            bytes: self._encode_bytes,
-            list: self._encode_list,
-            tuple: self._encode_list,
-            dict: self._encode_dict,
-            collections.OrderedDict: self._encode_dict
-        }
-
-    def encode(self):
+        self._writer = None
+        self._buffer_size = DEFAULT_BUFFER_SIZE
+        self._written = 0
+
+    def encode(self) -> bytes:
         """This method encodes Python objects into a bencoded byte string.
         Supported data types are: int, str, bool, bytes, tuple, list, and dict.
         For more information on the specification, see the following:
@@ -41,66 +51,215 @@ class Encoder(object):
         Returns
         -------
         bytes
-            A utf-8 encoded byte string corresponding to the bencoded
-            Python objects.
+            A byte string corresponding to the bencoded Python objects.
 
         Raises
         ------
         InvalidBencodeDataType
             An InvalidBencodeDataType exception is raised if a non-supported
-            data type is found or if a byte is not utf-8 encoded.
+            data type is found or if a string is not utf-8 encodable.
         """
-        try:
-            self._encode_func[type(self._data)](self._data)
-        except UnicodeDecodeError:
-            raise InvalidBencodeDataType(
-                'Could not decode a byte sequence. Bytes should be '
-                'encoded in UTF-8.'
-            )
-        except KeyError as e:
-            raise InvalidBencodeDataType(
-                'Could not encode the following data type:\n{}'.format(str(e))
-            )
-
-        return b''.join(self._bencoded)
+        buffer = bytearray()
+        self.encode_into(buffer)
 
-    def _encode_int(self, i):
-        encoded_int = b'i' + str(i).encode() + b'e'
+        return bytes(buffer)
 
-        self._bencoded.append(encoded_int)
+    def encode_into(self, buffer: bytearray) -> int:
+        """This method appends the bencoded data to a bytearray. Clearing
+        and reusing the same bytearray between calls avoids reallocating
+        the output buffer.
 
-    def _encode_bool(self, b):
-        if b:
-            self._encode_int(1)
-        else:
-            self._encode_int(0)
+        Parameters
+        ----------
+        buffer : bytearray
+            The bytearray the bencoded data is appended to.
 
-    def _encode_str(self, s):
-        encoded_str = str(len(s)).encode() + b':' + s.encode()
+        Returns
+        -------
+        int
+            The number of bytes appended to the buffer.
 
-        self._bencoded.append(encoded_str)
+        Raises
+        ------
+        InvalidBencodeDataType
+            An InvalidBencodeDataType exception is raised if a non-supported
+            data type is found or if a string is not utf-8 encodable.
+        """
+        start = len(buffer)
 
-    def _encode_bytes(self, b):
-        encoded_bytes = str(len(b)).encode() + b':' + b
+        try:
+            self._encode(self._data, buffer)
+        except UnicodeError:
+            raise InvalidBencodeDataType(
+                'Could not encode a string. Strings should be '
+                'encodable in UTF-8.'
+            )
 
-        self._bencoded.append(encoded_bytes)
+        return len(buffer) - start
 
-    def _encode_list(self, lst):
-        self._bencoded.append(b'l')
+    def encode_to(self, writer, buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+        """This method streams the bencoded data to a file-like writer.
+        The output is buffered until a list or dictionary ending past
+        buffer_size bytes is encoded, and strings longer than buffer_size
+        (and than 1 KiB) are written without being copied to the buffer.
 
-        for el in lst:
-            self._encode_func[type(el)](el)
+        Parameters
+        ----------
+        writer : file-like object
+            An object exposing a write(bytes) method (e.g. a file opened
+            in binary mode or io.BytesIO).
+        buffer_size : int
+            The number of bytes buffered before a write.
 
-        self._bencoded.append(b'e')
+        Returns
+        -------
+        int
+            The number of bytes written.
 
-    def _encode_dict(self, d):
-        self._bencoded.append(b'd')
+        Raises
+        ------
+        InvalidBencodeDataType
+            An InvalidBencodeDataType exception is raised if a non-supported
+            data type is found or if a string is not utf-8 encodable.
+        """
+        self._writer = writer
+        self._buffer_size = buffer_size
+        self._written = 0
 
-        for k, v in d.items():
-            self._encode_func[type(k)](k)
-            self._encode_func[type(v)](v)
+        buffer = bytearray()
+        try:
+            self.encode_into(buffer)
+            self._flush(buffer)
+        finally:
+            self._writer = None
+
+        return self._written
+
+    def _flush(self, buffer):
+        if buffer:
+            self._writer.write(buffer)
+            self._written += len(buffer)
+            del buffer[:]
+
+    def _encode(self, value, out):
+        """This method appends the bencoded value to out. The value's type
+        is dispatched in the order of its frequency in torrent metadata.
+        """
+        value_type = type(value)
+
+        if value_type is bytes or value_type is bytearray:
+            self._encode_bytes(value, len(value), out)
+        elif value_type is int:
+            out += b'i%de' % value
+        elif value_type is dict or value_type is collections.OrderedDict:
+            self._encode_dict(value, out)
+        elif value_type is list or value_type is tuple:
+            self._encode_list(value, out)
+        elif value_type is str:
+            value = value.encode('utf-8')
+            self._encode_bytes(value, len(value), out)
+        elif value_type is memoryview:
+            self._encode_bytes(value, value.nbytes, out)
+        elif value_type is bool:
+            out += b'i1e' if value else b'i0e'
+        else:
+            self._encode_subclass(value, out)
+
+    def _encode_bytes(self, value, length, out):
+        out += _PREFIXES[length] if length < _INLINE_LIMIT \
+            else b'%d:' % length
+
+        if self._writer is not None and length >= self._buffer_size:
+            # Large strings are written as is rather than being copied
+            # to the buffer.
+            self._flush(out)
+            self._writer.write(value)
+            self._written += length
+        else:
+            out += value
+
+    def _encode_list(self, lst, out):
+        encode = self._encode
+
+        out += b'l'
+        for element in lst:
+            # Short strings and integers are encoded inline.
+            element_type = type(element)
+            if element_type is bytes and len(element) < _INLINE_LIMIT:
+                out += _PREFIXES[len(element)]
+                out += element
+            elif element_type is int:
+                out += b'i%de' % element
+            else:
+                encode(element, out)
+        out += b'e'
+
+        if self._writer is not None and len(out) >= self._buffer_size:
+            self._flush(out)
+
+    def _encode_dict(self, d, out):
+        encode = self._encode
 
-        self._bencoded.append(b'e')
+        try:
+            # Bytes keys are sorted directly. Sorting str keys gives the
+            # same order since UTF-8 preserves the order of code points.
+            keys = sorted(d)
+        except TypeError:
+            keys = sorted(d, key=self._encode_key)
+
+        out += b'd'
+        for key in keys:
+            value = d[key]
+            if type(key) is not bytes:
+                key = self._encode_key(key)
+            out += _PREFIXES[len(key)] if len(key) < _INLINE_LIMIT \
+                else b'%d:' % len(key)
+            out += key
+
+            # Short strings and integers are encoded inline.
+            value_type = type(value)
+            if value_type is bytes and len(value) < _INLINE_LIMIT:
+                out += _PREFIXES[len(value)]
+                out += value
+            elif value_type is int:
+                out += b'i%de' % value
+            else:
+                encode(value, out)
+        out += b'e'
+
+        if self._writer is not None and len(out) >= self._buffer_size:
+            self._flush(out)
+
+    def _encode_key(self, key):
+        if isinstance(key, str):
+            return key.encode('utf-8')
+        if isinstance(key, (bytes, bytearray, memoryview)):
+            return bytes(key)
+
+        raise InvalidBencodeDataType(
+            'Dictionary keys must be strings. Obtained:\n{}'.format(type(key))
+        )
+
+    def _encode_subclass(self, value, out):
+        """This method encodes values whose type is a subclass (or a
+        virtual subclass) of a supported data type.
+        """
+        if isinstance(value, int):
+            self._encode(int(value), out)
+        elif isinstance(value, str):
+            self._encode(value.encode('utf-8'), out)
+        elif isinstance(value, (bytes, bytearray)):
+            self._encode(bytes(value), out)
+        elif isinstance(value, collections.abc.Mapping):
+            self._encode_dict(value, out)
+        elif isinstance(value, collections.abc.Sequence):
+            self._encode(list(value), out)
+        else:
+            raise InvalidBencodeDataType(
+                'Could not encode the following data type:\n{}'.format(
+                    type(value)
+                )
+            )
 
 
 def encode(data: bytes):
@@ -126,5 +285,23 @@ def encode(data: bytes):
     return encoder.encode()
 
 
+def encode_into(data, buffer: bytearray) -> int:
+    """This method appends the bencoded form of data to a bytearray and
+    returns the number of bytes appended. See Encoder.encode_into.
+    """
+    encoder = Encoder(data)
+
+    return encoder.encode_into(buffer)
+
+
+def encode_to(data, writer, buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """This method streams the bencoded form of data to a file-like
+    writer and returns the number of bytes written. See Encoder.encode_to.
+    """
+    encoder = Encoder(data)
+
+    return encoder.encode_to(writer, buffer_size)
+
+
 if __name__ == "__main__":
     pass
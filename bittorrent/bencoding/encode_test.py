@@ -0,0 +1,60 @@
+import collections
+import io
+import unittest
+
+import bittorrent.bencoding as bencoding
+from bittorrent.exceptions import InvalidBencodeDataType
+
+
+class EncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = collections.OrderedDict([
+            (b'info', {
+                b'pieces': b'\x01' * 40,
+                b'name': 'file',
+                b'piece length': 64,
+                b'length': 100,
+            }),
+            ('announce', b'http://a/announce'),
+            (b'list', [-42, (b'foo', False), {}, True, memoryview(b'bar')]),
+        ])
+        self.encoded = (
+            b'd8:announce17:http://a/announce'
+            b'4:infod6:lengthi100e4:name4:file12:piece lengthi64e'
+            b'6:pieces40:' + b'\x01' * 40 + b'e'
+            b'4:listli-42el3:fooi0eedei1e3:bare'
+            b'e'
+        )
+
+    def test_canonical_encoding(self):
+        self.assertEqual(bencoding.encode(self.data), self.encoded)
+        self.assertEqual(
+            bencoding.encode(bencoding.decode(self.encoded)), self.encoded
+        )
+
+    def test_encode_into(self):
+        buffer = bytearray(b'prefix')
+
+        written = bencoding.encode_into(self.data, buffer)
+
+        self.assertEqual(written, len(self.encoded))
+        self.assertEqual(bytes(buffer), b'prefix' + self.encoded)
+
+    def test_encode_to(self):
+        for buffer_size in (1, 16, 1 << 16):
+            writer = io.BytesIO()
+
+            written = bencoding.encode_to(self.data, writer, buffer_size)
+
+            self.assertEqual(written, len(self.encoded))
+            self.assertEqual(writer.getvalue(), self.encoded)
+
+    def test_invalid_data_types(self):
+        for data in (1.5, {1: b'a'}, [None], '\ud800'):
+            with self.assertRaises(InvalidBencodeDataType):
+                bencoding.encode(data)
+
+
+if __name__ == "__main__":
+    unittest.main()
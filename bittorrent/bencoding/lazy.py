@@ -0,0 +1,413 @@
+import collections.abc
+
+from bittorrent.exceptions.exceptions import InvalidTorrentFileBencoding
+from .decode import Decoder
+
+
+def build_index(data) -> dict:
+    """This method is designed to scan a bencoded byte string without
+    decoding it and to build an index of its lists and dictionaries.
+    Strings are skipped using their length prefix and integers using
+    their end delimiter, as such, no value is allocated during the scan.
+
+    Parameters
+    ----------
+    data : bytes, bytearray, or mmap.mmap
+        The bencoded content.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping the index at which each list or dictionary
+        starts to the index of the byte following its end delimiter.
+
+    Raises
+    ------
+    InvalidTorrentFileBencoding
+        An InvalidTorrentFileBencoding exception is raised if the structure
+        of the bencoded content is not valid.
+    """
+    find = data.find
+    ends = {}
+    starts = []
+    # For each open container, the number of keys and values read so far
+    # if it is a dictionary, or -1 if it is a list.
+    items = []
+    index = 0
+
+    try:
+        while True:
+            byte_ = data[index]
+
+            if items and items[-1] >= 0 and not items[-1] % 2 \
+                    and not (48 <= byte_ <= 57 or byte_ == 101):
+                raise InvalidTorrentFileBencoding(
+                    'Dictionary keys must be strings. '
+                    'Error occured at {}.'.format(index)
+                )
+
+            if 48 <= byte_ <= 57:
+                index = _str_end(data, index)
+            elif byte_ == 105:
+                int_end = find(b'e', index)
+                if int_end == -1:
+                    raise InvalidTorrentFileBencoding(
+                        'Expected to find an "e" to delimit the integer. '
+                        'Error occured at {}.'.format(index)
+                    )
+                index = int_end + 1
+            elif byte_ == 100 or byte_ == 108:
+                starts.append(index)
+                items.append(0 if byte_ == 100 else -1)
+                index += 1
+                continue
+            elif byte_ == 101 and starts:
+                count = items.pop()
+                if count > 0 and count % 2:
+                    raise InvalidTorrentFileBencoding(
+                        'Expected a value for the last dictionary key. '
+                        'Error occured at {}.'.format(index)
+                    )
+                index += 1
+                ends[starts.pop()] = index
+            else:
+                raise InvalidTorrentFileBencoding(
+                    'Unexpected byte {!r}. Error occured at {}.'.format(
+                        bytes([byte_]), index
+                    )
+                )
+
+            if items and items[-1] >= 0:
+                items[-1] += 1
+            if not starts:
+                break
+    except IndexError:
+        raise InvalidTorrentFileBencoding(
+            'Unexpected end of data. The bencoded content is truncated.'
+        )
+
+    if index != len(data):
+        raise InvalidTorrentFileBencoding(
+            'The number of decoded bytes does not match '
+            'the number of total bytes.'
+        )
+
+    return ends
+
+
+def _str_end(data, index):
+    """Returns the index of the byte following the bencoded string
+    starting at index.
+    """
+    if data[index + 1] == 58:
+        end = index + 2 + data[index] - 48
+    else:
+        colon_index = data.find(b':', index)
+        if colon_index == -1:
+            raise InvalidTorrentFileBencoding(
+                'Expected to find a ":" to delimit the string length. '
+                'Error occured at {}.'.format(index)
+            )
+        try:
+            length = int(data[index:colon_index])
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise InvalidTorrentFileBencoding(
+                'Expected a valid integer to indicate the string length. '
+                'Obtained "{}" at {}.'.format(
+                    bytes(data[index:colon_index]), index
+                )
+            )
+        end = colon_index + 1 + length
+
+    if end > len(data):
+        raise InvalidTorrentFileBencoding(
+            'The string starting at {} runs past the end of the data.'.format(
+                index
+            )
+        )
+
+    return end
+
+
+class _Document(object):
+    """The _Document class holds the state shared by the lazy containers
+    of a bencoded document: the decoder used to decode values on access
+    and the index of its containers.
+    """
+
+    def __init__(self, data, zero_copy):
+        self.decoder = Decoder(data, zero_copy)
+        self.data = self.decoder._data
+        self.view = self.decoder._view
+        self.ends = build_index(self.data)
+
+    def value_end(self, index):
+        """Returns the index of the byte following the value starting at
+        index.
+        """
+        data = self.data
+        byte_ = data[index]
+        if byte_ == 100 or byte_ == 108:
+            return self.ends[index]
+        if byte_ == 105:
+            int_end = data.find(b'e', index)
+            if int_end == -1:
+                raise InvalidTorrentFileBencoding(
+                    'Expected to find an "e" to delimit the integer. '
+                    'Error occured at {}.'.format(index)
+                )
+            return int_end + 1
+        if 48 <= byte_ <= 57:
+            return _str_end(data, index)
+
+        raise InvalidTorrentFileBencoding(
+            'Expected a value. Obtained {!r} at {}.'.format(
+                bytes([byte_]), index
+            )
+        )
+
+    def check_end(self, start, index, end):
+        """Checks that the value starting at index and ending at end lies
+        inside of the container starting at start.
+        """
+        if not index < end < self.ends[start]:
+            raise InvalidTorrentFileBencoding(
+                'The value at {} runs past the end of the container '
+                'starting at {}.'.format(index, start)
+            )
+
+    def value_at(self, index):
+        """Returns the value starting at index. Lists and dictionaries are
+        returned as lazy containers.
+        """
+        byte_ = self.data[index]
+        if byte_ == 100:
+            return LazyDict(self, index)
+        if byte_ == 108:
+            return LazyList(self, index)
+
+        return self.decoder._decode(index)[0]
+
+
+class LazyDict(collections.abc.Mapping):
+    """The LazyDict class is a read-only mapping over a bencoded
+    dictionary whose values are only decoded when they are accessed.
+    The first access to the mapping locates its keys and the byte span of
+    their values. Nested lists and dictionaries are returned as LazyList
+    and LazyDict instances. Decoded values are cached.
+
+    LazyDict instances should be obtained through the lazy_decode method.
+    """
+
+    def __init__(self, document, start):
+        self._document = document
+        self._start = start
+        self._spans = None
+        self._values = {}
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            start, _ = self.spans()[key]
+            self._values[key] = self._document.value_at(start)
+
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self.spans())
+
+    def __len__(self):
+        return len(self.spans())
+
+    def __contains__(self, key):
+        return key in self.spans()
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, list(self.spans()))
+
+    def spans(self) -> dict:
+        """Returns a dictionary mapping the keys of the dictionary to the
+        start and end indices of their bencoded values.
+        """
+        if self._spans is None:
+            document = self._document
+            data = document.data
+            spans = {}
+
+            index = self._start + 1
+            while data[index] != 101:
+                if not 48 <= data[index] <= 57:
+                    raise InvalidTorrentFileBencoding(
+                        'Dictionary keys must be strings. '
+                        'Error occured at {}.'.format(index)
+                    )
+                key_end = _str_end(data, index)
+                key = bytes(data[data.find(b':', index)+1:key_end])
+
+                document.check_end(self._start, index, key_end)
+                value_end = document.value_end(key_end)
+                document.check_end(self._start, key_end, value_end)
+                spans[key] = (key_end, value_end)
+                index = value_end
+
+            self._spans = spans
+
+        return self._spans
+
+    def span(self, key) -> tuple:
+        """Returns the start and end indices of the bencoded value stored
+        under key.
+
+        Raises
+        ------
+        KeyError
+            A KeyError is raised if key is not in the dictionary.
+        """
+        return self.spans()[key]
+
+    def raw(self, key=None) -> memoryview:
+        """Returns a read-only memoryview over the bencoded bytes of the
+        value stored under key, or of the whole dictionary if key is None.
+        """
+        if key is None:
+            start, end = self._start, self._document.ends[self._start]
+        else:
+            start, end = self.spans()[key]
+
+        return self._document.view[start:end]
+
+    def decode(self) -> collections.OrderedDict:
+        """Returns the dictionary fully decoded, as bencoding.decode
+        would return it.
+        """
+        return self._document.decoder._decode(self._start)[0]
+
+
+class LazyList(collections.abc.Sequence):
+    """The LazyList class is a read-only sequence over a bencoded list
+    whose elements are only decoded when they are accessed. Nested lists
+    and dictionaries are returned as LazyList and LazyDict instances.
+    A LazyList compares equal to a list, or another LazyList, with equal
+    elements.
+
+    LazyList instances should be obtained through the lazy_decode method.
+    """
+
+    def __init__(self, document, start):
+        self._document = document
+        self._start = start
+        self._spans = None
+        self._values = {}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        index = self._index(index)
+        if index not in self._values:
+            self._values[index] = self._document.value_at(
+                self.spans()[index][0]
+            )
+
+        return self._values[index]
+
+    def __len__(self):
+        return len(self.spans())
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, LazyList)):
+            return NotImplemented
+
+        return len(self) == len(other) \
+            and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def _index(self, index):
+        """Returns index, made positive, checking that it is in range."""
+        n = len(self.spans())
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError('LazyList index out of range')
+
+        return index
+
+    def __repr__(self):
+        return '{}(<{} elements>)'.format(type(self).__name__, len(self))
+
+    def spans(self) -> list:
+        """Returns the start and end indices of the bencoded elements."""
+        if self._spans is None:
+            document = self._document
+            data = document.data
+            spans = []
+
+            index = self._start + 1
+            while data[index] != 101:
+                end = document.value_end(index)
+                document.check_end(self._start, index, end)
+                spans.append((index, end))
+                index = end
+
+            self._spans = spans
+
+        return self._spans
+
+    def raw(self, index=None) -> memoryview:
+        """Returns a read-only memoryview over the bencoded bytes of the
+        element at index, or of the whole list if index is None.
+        """
+        if index is None:
+            start, end = self._start, self._document.ends[self._start]
+        else:
+            start, end = self.spans()[self._index(index)]
+
+        return self._document.view[start:end]
+
+    def decode(self) -> list:
+        """Returns the list fully decoded, as bencoding.decode would
+        return it.
+        """
+        return self._document.decoder._decode(self._start)[0]
+
+
+def lazy_decode(data: bytes, zero_copy: bool = False):
+    """This method decodes a bencoded byte string lazily. The structure of
+    the data is validated and indexed in a single pass, but values are
+    only decoded when they are accessed. This is useful when only a few
+    fields are needed from a large document, e.g. the announce URL and
+    the info dictionary's name of a torrent with a long file list.
+
+    Parameters
+    ----------
+    data : bytes, bytearray, memoryview, or mmap.mmap
+        The bencoded content.
+    zero_copy : bool
+        If True, strings are returned as read-only memoryview slices
+        of data instead of bytes copies.
+
+    Returns
+    -------
+    LazyDict, LazyList, bytes, or int
+        The decoded content. Lists and dictionaries are returned as
+        LazyList and LazyDict instances.
+
+    Raises
+    ------
+    TypeError
+        A TypeError is raised if the data parameter is not a bytes-like
+        object.
+    InvalidTorrentFileBencoding
+        An InvalidTorrentFileBencoding exception is raised if the structure
+        of the bencoded content is not valid. Errors inside of strings and
+        integers are only detected when the values are accessed.
+    """
+    document = _Document(data, zero_copy)
+
+    return document.value_at(0)
+
+
+if __name__ == "__main__":
+    pass
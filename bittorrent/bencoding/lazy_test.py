@@ -0,0 +1,83 @@
+import hashlib
+import unittest
+
+import bittorrent.bencoding as bencoding
+from bittorrent.exceptions import InvalidTorrentFileBencoding
+
+
+class LazyDecodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.info = (
+            b'd5:filesld6:lengthi10e4:pathl5:a.txteed6:lengthi20e4:pathl'
+            b'3:dir5:b.txteee4:name3:dir12:piece lengthi16e'
+            b'6:pieces40:' + b'\x01' * 20 + b'\x02' * 20 + b'e'
+        )
+        self.data = b'd8:announce17:http://a/announce4:info' + self.info \
+            + b'4:listli-42el3:fooi0eedeee'
+
+    def test_lazy_access(self):
+        expected = bencoding.decode(self.data)
+        lazy = bencoding.lazy_decode(self.data)
+
+        self.assertIsInstance(lazy, bencoding.LazyDict)
+        self.assertEqual(list(lazy), list(expected))
+        self.assertEqual(lazy[b'announce'], expected[b'announce'])
+        self.assertIsInstance(lazy[b'info'][b'files'], bencoding.LazyList)
+        self.assertEqual(lazy[b'info'][b'files'][-1][b'path'][0], b'dir')
+        self.assertEqual(lazy[b'list'][0], -42)
+        self.assertEqual(lazy.decode(), expected)
+        self.assertEqual(lazy[b'list'].decode(), expected[b'list'])
+        self.assertTrue(b'info' in lazy)
+        self.assertFalse(b'missing' in lazy)
+
+    def test_lazy_list(self):
+        expected = bencoding.decode(self.data)
+        lazy = bencoding.lazy_decode(self.data)
+        lst = lazy[b'list']
+
+        self.assertEqual(len(lst), 3)
+        self.assertEqual(lst, expected[b'list'])
+        self.assertEqual(expected[b'list'], lst)
+        self.assertEqual(lst, bencoding.lazy_decode(self.data)[b'list'])
+        self.assertNotEqual(lst, expected[b'list'][:2])
+        self.assertNotEqual(lst, [-42, [b'foo', 1], {}])
+        self.assertNotEqual(lst, tuple(expected[b'list']))
+        self.assertEqual(lazy[b'info'][b'files'], expected[b'info'][b'files'])
+
+        self.assertEqual(lst[-3], -42)
+        self.assertEqual(lst[1:], expected[b'list'][1:])
+        for index in (3, -4, -7):
+            with self.assertRaises(IndexError):
+                lst[index]
+            with self.assertRaises(IndexError):
+                lst.raw(index)
+
+    def test_raw_span(self):
+        lazy = bencoding.lazy_decode(self.data)
+
+        start, end = lazy.span(b'info')
+
+        self.assertEqual(self.data[start:end], self.info)
+        self.assertEqual(
+            hashlib.sha1(lazy.raw(b'info')).digest(),
+            hashlib.sha1(self.info).digest()
+        )
+        self.assertEqual(bytes(lazy.raw()), self.data)
+
+    def test_build_index(self):
+        ends = bencoding.build_index(self.data)
+
+        self.assertEqual(ends[0], len(self.data))
+        start = self.data.index(b'4:info') + 6
+        self.assertEqual(ends[start], start + len(self.info))
+
+    def test_invalid_structure(self):
+        for data in (b'd1:a', b'li1e', b'x', b'i1ei2e', b'l1x:ae',
+                     b'l0e', b'd1:ae'):
+            with self.assertRaises(InvalidTorrentFileBencoding):
+                bencoding.lazy_decode(data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,245 @@
+import collections
+
+from bittorrent.exceptions.exceptions import InvalidTorrentFileBencoding
+
+
+_DIGITS = frozenset(b'0123456789')
+
+
+class StreamDecoder(object):
+    """The StreamDecoder class is designed to decode bencoded data that
+    arrives in chunks (e.g. from a socket or a file). Chunks are pushed
+    to the decoder with the feed method and complete top-level values
+    are returned as soon as their last byte has been received.
+
+    Only the bytes of the token currently being decoded are kept between
+    calls, as such, the memory used by the decoder is bounded by the
+    largest bencoded string rather than by the size of the whole document.
+
+    Attributes
+    ----------
+    bytearray : _buffer
+        The received bytes that have not been decoded yet.
+    list : _stack
+        The lists and dictionaries that are currently being decoded.
+        Dictionaries are wrapped in a frame holding their pending key.
+    int : _consumed
+        The total number of bytes decoded so far. This is used to report
+        the position of an error in the stream.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._stack = []
+        self._consumed = 0
+
+    @property
+    def pending(self) -> bool:
+        """Returns True if a top-level value is partially decoded."""
+        return bool(self._stack) or bool(self._buffer)
+
+    def feed(self, chunk: bytes) -> list:
+        """This method is designed to push a chunk of bencoded data to the
+        decoder. Values that are split across several chunks are kept in
+        their partial state until the chunk containing their end is fed.
+
+        Parameters
+        ----------
+        chunk : bytes, bytearray, or memoryview
+            The next chunk of the bencoded stream.
+
+        Returns
+        -------
+        list
+            The top-level values completed by this chunk, in order.
+
+        Raises
+        ------
+        InvalidTorrentFileBencoding
+            An InvalidTorrentFileBencoding exception is raised if the
+            stream does not respect the bencoding specification.
+        """
+        self._buffer += chunk
+
+        completed = []
+        pos = self._parse(completed)
+
+        if pos:
+            del self._buffer[:pos]
+            self._consumed += pos
+
+        return completed
+
+    def close(self):
+        """This method is designed to signal the end of the stream.
+
+        Raises
+        ------
+        InvalidTorrentFileBencoding
+            An InvalidTorrentFileBencoding exception is raised if a value
+            was only partially received.
+        """
+        if self.pending:
+            raise InvalidTorrentFileBencoding(
+                'The stream ended in the middle of a value. '
+                'Error occured at {}.'.format(self._consumed)
+            )
+
+    def _error(self, message, pos):
+        return InvalidTorrentFileBencoding(
+            '{} Error occured at {}.'.format(message, self._consumed + pos)
+        )
+
+    def _parse(self, completed):
+        """This method decodes as many tokens as possible from the buffer
+        and returns the index of the first byte that could not be decoded.
+        """
+        data = self._buffer
+        stack = self._stack
+        size = len(data)
+        pos = 0
+
+        while pos < size:
+            byte_ = data[pos]
+            top = stack[-1] if stack else None
+
+            if byte_ == 0x65:  # b'e'
+                if top is None:
+                    raise self._error('Unexpected end delimiter.', pos)
+                if type(top) is _DictFrame:
+                    if top.key is not None:
+                        raise self._error(
+                            'Missing value for dictionary key.', pos
+                        )
+                    value = top.dict
+                else:
+                    value = top
+                stack.pop()
+                pos += 1
+                self._complete(value, completed)
+                continue
+
+            if type(top) is _DictFrame and top.key is None \
+                    and byte_ not in _DIGITS:
+                raise self._error('Dictionary keys must be strings.', pos)
+
+            if byte_ == 0x6c:  # b'l'
+                stack.append([])
+                pos += 1
+            elif byte_ == 0x64:  # b'd'
+                stack.append(_DictFrame())
+                pos += 1
+            elif byte_ == 0x69:  # b'i'
+                int_end = data.find(b'e', pos + 1)
+                if int_end == -1:
+                    break
+                self._complete(self._decode_int(data, pos, int_end), completed)
+                pos = int_end + 1
+            elif byte_ in _DIGITS:
+                colon_index = data.find(b':', pos)
+                if colon_index == -1:
+                    if size - pos > 20:
+                        raise self._error(
+                            'Expected to find a colon after string\'s length.',
+                            pos
+                        )
+                    break
+                try:
+                    str_length = int(data[pos:colon_index])
+                except ValueError:
+                    raise self._error(
+                        'Expected a valid integer to indicate the string '
+                        'length.', pos
+                    )
+                str_end = colon_index + 1 + str_length
+                if str_end > size:
+                    break
+                self._complete(bytes(data[colon_index+1:str_end]), completed)
+                pos = str_end
+            else:
+                raise self._error(
+                    'Unexpected byte {!r}.'.format(bytes([byte_])), pos
+                )
+
+        return pos
+
+    def _decode_int(self, data, pos, int_end):
+        i = bytes(data[pos+1:int_end])
+
+        if len(i) > 1:
+            if i[0] == 0x30 or (i[0] == 0x2d and i[1] == 0x30):
+                raise self._error(
+                    'Integers may not be represented with leading 0s.', pos
+                )
+
+        try:
+            return int(i)
+        except ValueError:
+            raise self._error(
+                'Could not coerce the following byte string to an '
+                'integer: {}.'.format(i), pos
+            )
+
+    def _complete(self, value, completed):
+        """This method attaches a decoded value to the container being
+        decoded or, if there is none, marks it as a completed top-level
+        value.
+        """
+        if not self._stack:
+            completed.append(value)
+            return
+
+        top = self._stack[-1]
+        if type(top) is list:
+            top.append(value)
+        elif top.key is None:
+            top.key = value
+        else:
+            top.dict[top.key] = value
+            top.key = None
+
+
+class _DictFrame(object):
+    """A dictionary being decoded along with its pending key."""
+    __slots__ = ('dict', 'key')
+
+    def __init__(self):
+        self.dict = collections.OrderedDict()
+        self.key = None
+
+
+def iter_decode(readable, chunk_size: int = 65536):
+    """This method decodes the bencoded values read from a file-like
+    object and yields them as soon as they are complete.
+
+    Parameters
+    ----------
+    readable : file-like object
+        An object exposing a read(size) method returning bytes. Sockets
+        can be wrapped with socket.makefile('rb').
+    chunk_size : int
+        The number of bytes requested on each read.
+
+    Yields
+    ------
+    bytes, int, list, or OrderedDict
+        The decoded top-level values.
+
+    Raises
+    ------
+    InvalidTorrentFileBencoding
+        An InvalidTorrentFileBencoding exception is raised if the stream
+        is not validly bencoded or ends in the middle of a value.
+    """
+    decoder = StreamDecoder()
+
+    chunk = readable.read(chunk_size)
+    while chunk:
+        yield from decoder.feed(chunk)
+        chunk = readable.read(chunk_size)
+
+    decoder.close()
+
+
+if __name__ == "__main__":
+    pass
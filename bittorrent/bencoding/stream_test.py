@@ -0,0 +1,58 @@
+import io
+import unittest
+
+import bittorrent.bencoding as bencoding
+from bittorrent.exceptions import InvalidTorrentFileBencoding
+
+
+class StreamDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = (
+            b'd8:announce39:udp://tracker.example.org:6969/announce'
+            b'4:infod6:lengthi1048576e4:name8:file.iso12:piece lengthi262144e'
+            b'6:pieces80:' + b'\x01' * 80 + b'e'
+            b'4:listli-42el3:fooi0eedeee'
+        )
+
+    def test_chunked_decoding(self):
+        expected = bencoding.decode(self.data)
+
+        for chunk_size in (1, 2, 3, 7, 64, len(self.data)):
+            decoder = bencoding.StreamDecoder()
+            values = []
+            for i in range(0, len(self.data), chunk_size):
+                values.extend(decoder.feed(self.data[i:i+chunk_size]))
+            decoder.close()
+
+            self.assertEqual(values, [expected])
+
+    def test_multiple_values(self):
+        decoder = bencoding.StreamDecoder()
+
+        self.assertEqual(decoder.feed(b'i1e4:spa'), [1])
+        self.assertTrue(decoder.pending)
+        self.assertEqual(decoder.feed(b'mli2ee'), [b'spam', [2]])
+        self.assertFalse(decoder.pending)
+
+    def test_iter_decode(self):
+        readable = io.BytesIO(self.data * 3)
+
+        values = list(bencoding.iter_decode(readable, chunk_size=5))
+
+        self.assertEqual(values, [bencoding.decode(self.data)] * 3)
+
+    def test_invalid_streams(self):
+        for data in (b'i01e', b'e', b'di1ei2ee', b'x', b'd3:fooe'):
+            decoder = bencoding.StreamDecoder()
+            with self.assertRaises(InvalidTorrentFileBencoding):
+                decoder.feed(data)
+
+        decoder = bencoding.StreamDecoder()
+        decoder.feed(b'l4:spa')
+        with self.assertRaises(InvalidTorrentFileBencoding):
+            decoder.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
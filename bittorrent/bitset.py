@@ -0,0 +1,267 @@
+import itertools
+
+from bittorrent.exceptions import InvalidBitfieldLength
+
+
+# The bits of each byte value as booleans, high bit first.
+_BYTE_BITS = tuple(
+    tuple(bool(byte & (0x80 >> bit)) for bit in range(8))
+    for byte in range(256)
+)
+# The positions of the set bits of each byte value, high bit first.
+_BYTE_INDICES = tuple(
+    tuple(bit for bit in range(8) if byte & (0x80 >> bit))
+    for byte in range(256)
+)
+# Maps the bytes with at least one set bit to 1, and 0 to 0.
+_NONZERO = bytes([0]) + bytes([1]) * 255
+
+
+class Bitset(object):
+    """The Bitset class is designed to hold the set of pieces a peer has,
+    as sent in Bitfield messages: one bit per piece, the high bit of the
+    first byte corresponding to piece 0. Spare bits at the end of the last
+    byte are always cleared.
+
+    Single pieces are queried and updated in constant time, the number of
+    set bits is cached between bulk operations. The bulk operations (&, |,
+    - and ~) convert the bitsets to integers and are computed by the
+    interpreter's big integer arithmetic rather than bit by bit.
+
+    Parameters
+    ----------
+    length : int
+        The number of bits, that is the number of pieces of the torrent.
+    """
+
+    __slots__ = ('_bits', '_length', '_count')
+
+    def __init__(self, length: int):
+        if length < 0:
+            raise ValueError('The length of a bitset must be positive.')
+
+        self._bits = bytearray(-(-length // 8))
+        self._length = length
+        self._count = 0
+
+    @classmethod
+    def from_bytes(cls, data: bytes, length: int):
+        """This method is designed to create a bitset from the payload of
+        a Bitfield message.
+
+        Parameters
+        ----------
+        data : bytes-like
+            The bits, high bit first.
+        length : int
+            The number of pieces of the torrent.
+
+        Returns
+        -------
+        Bitset
+            A bitset holding a copy of data.
+
+        Raises
+        ------
+        bittorrent.exceptions.InvalidBitfieldLength
+            An InvalidBitfieldLength exception is raised if data is not
+            exactly long enough to hold length bits or if any of its spare
+            bits is set.
+        """
+        bitset = cls(length)
+        if len(data) != len(bitset._bits):
+            raise InvalidBitfieldLength(
+                'Expected a bitfield of {} bytes for {} pieces, got {} '
+                'bytes.'.format(len(bitset._bits), length, len(data))
+            )
+
+        bitset._bits[:] = data
+        if length % 8 and bitset._bits[-1] & (0xff >> (length % 8)):
+            raise InvalidBitfieldLength('The spare bits of the bitfield '
+                                        'are not cleared.')
+        bitset._count = None
+
+        return bitset
+
+    @classmethod
+    def full(cls, length: int):
+        """Returns a bitset of length bits, all set."""
+        return cls._from_int((1 << length) - 1 << (-length % 8), length)
+
+    @classmethod
+    def _from_int(cls, value, length):
+        bitset = cls(length)
+        bitset._bits[:] = value.to_bytes(len(bitset._bits), 'big')
+        bitset._count = None
+
+        return bitset
+
+    def _to_int(self):
+        return int.from_bytes(self._bits, 'big')
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index: int) -> bool:
+        return self.has(index)
+
+    def __iter__(self):
+        return itertools.islice(
+            itertools.chain.from_iterable(map(_BYTE_BITS.__getitem__,
+                                              self._bits)),
+            self._length
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, Bitset):
+            return NotImplemented
+
+        return self._length == other._length and self._bits == other._bits
+
+    def __hash__(self):
+        return hash((self._length, bytes(self._bits)))
+
+    def __repr__(self):
+        return '{}(<{} of {} pieces>)'.format(
+            type(self).__name__, self.count(), self._length
+        )
+
+    def _check(self, index):
+        if not 0 <= index < self._length:
+            raise IndexError('Piece index out of range: {}'.format(index))
+
+    def has(self, index: int) -> bool:
+        """Returns True if the bit at index is set."""
+        self._check(index)
+
+        return bool(self._bits[index >> 3] & (0x80 >> (index & 7)))
+
+    def set(self, index: int):
+        """This method sets the bit at index, e.g. when a Have message is
+        received.
+        """
+        self._check(index)
+
+        mask = 0x80 >> (index & 7)
+        byte = self._bits[index >> 3]
+        if not byte & mask:
+            self._bits[index >> 3] = byte | mask
+            if self._count is not None:
+                self._count += 1
+
+    def clear(self, index: int):
+        """This method clears the bit at index."""
+        self._check(index)
+
+        mask = 0x80 >> (index & 7)
+        byte = self._bits[index >> 3]
+        if byte & mask:
+            self._bits[index >> 3] = byte & ~mask
+            if self._count is not None:
+                self._count -= 1
+
+    def count(self) -> int:
+        """Returns the number of set bits."""
+        if self._count is None:
+            self._count = self._to_int().bit_count()
+
+        return self._count
+
+    def any(self) -> bool:
+        """Returns True if at least one bit is set."""
+        if self._count is not None:
+            return self._count > 0
+
+        return any(self._bits)
+
+    def all(self) -> bool:
+        """Returns True if all the bits are set, e.g. if the peer is a
+        seeder.
+        """
+        return self.count() == self._length
+
+    def indices(self):
+        """This method yields the indices of the set bits in increasing
+        order. Runs of bytes without set bits are found and skipped by
+        bytes searches rather than byte by byte, as such, iterating a
+        sparse bitset mostly costs its set bits.
+        """
+        bits = self._bits
+        marks = bits.translate(_NONZERO)
+        find = marks.find
+
+        start = find(1)
+        while start != -1:
+            end = find(0, start)
+            if end == -1:
+                end = len(marks)
+            for byte_index, byte in enumerate(bits[start:end], start):
+                base = byte_index << 3
+                for bit in _BYTE_INDICES[byte]:
+                    yield base + bit
+            start = find(1, end)
+
+    def copy(self):
+        """Returns a copy of the bitset."""
+        bitset = type(self)(self._length)
+        bitset._bits[:] = self._bits
+        bitset._count = self._count
+
+        return bitset
+
+    def tobytes(self) -> bytes:
+        """Returns the bits as a bytes string, e.g. to send them in a
+        Bitfield message.
+        """
+        return bytes(self._bits)
+
+    def _other_int(self, other):
+        if not isinstance(other, Bitset):
+            raise TypeError('Expected a Bitset, got {}.'.format(
+                type(other).__name__
+            ))
+        if other._length != self._length:
+            raise ValueError(
+                'The bitsets have different lengths: {} and {}.'.format(
+                    self._length, other._length
+                )
+            )
+
+        return other._to_int()
+
+    def __and__(self, other):
+        return self._from_int(self._to_int() & self._other_int(other),
+                              self._length)
+
+    def __or__(self, other):
+        return self._from_int(self._to_int() | self._other_int(other),
+                              self._length)
+
+    def __sub__(self, other):
+        """Returns the bits set in the bitset and cleared in other, e.g.
+        the pieces a peer has that are missing locally.
+        """
+        return self._from_int(self._to_int() & ~self._other_int(other),
+                              self._length)
+
+    def __invert__(self):
+        return Bitset.full(self._length) - self
+
+    def _assign(self, value):
+        self._bits[:] = value.to_bytes(len(self._bits), 'big')
+        self._count = None
+
+        return self
+
+    def __iand__(self, other):
+        return self._assign(self._to_int() & self._other_int(other))
+
+    def __ior__(self, other):
+        return self._assign(self._to_int() | self._other_int(other))
+
+    def __isub__(self, other):
+        return self._assign(self._to_int() & ~self._other_int(other))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,93 @@
+import random
+import unittest
+
+from bittorrent.bitset import Bitset
+from bittorrent.exceptions import InvalidBitfieldLength
+from bittorrent.messages import Bitfield
+
+
+class BitsetTest(unittest.TestCase):
+
+    def test_single_bits(self):
+        bitset = Bitset(13)
+
+        self.assertEqual(len(bitset), 13)
+        self.assertEqual(bitset.count(), 0)
+        self.assertFalse(bitset.any())
+
+        bitset.set(0)
+        bitset.set(12)
+        bitset.set(12)
+        self.assertTrue(bitset.has(0))
+        self.assertTrue(bitset[12])
+        self.assertFalse(bitset.has(1))
+        self.assertEqual(bitset.count(), 2)
+        self.assertEqual(bitset.tobytes(), b'\x80\x08')
+        self.assertEqual(list(bitset.indices()), [0, 12])
+
+        bitset.clear(0)
+        bitset.clear(0)
+        self.assertEqual(bitset.count(), 1)
+
+        with self.assertRaises(IndexError):
+            bitset.set(13)
+        with self.assertRaises(IndexError):
+            bitset.has(-1)
+
+    def test_from_bytes(self):
+        bitset = Bitset.from_bytes(b'\x01\x80', 9)
+
+        self.assertEqual(list(bitset), [False] * 7 + [True, True])
+        self.assertEqual(bitset.count(), 2)
+
+        with self.assertRaises(InvalidBitfieldLength):
+            Bitset.from_bytes(b'\x01\xc0', 9)
+        with self.assertRaises(InvalidBitfieldLength):
+            Bitset.from_bytes(b'\x01\x80\x00', 9)
+
+        self.assertTrue(Bitset.full(9).all())
+        self.assertEqual(Bitset.full(9).tobytes(), b'\xff\x80')
+        self.assertEqual(Bitset.full(16).tobytes(), b'\xff\xff')
+
+    def test_set_algebra(self):
+        rng = random.Random(0)
+        length = 1001
+        a_set = set(rng.sample(range(length), 400))
+        b_set = set(rng.sample(range(length), 400))
+        a, b = Bitset(length), Bitset(length)
+        for i in a_set:
+            a.set(i)
+        for i in b_set:
+            b.set(i)
+
+        self.assertEqual(list((a & b).indices()), sorted(a_set & b_set))
+        self.assertEqual(list((a | b).indices()), sorted(a_set | b_set))
+        self.assertEqual(list((a - b).indices()), sorted(a_set - b_set))
+        self.assertEqual((~a).count(), length - len(a_set))
+        self.assertEqual((a - b).count(), len(a_set - b_set))
+
+        c = a.copy()
+        c -= b
+        self.assertEqual(c, a - b)
+        c |= b
+        self.assertEqual(c, a | b)
+        c &= b
+        self.assertEqual(c, b)
+
+        with self.assertRaises(ValueError):
+            a & Bitset(length + 1)
+
+    def test_bitfield_message(self):
+        message = Bitfield(b'\x01\x80')
+
+        self.assertEqual(message.pieces_status(9),
+                         [False] * 7 + [True, True])
+        self.assertEqual(len(message.pieces_status()), 16)
+        self.assertEqual(Bitfield.from_bitset(message.bitset(9)), message)
+
+        with self.assertRaises(InvalidBitfieldLength):
+            message.bitset(8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,263 @@
+import collections
+import concurrent.futures
+import os
+
+from bittorrent.torrent import Torrent
+
+
+TorrentSummary = collections.namedtuple('TorrentSummary', [
+    'path',
+    'info_hash',
+    'name',
+    'announce_list',
+    'total_length',
+    'piece_length',
+    'piece_count',
+    'file_count',
+    'private',
+    'files',
+    'pieces',
+])
+TorrentSummary.__doc__ = """A compact summary of a .torrent file.
+
+Attributes
+----------
+path : str
+    The file path of the .torrent file.
+info_hash : bytes
+    The 20 byte SHA1 hash of the torrent's info dictionary.
+name : str
+    The torrent's name. Names and paths that are not valid UTF-8 are
+    decoded with the surrogateescape error handler, as file names are.
+announce_list : tuple of str
+    The announce URL followed by the URLs of the announce-list, without
+    duplicates.
+total_length : int
+    The total length, in bytes, of the torrent's files.
+piece_length : int
+    The length, in bytes, of the torrent's pieces.
+piece_count : int
+    The number of pieces of the torrent.
+file_count : int
+    The number of files of the torrent.
+private : bool
+    Whether the torrent's private flag is set.
+files : tuple of (str, int)
+    The relative path and the length of each of the torrent's files.
+pieces : bytes
+    The concatenated 20 byte SHA1 hashes of the torrent's pieces.
+"""
+
+CatalogError = collections.namedtuple('CatalogError', ['path', 'error'])
+CatalogError.__doc__ = """The error raised while loading a .torrent file.
+
+Attributes
+----------
+path : str
+    The file path of the .torrent file.
+error : str
+    The name of the exception followed by its message.
+"""
+
+Catalog = collections.namedtuple('Catalog', ['summaries', 'errors'])
+Catalog.__doc__ = """The result of loading a catalog of .torrent files.
+
+Attributes
+----------
+summaries : list of TorrentSummary
+    The summaries of the .torrent files that were loaded.
+errors : list of CatalogError
+    The errors of the .torrent files that could not be loaded.
+"""
+
+DEFAULT_CHUNKSIZE = 64
+
+
+def summarize(torrent: Torrent, path: str = '') -> TorrentSummary:
+    """This method is designed to build the summary of a torrent.
+
+    Parameters
+    ----------
+    torrent : Torrent
+        The torrent to summarize.
+    path : str
+        The file path of the torrent's .torrent file.
+
+    Returns
+    -------
+    TorrentSummary
+        The torrent's summary.
+    """
+    announce_list = [torrent.announce_url]
+    for announce in torrent.announce_list:
+        if announce not in announce_list:
+            announce_list.append(announce)
+
+    info = torrent[b'info']
+    name = str(info[b'name'], 'utf-8', 'surrogateescape')
+    if b'length' in info:
+        files = ((name, info[b'length']),)
+    else:
+        files = tuple(
+            (os.path.join(*(str(part, 'utf-8', 'surrogateescape')
+                            for part in f[b'path'])),
+             f[b'length'])
+            for f in info[b'files']
+        )
+
+    return TorrentSummary(
+        path=path,
+        info_hash=torrent.info_hash,
+        name=name,
+        announce_list=tuple(announce_list),
+        total_length=torrent.file_size,
+        piece_length=torrent.piece_length,
+        piece_count=len(info[b'pieces']) // 20,
+        file_count=torrent.file_count,
+        private=info.get(b'private') == 1,
+        files=files,
+        pieces=bytes(info[b'pieces']),
+    )
+
+
+def load_summary(path: str):
+    """This method is designed to load and validate a .torrent file and
+    to return its summary. Errors are returned rather than raised so that
+    a failing file does not abort the loading of a catalog.
+
+    Parameters
+    ----------
+    path : str
+        The file path of a .torrent file.
+
+    Returns
+    -------
+    TorrentSummary or CatalogError
+        The summary of the .torrent file or, if it could not be loaded,
+        the error that was raised.
+    """
+    try:
+        torrent = Torrent.from_path(path)
+        return summarize(torrent, path)
+    except Exception as e:
+        return CatalogError(path, '{}: {}'.format(type(e).__name__, e))
+
+
+def find_torrents(directory: str, recursive: bool = True) -> list:
+    """This method is designed to find the .torrent files of a directory.
+
+    Parameters
+    ----------
+    directory : str
+        The directory to search.
+    recursive : bool
+        Whether subdirectories should be searched.
+
+    Returns
+    -------
+    list of str
+        The sorted paths of the .torrent files found.
+    """
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        paths.extend(
+            os.path.join(root, f) for f in files
+            if os.path.splitext(f)[1].lower() == '.torrent'
+        )
+        if not recursive:
+            break
+
+    return sorted(paths)
+
+
+def iter_catalog(source, workers: int = None,
+                 chunksize: int = DEFAULT_CHUNKSIZE, cache=None):
+    """This method is designed to load a catalog of .torrent files in
+    a pool of processes. The files are parsed, validated, and summarized
+    by the worker processes, only the summaries are sent back.
+
+    Parameters
+    ----------
+    source : str or iterable of str
+        A directory that is searched recursively for .torrent files, or
+        the paths of the .torrent files to load.
+    workers : int
+        The number of worker processes. Defaults to the number of CPUs.
+        If set to 1, the files are loaded in the calling process.
+    chunksize : int
+        The number of files sent to a worker process at once. Larger
+        chunks reduce the inter-process communication overhead.
+    cache : bittorrent.metadata_cache.MetadataCache
+        If set, the summaries of unchanged files are read from the cache
+        and only the other files are parsed. The new summaries are added
+        to the cache once all the files have been loaded.
+
+    Yields
+    ------
+    TorrentSummary or CatalogError
+        The summary of each .torrent file, or the error raised while
+        loading it, in the order of the paths.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        paths = find_torrents(source)
+    else:
+        paths = [os.fspath(path) for path in source]
+
+    if cache is None:
+        yield from _load_summaries(paths, workers, chunksize)
+        return
+
+    hits, stats = cache.get_many(paths)
+    misses = _load_summaries(
+        [path for path in paths if path not in hits], workers, chunksize
+    )
+
+    loaded = []
+    for path in paths:
+        if path in hits:
+            yield hits[path]
+        else:
+            result = next(misses)
+            if not isinstance(result, CatalogError):
+                loaded.append(result)
+            yield result
+
+    cache.put_many(loaded, stats)
+
+
+def _load_summaries(paths, workers, chunksize):
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            yield load_summary(path)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(load_summary, paths, chunksize=max(1, chunksize))
+
+
+def load_catalog(source, workers: int = None,
+                 chunksize: int = DEFAULT_CHUNKSIZE, cache=None) -> Catalog:
+    """This method is designed to load a catalog of .torrent files in
+    a pool of processes. See iter_catalog.
+
+    Returns
+    -------
+    Catalog
+        The summaries of the .torrent files that were loaded and the
+        errors of the files that could not be loaded.
+    """
+    catalog = Catalog([], [])
+    for result in iter_catalog(source, workers, chunksize, cache):
+        if isinstance(result, CatalogError):
+            catalog.errors.append(result)
+        else:
+            catalog.summaries.append(result)
+
+    return catalog
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+import bittorrent.bencoding as bencoding
+from bittorrent import catalog
+
+
+class CatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.info_hashes = {}
+
+        os.mkdir(os.path.join(self.directory.name, 'sub'))
+        for i in range(6):
+            info = {
+                b'length': 1000 * (i + 1),
+                b'name': 'file-{}'.format(i).encode(),
+                b'piece length': 512,
+                b'pieces': hashlib.sha1(bytes([i])).digest() * (2 * i + 2),
+            }
+            contents = bencoding.encode({
+                b'announce': b'http://tracker.example.org/announce',
+                b'info': info,
+            })
+            path = os.path.join(
+                self.directory.name, 'sub' if i % 2 else '',
+                '{}.torrent'.format(i)
+            )
+            with open(path, 'wb') as f:
+                f.write(contents)
+            self.info_hashes[path] = hashlib.sha1(
+                bencoding.encode(info)
+            ).digest()
+
+        self.invalid_path = os.path.join(
+            self.directory.name, 'invalid.torrent'
+        )
+        with open(self.invalid_path, 'wb') as f:
+            f.write(b'd8:announcei1ee')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_catalog(self):
+        for workers in (1, 2):
+            result = catalog.load_catalog(
+                self.directory.name, workers=workers, chunksize=2
+            )
+
+            self.assertEqual(len(result.summaries), 6)
+            self.assertEqual(
+                {s.path: s.info_hash for s in result.summaries},
+                self.info_hashes
+            )
+            self.assertEqual(len(result.errors), 1)
+            self.assertEqual(result.errors[0].path, self.invalid_path)
+
+    def test_summary(self):
+        path = sorted(self.info_hashes)[0]
+
+        summary = catalog.load_summary(path)
+
+        self.assertEqual(summary.name, 'file-0')
+        self.assertEqual(summary.total_length, 1000)
+        self.assertEqual(summary.piece_count, 2)
+        self.assertEqual(
+            summary.announce_list, ('http://tracker.example.org/announce',)
+        )
+        self.assertFalse(summary.private)
+
+    def test_non_utf8_names(self):
+        path = os.path.join(self.directory.name, 'latin-1.torrent')
+        with open(path, 'wb') as f:
+            f.write(bencoding.encode({
+                b'announce': b'http://tracker.example.org/announce',
+                b'info': {
+                    b'files': [{b'length': 10, b'path': [b'caf\xe9.txt']}],
+                    b'name': b'r\xe9pertoire',
+                    b'piece length': 512,
+                    b'pieces': b'\x01' * 20,
+                },
+            }))
+
+        summary = catalog.load_summary(path)
+
+        self.assertIsInstance(summary, catalog.TorrentSummary)
+        self.assertEqual(
+            summary.name.encode('utf-8', 'surrogateescape'), b'r\xe9pertoire'
+        )
+        self.assertEqual(
+            summary.files[0][0].encode('utf-8', 'surrogateescape'),
+            b'caf\xe9.txt'
+        )
+
+    def test_missing_file(self):
+        result = catalog.load_summary(
+            os.path.join(self.directory.name, 'missing.torrent')
+        )
+
+        self.assertIsInstance(result, catalog.CatalogError)
+        self.assertTrue(result.error.startswith('FileNotFoundError'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import asyncio
+import heapq
+import random
+import time
+
+from bittorrent.messages import Choke, Unchoke
+from bittorrent.rate import RateEstimator
+
+
+DEFAULT_UPLOAD_SLOTS = 4
+DEFAULT_INTERVAL = 10.0
+# The optimistic unchoke rotates every third tick, i.e. every 30 seconds.
+DEFAULT_OPTIMISTIC_TICKS = 3
+# Peers connected for less than this many ticks are three times as likely
+# to be unchoked optimistically, as they have no pieces to trade yet.
+_NEW_PEER_TICKS = 3
+_NEW_PEER_WEIGHT = 3
+
+
+class _ChokerPeer(object):
+    __slots__ = ('peer', 'interested', 'choked', 'download', 'upload',
+                 'ticks')
+
+    def __init__(self, peer, now):
+        self.peer = peer
+        self.interested = False
+        self.choked = True
+        self.download = RateEstimator(now=now)
+        self.upload = RateEstimator(now=now)
+        self.ticks = 0
+
+
+class Choker(object):
+    """The Choker class is designed to decide which peers are allowed to
+    download from the local peer (tit-for-tat). On each tick, every
+    interval seconds, the interested peers are ranked by the rate they
+    upload to the local peer, or by the rate they download from it when
+    seeding, and the upload_slots best ones are unchoked. One more
+    interested peer is unchoked optimistically, whatever its rate, so that
+    new peers can start trading and better peers can be discovered. The
+    optimistic unchoke rotates every optimistic_ticks ticks.
+
+    Rates are measured over the last few seconds with a RateEstimator per
+    peer and direction. A tick ranks the peers with a partial sort,
+    O(peers log upload_slots), and returns only the Choke and Unchoke
+    messages of the peers whose state changes, so that they can be sent
+    in one batch.
+
+    Parameters
+    ----------
+    upload_slots : int
+        The number of peers unchoked for their rate.
+    interval : float
+        The number of seconds between ticks, used by run.
+    optimistic_ticks : int
+        The number of ticks between rotations of the optimistic unchoke.
+    seed : int
+        The seed of the optimistic unchoke's random choice.
+    """
+
+    def __init__(self, upload_slots: int = DEFAULT_UPLOAD_SLOTS,
+                 interval: float = DEFAULT_INTERVAL,
+                 optimistic_ticks: int = DEFAULT_OPTIMISTIC_TICKS,
+                 seed: int = None):
+        self.upload_slots = upload_slots
+        self.interval = interval
+        self.optimistic_ticks = optimistic_ticks
+
+        self._rng = random.Random(seed)
+        self._peers = {}
+        self._optimistic = None
+        self._ticks = 0
+
+    def __len__(self):
+        return len(self._peers)
+
+    @property
+    def optimistic(self):
+        """Returns the optimistically unchoked peer, None if there is
+        none.
+        """
+        return self._optimistic.peer if self._optimistic is not None else None
+
+    def unchoked(self) -> list:
+        """Returns the peers that are not choked."""
+        return [p.peer for p in self._peers.values() if not p.choked]
+
+    def add_peer(self, peer, now: float = None):
+        """This method adds a peer, choked and not interested."""
+        if now is None:
+            now = time.monotonic()
+
+        self._peers[peer] = _ChokerPeer(peer, now)
+
+    def remove_peer(self, peer):
+        """This method removes a disconnected peer. Its slot is given to
+        another peer on the next tick.
+        """
+        state = self._peers.pop(peer)
+        if state is self._optimistic:
+            self._optimistic = None
+
+    def set_interested(self, peer, interested: bool):
+        """This method updates whether a peer is interested in the local
+        peer's pieces, i.e. on Interested and NotInterested messages.
+        """
+        self._peers[peer].interested = interested
+
+    def record_download(self, peer, nbytes: int, now: float = None):
+        """This method counts bytes downloaded from a peer."""
+        self._peers[peer].download.update(nbytes, now)
+
+    def record_upload(self, peer, nbytes: int, now: float = None):
+        """This method counts bytes uploaded to a peer."""
+        self._peers[peer].upload.update(nbytes, now)
+
+    def is_choked(self, peer) -> bool:
+        """Returns True if the peer is choked."""
+        return self._peers[peer].choked
+
+    def tick(self, seeding: bool = False, now: float = None) -> list:
+        """This method is designed to choose the peers to unchoke.
+
+        Parameters
+        ----------
+        seeding : bool
+            If True, the peers are ranked by the rate they download from
+            the local peer, otherwise by the rate they upload to it.
+        now : float
+            The current time, time.monotonic() if None.
+
+        Returns
+        -------
+        list of (object, Choke or Unchoke)
+            The messages to send to the peers whose state changed.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        interested = []
+        for state in self._peers.values():
+            state.ticks += 1
+            if state.interested:
+                interested.append(state)
+
+        if seeding:
+            def rate(state):
+                return state.upload.rate(now)
+        else:
+            def rate(state):
+                return state.download.rate(now)
+        best = heapq.nlargest(self.upload_slots, interested, key=rate)
+        unchoke = set(best)
+
+        optimistic = self._optimistic
+        if optimistic is None or not optimistic.interested \
+                or optimistic in unchoke \
+                or self._ticks % self.optimistic_ticks == 0:
+            optimistic = self._choose_optimistic(interested, unchoke)
+        self._optimistic = optimistic
+        if optimistic is not None:
+            unchoke.add(optimistic)
+        self._ticks += 1
+
+        messages = []
+        for state in self._peers.values():
+            choked = state not in unchoke
+            if choked != state.choked:
+                state.choked = choked
+                messages.append((state.peer, Choke() if choked else Unchoke()))
+
+        return messages
+
+    async def run(self, send=None, seeding=None):
+        """This method is designed to tick every interval seconds until
+        cancelled.
+
+        Parameters
+        ----------
+        send : callable
+            Called as send(peer, message) with the messages of each tick.
+            By default, peer.send(message) is called, as done by
+            PeerConnection.
+        seeding : callable
+            Returns whether the torrent is complete, see Choker.tick.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            for peer, message in self.tick(
+                    seeding() if seeding is not None else False):
+                if send is not None:
+                    send(peer, message)
+                else:
+                    peer.send(message)
+
+    def _choose_optimistic(self, interested, unchoke):
+        """This method chooses an interested peer among those not unchoked
+        for their rate, new peers being more likely to be chosen.
+        """
+        candidates = [s for s in interested if s not in unchoke]
+        if not candidates:
+            return None
+
+        weights = [
+            _NEW_PEER_WEIGHT if s.ticks <= _NEW_PEER_TICKS else 1
+            for s in candidates
+        ]
+        return self._rng.choices(candidates, weights)[0]
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from bittorrent.choker import Choker
+from bittorrent.messages import Choke, Unchoke
+
+
+class ChokerTest(unittest.TestCase):
+
+    def make_choker(self, peer_count, **kwargs):
+        choker = Choker(upload_slots=2, seed=0, **kwargs)
+        for peer in range(peer_count):
+            choker.add_peer(peer, now=0.0)
+            choker.set_interested(peer, True)
+        return choker
+
+    def test_tit_for_tat(self):
+        choker = self.make_choker(6)
+        for peer in range(6):
+            choker.record_download(peer, 1000 * peer, now=1.0)
+            choker.record_upload(peer, 1000 * (6 - peer), now=1.0)
+
+        messages = choker.tick(now=2.0)
+        unchoked = {peer for peer, m in messages if m is Unchoke()}
+        self.assertTrue({4, 5} < unchoked)
+        self.assertEqual(len(unchoked), 3)
+        self.assertIn(choker.optimistic, {0, 1, 2, 3})
+        self.assertTrue(all(m is Unchoke() for _, m in messages))
+
+        # Only the changes are sent.
+        optimistic = choker.optimistic
+        self.assertEqual(choker.tick(now=3.0), [])
+
+        choker.set_interested(5, False)
+        messages = choker.tick(now=4.0)
+        self.assertIn((5, Choke()), messages)
+        self.assertEqual(len(choker.unchoked()), 3)
+        self.assertIn(optimistic, choker.unchoked())
+
+        # When seeding, the peers are ranked by upload rate.
+        messages = choker.tick(seeding=True, now=5.0)
+        self.assertTrue({0, 1} <= set(choker.unchoked()))
+        self.assertNotIn(5, choker.unchoked())
+
+    def test_optimistic_rotation(self):
+        choker = self.make_choker(20, optimistic_ticks=2)
+        seen = set()
+        for tick in range(40):
+            choker.tick(now=float(tick))
+            seen.add(choker.optimistic)
+            self.assertEqual(len(choker.unchoked()), 3)
+
+        self.assertGreater(len(seen), 5)
+
+        choker.remove_peer(choker.optimistic)
+        self.assertIsNone(choker.optimistic)
+        choker.tick(now=41.0)
+        self.assertIsNotNone(choker.optimistic)
+
+    def test_run(self):
+        class Peer(object):
+            def __init__(self):
+                self.sent = []
+
+            def send(self, message):
+                self.sent.append(message)
+
+        async def run():
+            choker = Choker(interval=0.01)
+            peer = Peer()
+            choker.add_peer(peer)
+            choker.set_interested(peer, True)
+            task = asyncio.ensure_future(choker.run())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            self.assertEqual(peer.sent, [Unchoke()])
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
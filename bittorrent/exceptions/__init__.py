@@ -3,7 +3,8 @@ from .exceptions import (
     InvalidTorrentFileBencoding,
     InvalidMessageStructure,
     IncorrectInfoHash,
-    InvalidBitfieldLength
+    InvalidBitfieldLength,
+    InvalidTorrentFilePath
 )
 
 __all__ = [
@@ -11,7 +12,8 @@ __all__ = [
     'InvalidTorrentFileBencoding',
     'InvalidMessageStructure',
     'IncorrectInfoHash',
-    'InvalidBitfieldLength'
+    'InvalidBitfieldLength',
+    'InvalidTorrentFilePath'
 ]
 
 
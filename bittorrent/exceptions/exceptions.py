@@ -28,5 +28,11 @@ class InvalidBitfieldLength(Exception):
         super().__init__(message)
 
 
+class InvalidTorrentFilePath(Exception):
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
 if __name__ == "__main__":
     pass
@@ -0,0 +1,267 @@
+import bisect
+import collections
+import os
+import re
+
+from bittorrent.exceptions import InvalidTorrentFilePath
+
+
+# A Windows drive, e.g. 'C:'.
+_DRIVE = re.compile(r'^[A-Za-z]:')
+
+
+FileEntry = collections.namedtuple(
+    'FileEntry', ['index', 'path', 'length', 'offset']
+)
+FileEntry.__doc__ = """A file of a torrent.
+
+Attributes
+----------
+index : int
+    The index of the file in the torrent's file list.
+path : str
+    The path of the file relative to the download directory. The files of
+    a multi-file torrent are placed in a directory named after the torrent.
+length : int
+    The length of the file in bytes.
+offset : int
+    The offset of the file's first byte in the torrent's concatenated data.
+"""
+
+Segment = collections.namedtuple(
+    'Segment', ['file', 'file_offset', 'length']
+)
+Segment.__doc__ = """A contiguous part of a piece stored in a single file.
+
+Attributes
+----------
+file : FileEntry
+    The file the segment is stored in.
+file_offset : int
+    The offset of the segment's first byte in the file.
+length : int
+    The length of the segment in bytes.
+"""
+
+
+def _path_part(part) -> str:
+    """This method decodes a component of a file path of a torrent and
+    checks that it names an entry of the directory it is joined to.
+    Components that are not valid UTF-8 are decoded with the
+    surrogateescape error handler, as file names are.
+    """
+    part = str(part, 'utf-8', 'surrogateescape')
+
+    if part in ('', '.', '..') or '\x00' in part \
+            or '/' in part or '\\' in part \
+            or os.sep in part or (os.altsep and os.altsep in part) \
+            or os.path.isabs(part) or _DRIVE.match(part):
+        raise InvalidTorrentFilePath(
+            'Invalid file path component: {!r}'.format(part)
+        )
+
+    return part
+
+
+class FileLayout(object):
+    """The FileLayout class is designed to map the pieces of a torrent to
+    the files they are stored in. The torrent's data is the concatenation
+    of its files in order, pieces are consecutive spans of piece_length
+    bytes of it (except the last one which may be shorter).
+
+    The file offsets are computed once, as such, locating the file holding
+    a byte of the torrent is a binary search over the offsets.
+
+    Parameters
+    ----------
+    files : iterable of (str, int)
+        The relative path and the length of each file, in order.
+    piece_length : int
+        The length of the torrent's pieces in bytes.
+
+    Raises
+    ------
+    ValueError
+        A ValueError is raised if the piece length is not positive or if a
+        file length is negative.
+    """
+
+    def __init__(self, files, piece_length: int):
+        if piece_length <= 0:
+            raise ValueError(
+                'The piece length must be positive. Obtained: {}'.format(
+                    piece_length
+                )
+            )
+
+        entries = []
+        offset = 0
+        for index, (path, length) in enumerate(files):
+            if length < 0:
+                raise ValueError(
+                    'The length of {} is negative.'.format(path)
+                )
+            entries.append(FileEntry(index, path, length, offset))
+            offset += length
+
+        self.files = tuple(entries)
+        self.piece_length = piece_length
+        self.total_length = offset
+        self.piece_count = -(-offset // piece_length)
+
+        self._offsets = [entry.offset for entry in entries]
+
+    @classmethod
+    def from_torrent(cls, torrent):
+        """This method is designed to return the FileLayout of a Torrent
+        instance.
+
+        Raises
+        ------
+        bittorrent.exceptions.InvalidTorrentFilePath
+            An InvalidTorrentFilePath exception is raised if the torrent's
+            name or a component of a file's path is empty, '.' or '..',
+            absolute, a drive or contains a path separator, i.e. if a file
+            could be placed outside of the download directory.
+        """
+        info = torrent[b'info']
+        name = _path_part(info[b'name'])
+
+        if b'files' not in info:
+            files = [(name, info[b'length'])]
+        else:
+            files = []
+            for f in info[b'files']:
+                if not f[b'path']:
+                    raise InvalidTorrentFilePath('A file path is empty.')
+                files.append((
+                    os.path.join(name, *map(_path_part, f[b'path'])),
+                    f[b'length']
+                ))
+
+        return cls(files, info[b'piece length'])
+
+    def __len__(self):
+        return len(self.files)
+
+    def __repr__(self):
+        return '{}(<{} files, {} pieces>)'.format(
+            type(self).__name__, len(self.files), self.piece_count
+        )
+
+    def piece_size(self, piece: int) -> int:
+        """Returns the length, in bytes, of the piece at index piece."""
+        if not 0 <= piece < self.piece_count:
+            raise IndexError('Piece index out of range: {}'.format(piece))
+
+        return min(
+            self.piece_length, self.total_length - piece * self.piece_length
+        )
+
+    def file_at(self, offset: int) -> FileEntry:
+        """Returns the file holding the byte at offset in the torrent's
+        concatenated data. Empty files never hold a byte.
+        """
+        if not 0 <= offset < self.total_length:
+            raise IndexError('Offset out of range: {}'.format(offset))
+
+        return self.files[bisect.bisect_right(self._offsets, offset) - 1]
+
+    def segments(self, piece: int, begin: int = 0, length: int = None) -> list:
+        """This method is designed to map a block of a piece to the file
+        segments it is stored in.
+
+        Parameters
+        ----------
+        piece : int
+            The index of the piece.
+        begin : int
+            The offset of the block within the piece.
+        length : int
+            The length of the block. Defaults to the rest of the piece.
+
+        Returns
+        -------
+        list of Segment
+            The segments of the block, in order. Their lengths add up to
+            the length of the block. Empty files are skipped.
+
+        Raises
+        ------
+        IndexError
+            An IndexError is raised if the piece index is out of range.
+        ValueError
+            A ValueError is raised if the block does not fit in the piece.
+        """
+        piece_size = self.piece_size(piece)
+        if length is None:
+            length = piece_size - begin
+        if begin < 0 or length < 0 or begin + length > piece_size:
+            raise ValueError(
+                'The block (begin={}, length={}) does not fit in piece {} '
+                'of length {}.'.format(begin, length, piece, piece_size)
+            )
+
+        return self.segments_at(piece * self.piece_length + begin, length)
+
+    def segments_at(self, offset: int, length: int) -> list:
+        """This method is designed to map a span of the torrent's
+        concatenated data, which may cover several pieces, to the file
+        segments it is stored in.
+
+        Parameters
+        ----------
+        offset : int
+            The offset of the span in the torrent's concatenated data.
+        length : int
+            The length of the span.
+
+        Returns
+        -------
+        list of Segment
+            The segments of the span, in order. Empty files are skipped.
+
+        Raises
+        ------
+        ValueError
+            A ValueError is raised if the span is out of range.
+        """
+        if offset < 0 or length < 0 or offset + length > self.total_length:
+            raise ValueError(
+                'The span (offset={}, length={}) is out of range.'.format(
+                    offset, length
+                )
+            )
+
+        files = self.files
+        index = bisect.bisect_right(self._offsets, offset) - 1
+
+        segments = []
+        while length > 0:
+            entry = files[index]
+            file_offset = offset - entry.offset
+            span = min(length, entry.length - file_offset)
+            if span > 0:
+                segments.append(Segment(entry, file_offset, span))
+                offset += span
+                length -= span
+            index += 1
+
+        return segments
+
+    def piece_range(self, file_index: int) -> range:
+        """Returns the range of the indices of the pieces overlapping the
+        file at file_index. The range is empty for an empty file.
+        """
+        entry = self.files[file_index]
+        if entry.length == 0:
+            return range(0)
+
+        return range(
+            entry.offset // self.piece_length,
+            (entry.offset + entry.length - 1) // self.piece_length + 1
+        )
+
+
+if __name__ == "__main__":
+    pass
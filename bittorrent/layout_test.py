@@ -0,0 +1,100 @@
+import os
+import unittest
+
+from bittorrent.exceptions import InvalidTorrentFilePath
+from bittorrent.layout import FileLayout
+
+
+class FileLayoutTest(unittest.TestCase):
+
+    def setUp(self):
+        # 0        10 10  25       40
+        # |   a    |e| b  |   c    |
+        self.layout = FileLayout(
+            [('a', 10), ('e', 0), ('b', 15), ('c', 15)], piece_length=16
+        )
+
+    def test_properties(self):
+        self.assertEqual(self.layout.total_length, 40)
+        self.assertEqual(self.layout.piece_count, 3)
+        self.assertEqual(self.layout.piece_size(0), 16)
+        self.assertEqual(self.layout.piece_size(2), 8)
+        self.assertEqual(self.layout.file_at(10).path, 'b')
+        self.assertEqual(self.layout.file_at(39).path, 'c')
+
+        with self.assertRaises(IndexError):
+            self.layout.piece_size(3)
+
+    def test_segments(self):
+        segments = [
+            (s.file.path, s.file_offset, s.length)
+            for s in self.layout.segments(0)
+        ]
+        self.assertEqual(segments, [('a', 0, 10), ('b', 0, 6)])
+
+        segments = [
+            (s.file.path, s.file_offset, s.length)
+            for s in self.layout.segments(1, 4, 10)
+        ]
+        self.assertEqual(segments, [('b', 10, 5), ('c', 0, 5)])
+
+        segments = [
+            (s.file.path, s.file_offset, s.length)
+            for s in self.layout.segments(2)
+        ]
+        self.assertEqual(segments, [('c', 7, 8)])
+
+        with self.assertRaises(ValueError):
+            self.layout.segments(2, 4, 5)
+
+    def test_piece_range(self):
+        self.assertEqual(self.layout.piece_range(0), range(0, 1))
+        self.assertEqual(self.layout.piece_range(1), range(0))
+        self.assertEqual(self.layout.piece_range(2), range(0, 2))
+        self.assertEqual(self.layout.piece_range(3), range(1, 3))
+
+    def test_consistency(self):
+        layout = FileLayout(
+            [(str(i), length) for i, length in enumerate([7, 0, 1, 33, 5])],
+            piece_length=8
+        )
+        covered = [0] * len(layout)
+        for piece in range(layout.piece_count):
+            for s in layout.segments(piece):
+                self.assertIn(piece, layout.piece_range(s.file.index))
+                covered[s.file.index] += s.length
+
+        self.assertEqual(covered, [f.length for f in layout.files])
+
+    def test_from_torrent(self):
+        def torrent(name, *paths):
+            return {b'info': {
+                b'name': name, b'piece length': 16,
+                b'files': [{b'path': p, b'length': 1} for p in paths]
+            }}
+
+        layout = FileLayout.from_torrent(torrent(b't', [b'd', b'a'], [b'b']))
+        self.assertEqual(
+            [f.path for f in layout.files],
+            [os.path.join('t', 'd', 'a'), os.path.join('t', 'b')]
+        )
+
+        layout = FileLayout.from_torrent(torrent(b't', [b'\xff\xfe.bin']))
+        self.assertEqual(
+            os.fsencode(layout.files[0].path),
+            os.path.join(b't', b'\xff\xfe.bin')
+        )
+
+        for name, path in [
+            (b'..', [b'a']), (b'', [b'a']), (b'/etc', [b'a']),
+            (b't', []), (b't', [b'..', b'..', b'escaped']),
+            (b't', [b'.']), (b't', [b'']), (b't', [b'/etc', b'passwd']),
+            (b't', [b'a/../../b']), (b't', [b'a\\b']),
+            (b't', [b'C:', b'a']), (b't', [b'c:a']), (b't', [b'a\x00'])
+        ]:
+            with self.assertRaises(InvalidTorrentFilePath, msg=(name, path)):
+                FileLayout.from_torrent(torrent(name, path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ from .message import (
     Have, Bitfield, Request, Piece, Cancel, Port
 )
 from .message_decoder import decode_message
+from .frame_parser import FrameParser
 
 __all__ = [
     'Handshake',
@@ -17,7 +18,8 @@ __all__ = [
     'Piece',
     'Cancel',
     'Port',
-    'decode_message'
+    'decode_message',
+    'FrameParser'
 ]
 
 
@@ -0,0 +1,207 @@
+import bittorrent.exceptions as exceptions
+from . import message as msg
+from .message_decoder import MessageDecoder
+
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+# Piece messages carry blocks of 16 KiB, the largest messages are the
+# bitfields of torrents with millions of pieces.
+DEFAULT_MAX_FRAME_SIZE = 1024 * 1024
+
+
+class FrameParser(object):
+    """The FrameParser class is designed to split a stream of bytes
+    received from a peer into BT messages. Received data can be of any
+    size: messages are returned as soon as their last byte is received and
+    the bytes of an incomplete message are kept until the rest arrives.
+
+    The received bytes are stored in a single buffer along with a read
+    offset, as such, decoded messages are not sliced off the front of the
+    buffer. Data can be received directly into the buffer with
+    get_buffer/buffer_updated (as done by asyncio.BufferedProtocol) or
+    with recv_into.
+
+    The blocks of Piece messages are returned as read-only memoryview
+    slices of the buffer rather than copies. Once such a view is handed
+    out, the region of the buffer it covers is never written again: when
+    room is needed, the parser moves to a new buffer and the old one is
+    released once the views are.
+
+    Parameters
+    ----------
+    handshake : bool
+        If True, the first message expected is a handshake, whose framing
+        (<pstrlen><pstr><reserved><info_hash><peer_id>) differs from the
+        length-prefixed framing of the other messages.
+    max_frame_size : int
+        The maximum length of a message. The length prefix of a larger
+        message raises an InvalidMessageStructure exception before its
+        payload is buffered.
+    buffer_size : int
+        The initial size of the buffer.
+    """
+
+    def __init__(self, handshake: bool = False,
+                 max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.max_frame_size = max_frame_size
+
+        self._expect_handshake = handshake
+        self._buffer_size = buffer_size
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._shared = False
+
+    @property
+    def pending(self) -> int:
+        """Returns the number of received bytes that are not decoded yet."""
+        return self._end - self._start
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        """This method returns a writable view of the free space at the
+        end of the buffer. Received data should be written at its start and
+        buffer_updated called with the number of bytes written.
+        """
+        free = len(self._buffer) - self._end
+        if free == 0 or free < sizehint:
+            self._make_room(max(sizehint, len(self._buffer) // 2, 1))
+
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes: int) -> list:
+        """This method is designed to decode the messages completed by the
+        nbytes written to the view returned by get_buffer.
+
+        Returns
+        -------
+        list of BaseMessage
+            The messages completed by the received data, in order.
+
+        Raises
+        ------
+        bittorrent.exceptions.InvalidMessageStructure
+            An InvalidMessageStructure exception is raised if a message
+            is invalid or larger than max_frame_size.
+        """
+        self._end += nbytes
+
+        return self._parse()
+
+    def feed(self, data) -> list:
+        """This method copies data to the buffer and decodes the messages
+        it completes. See FrameParser.buffer_updated.
+        """
+        data = memoryview(data).cast('B')
+        messages = []
+        while data:
+            view = self.get_buffer(len(data))
+            n = min(len(view), len(data))
+            view[:n] = data[:n]
+            data = data[n:]
+            messages.extend(self.buffer_updated(n))
+
+        return messages
+
+    def recv_into(self, sock) -> list:
+        """This method receives data from a socket directly into the
+        buffer and decodes the messages it completes. See
+        FrameParser.buffer_updated.
+
+        Raises
+        ------
+        EOFError
+            An EOFError is raised if the peer closed the connection.
+        """
+        n = sock.recv_into(self.get_buffer())
+        if n == 0:
+            raise EOFError('The connection was closed by the peer.')
+
+        return self.buffer_updated(n)
+
+    def _make_room(self, size):
+        """This method makes room for at least size bytes after the
+        received data. The buffer is never resized: the event loop or a
+        decoded Piece message may still hold a view of it.
+        """
+        pending = self._end - self._start
+        if self._shared or len(self._buffer) - pending < size:
+            buffer = bytearray(max(self._buffer_size, pending + size))
+            buffer[:pending] = self._view[self._start:self._end]
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+            self._shared = False
+        elif self._start:
+            self._view[:pending] = self._view[self._start:self._end]
+        self._start = 0
+        self._end = pending
+
+    def _parse(self):
+        view = self._view
+        start = self._start
+        end = self._end
+        messages = []
+
+        while True:
+            available = end - start
+
+            if self._expect_handshake:
+                if available < 1:
+                    break
+                if view[start] != len(msg.BITTORRENT_PSTR_V1):
+                    raise exceptions.InvalidMessageStructure(
+                        'Unknown protocol in handshake.'
+                    )
+                if available < msg.Handshake.LENGTH:
+                    break
+                if view[start+1:start+20] != msg.BITTORRENT_PSTR_V1:
+                    raise exceptions.InvalidMessageStructure(
+                        'Unknown protocol in handshake.'
+                    )
+                stop = start + msg.Handshake.LENGTH
+                messages.append(msg.Handshake.from_bytes(
+                    bytes(view[start:stop])
+                ))
+                self._expect_handshake = False
+                start = stop
+                continue
+
+            if available < 4:
+                break
+            length = int.from_bytes(view[start:start+4], 'big')
+            if length > self.max_frame_size:
+                raise exceptions.InvalidMessageStructure(
+                    'Message of {} bytes exceeds the maximum of {} '
+                    'bytes.'.format(length, self.max_frame_size)
+                )
+            stop = start + 4 + length
+            if stop > end:
+                break
+
+            if length and view[start+4] == msg.Piece.ID:
+                # The block is a view of the buffer.
+                messages.append(msg.Piece.from_bytes(view[start:stop]))
+                self._shared = True
+            else:
+                messages.append(
+                    MessageDecoder.decode_message(view[start:stop])
+                )
+            start = stop
+
+        if start == end and not self._shared:
+            start = end = 0
+        self._start = start
+        self._end = end
+
+        # Make room for the rest of an incomplete message.
+        if not self._expect_handshake and end - start >= 4:
+            length = int.from_bytes(view[start:start+4], 'big')
+            if start + 4 + length > len(self._buffer):
+                self._make_room(4 + length - (end - start))
+
+        return messages
+
+
+if __name__ == "__main__":
+    pass
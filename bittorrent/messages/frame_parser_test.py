@@ -0,0 +1,85 @@
+import socket
+import unittest
+
+import bittorrent.exceptions as exceptions
+import bittorrent.messages.message as bt_msg
+from bittorrent.messages.frame_parser import FrameParser
+
+
+class FrameParserTest(unittest.TestCase):
+
+    def setUp(self):
+        self.handshake = bt_msg.Handshake(b'\x01' * 20, b'\x02' * 20)
+        self.messages = [
+            bt_msg.KeepAlive(),
+            bt_msg.Bitfield(b'\xf0' * 5000),
+            bt_msg.Piece(0, 0, bytes(range(256)) * 64),
+            bt_msg.Have(7),
+            bt_msg.Piece(0, 16384, b'\x01' * 16384),
+            bt_msg.Request(1, 0, 16384),
+            bt_msg.Piece(2, 0, b''),
+        ]
+        self.data = b''.join(m.to_bytes() for m in self.messages)
+
+    def test_chunks(self):
+        for chunk_size in (1, 3, 100, 16397, len(self.data)):
+            parser = FrameParser(buffer_size=1024)
+            received = []
+            for i in range(0, len(self.data), chunk_size):
+                received.extend(parser.feed(self.data[i:i+chunk_size]))
+
+            self.assertEqual(received, self.messages)
+            self.assertEqual(parser.pending, 0)
+            self.assertIsInstance(received[2].block, memoryview)
+
+    def test_zero_copy_blocks(self):
+        parser = FrameParser(buffer_size=1 << 16)
+        blocks = [
+            m.block for m in parser.feed(self.data)
+            if isinstance(m, bt_msg.Piece)
+        ]
+        # More data reuses the buffer but must not overwrite the blocks.
+        for _ in range(8):
+            parser.feed(self.data)
+
+        self.assertEqual(
+            blocks,
+            [m.block for m in self.messages if isinstance(m, bt_msg.Piece)]
+        )
+        self.assertTrue(blocks[0].readonly)
+
+    def test_handshake(self):
+        parser = FrameParser(handshake=True)
+        data = self.handshake.to_bytes() + self.data
+
+        self.assertEqual(parser.feed(data[:60]), [])
+        self.assertEqual(
+            parser.feed(data[60:]), [self.handshake] + self.messages
+        )
+
+        with self.assertRaises(exceptions.InvalidMessageStructure):
+            FrameParser(handshake=True).feed(b'\x13' + b'x' * 67)
+        with self.assertRaises(exceptions.InvalidMessageStructure):
+            FrameParser(handshake=True).feed(self.data)
+
+    def test_max_frame_size(self):
+        parser = FrameParser(max_frame_size=1000)
+        with self.assertRaises(exceptions.InvalidMessageStructure):
+            parser.feed(b'\x00\x10\x00\x00\x07')
+
+    def test_recv_into(self):
+        a, b = socket.socketpair()
+        with a, b:
+            parser = FrameParser()
+            a.sendall(self.data)
+            a.shutdown(socket.SHUT_WR)
+
+            received = []
+            with self.assertRaises(EOFError):
+                while True:
+                    received.extend(parser.recv_into(b))
+            self.assertEqual(received, self.messages)
+
+
+if __name__ == "__main__":
+    unittest.main()
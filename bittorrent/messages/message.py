@@ -1,16 +1,26 @@
 import abc
 import struct
 
+from bittorrent.bitset import Bitset
+
 
 BITTORRENT_PSTR_V1 = b'BitTorrent protocol'
 
+_LENGTH = struct.Struct('>I')
+_ID_HEADER = struct.Struct('>IB')
+
 
 class BaseMessage(abc.ABC):
     """The BaseMessage class is abstract and serves to provide a foundation
     for other classes that wish to represent BT messages. All BT messages
     start with a 4-byte big-endian encoded string indicating the length of
     the total message.
+
+    Messages are immutable and slotted: subclasses declare their fields in
+    __slots__ and return them from _key, which is used for equality and
+    hashing.
     """
+    __slots__ = ('_msg_len',)
 
     def __init__(self, msg_len: int):
         self._msg_len = msg_len
@@ -19,15 +29,10 @@ class BaseMessage(abc.ABC):
         if type(other) is not type(self):
             return False
 
-        for val_other, val_self in zip(other.__dict__.values(), self.__dict__.values()):
-            if val_other != val_self:
-                return False
-
-        return True
+        return self._key() == other._key()
 
     def __hash__(self):
-        h = hash(tuple(self.__dict__.values()))
-        return h
+        return hash((type(self),) + self._key())
 
     def __ne__(self, other):
         return not self == other
@@ -43,6 +48,12 @@ class BaseMessage(abc.ABC):
         """Returns the message length."""
         return self._msg_len
 
+    def _key(self) -> tuple:
+        """Returns the values of the message's fields. The length and ID
+        of a message are implied by its type and fields.
+        """
+        return ()
+
     @classmethod
     @abc.abstractmethod
     def from_bytes(cls, payload: bytes):
@@ -68,7 +79,13 @@ class BaseMessage(abc.ABC):
             A big-endian encoded bytes string containing the message's
             length.
         """
-        return struct.pack('>I', self.msg_len)
+        return _LENGTH.pack(self.msg_len)
+
+    def to_buffers(self) -> tuple:
+        """This method returns the message as a tuple of bytes-like
+        objects whose concatenation is the message's bytes string.
+        """
+        return (self.to_bytes(),)
 
 
 class Handshake(BaseMessage):
@@ -98,7 +115,8 @@ class Handshake(BaseMessage):
     """
     LENGTH = len(BITTORRENT_PSTR_V1) + 49
     RESERVED = b'\x00' * 8
-    STRUCT = '>B19s8s20s20s'
+    STRUCT = struct.Struct('>B19s8s20s20s')
+    __slots__ = ('_pstr_len', '_pstr', '_reserved', '_info_hash', '_peer_id')
 
     def __init__(self, info_hash: bytes, peer_id: bytes):
         BaseMessage.__init__(self, Handshake.LENGTH)
@@ -106,8 +124,9 @@ class Handshake(BaseMessage):
         self._pstr = BITTORRENT_PSTR_V1
         self._reserved = Handshake.RESERVED
 
-        self._info_hash = info_hash
-        self._peer_id = peer_id
+        # The fields are part of the message's hash.
+        self._info_hash = bytes(info_hash)
+        self._peer_id = bytes(peer_id)
 
         if len(info_hash) != 20:
             raise ValueError('The info hash must be 20 bytes long.')
@@ -122,6 +141,9 @@ class Handshake(BaseMessage):
                 self.peer_id
             )
 
+    def _key(self) -> tuple:
+        return self._reserved, self._info_hash, self._peer_id
+
     @property
     def pstr_len(self) -> int:
         """Returns the handshake's protocol string length."""
@@ -156,15 +178,12 @@ class Handshake(BaseMessage):
                 Handshake.LENGTH + len(BITTORRENT_PSTR_V1)
             ))
 
-        unpacked_bytes = struct.unpack(Handshake.STRUCT, payload)
+        _, _, _, info_hash, peer_id = Handshake.STRUCT.unpack(payload)
 
-        handshake_msg = Handshake(unpacked_bytes[-2], unpacked_bytes[-1])
-
-        return handshake_msg
+        return Handshake(info_hash, peer_id)
 
     def to_bytes(self) -> bytes:
-        return struct.pack(
-            Handshake.STRUCT,
+        return Handshake.STRUCT.pack(
             self.pstr_len,
             self.pstr,
             self.reserved,
@@ -173,16 +192,52 @@ class Handshake(BaseMessage):
         )
 
 
-class KeepAlive(BaseMessage):
+class _Singleton(object):
+    """A mixin for the messages without payload, whose instances are all
+    equal: the class is instantiated once and that instance is returned by
+    every call, as such, creating or decoding such a message allocates
+    nothing. Its bytes string is also computed once.
+    """
+    __slots__ = ()
+
+    def __new__(cls):
+        instance = cls.__dict__.get('_instance')
+        if instance is None:
+            instance = super().__new__(cls)
+            instance._setup()
+            cls._instance = instance
+
+        return instance
+
+    def __init__(self):
+        # The instance was initialized by __new__.
+        pass
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return type(self), ()
+
+    def to_bytes(self) -> bytes:
+        return type(self)._bytes
+
+
+class KeepAlive(_Singleton, BaseMessage):
     """The KeepAlive class should be used to signal to a peer that a
     connection should be kept alive. The KeepAlive message should be
     zero bytes in length. If no KeepAlive is sent over a certain period
     of time, the connection should be closed.
     """
     LENGTH = 0
+    __slots__ = ()
 
-    def __init__(self):
+    def _setup(self):
         BaseMessage.__init__(self, KeepAlive.LENGTH)
+        KeepAlive._bytes = BaseMessage.to_bytes(self)
 
     @classmethod
     def from_bytes(cls, payload: bytes):
@@ -193,6 +248,7 @@ class KeepAlive(BaseMessage):
 
 
 class IDMessage(BaseMessage, abc.ABC):
+    __slots__ = ('_msg_id',)
 
     def __init__(self, msg_len: int, msg_id: int):
         BaseMessage.__init__(self, msg_len)
@@ -215,7 +271,7 @@ class IDMessage(BaseMessage, abc.ABC):
         bytes
             A byte string encoded according to BT protocol.
         """
-        return struct.pack('>IB', self.msg_len, self.msg_id)
+        return _ID_HEADER.pack(self.msg_len, self.msg_id)
 
     @classmethod
     def from_bytes(cls, payload: bytes):
@@ -227,54 +283,54 @@ class IDMessage(BaseMessage, abc.ABC):
         return msg
 
 
-class Choke(IDMessage):
+class _StateMessage(_Singleton, IDMessage):
+    """The base class of the Choke, Unchoke, Interested and NotInterested
+    messages, which only consist of a length prefix and an ID.
+    """
+    LENGTH = 1
+    __slots__ = ()
+
+    def _setup(self):
+        IDMessage.__init__(self, self.LENGTH, self.ID)
+        type(self)._bytes = IDMessage.to_bytes(self)
+
+
+class Choke(_StateMessage):
     """The choke message should be sent to signal to a
     peer that it is choked. It's structure is as follows:
         <len=0001><id=0>
     """
-    LENGTH = 1
     ID = 0
-
-    def __init__(self):
-        IDMessage.__init__(self, Choke.LENGTH, Choke.ID)
+    __slots__ = ()
 
 
-class Unchoke(IDMessage):
+class Unchoke(_StateMessage):
     """An unchoke message is sent from one peer to the next to indicate
     that is no longer chocked. Its structure is as follows:
         <len=0001><id=1>
     """
-    LENGTH = 1
     ID = 1
-
-    def __init__(self):
-        IDMessage.__init__(self, Unchoke.LENGTH, Unchoke.ID)
+    __slots__ = ()
 
 
-class Interested(IDMessage):
+class Interested(_StateMessage):
     """An Interested message should be sent from one peer to the next
     to indicate that they are interested in receiving data from the
     given peer. Such messages have the following structure:
         <len=0001><id=2>
     """
-    LENGTH = 1
     ID = 2
-
-    def __init__(self):
-        IDMessage.__init__(self, Interested.LENGTH, Interested.ID)
+    __slots__ = ()
 
 
-class NotInterested(IDMessage):
+class NotInterested(_StateMessage):
     """A NotInterested message should be sent from one peer to the next
     to indicate that they are no longer interested in receiving data from
     the given peer. Such messages have the following structure:
         <len=0001><id=3>
     """
-    LENGTH = 1
     ID = 3
-
-    def __init__(self):
-        IDMessage.__init__(self, NotInterested.LENGTH, NotInterested.ID)
+    __slots__ = ()
 
 
 class Have(IDMessage):
@@ -290,12 +346,16 @@ class Have(IDMessage):
     """
     LENGTH = 5
     ID = 4
-    STRUCT = '>IBI'
+    STRUCT = struct.Struct('>IBI')
+    __slots__ = ('_piece_index',)
 
     def __init__(self, piece_index: int):
         IDMessage.__init__(self, Have.LENGTH, Have.ID)
         self._piece_index = piece_index
 
+    def _key(self) -> tuple:
+        return self._piece_index,
+
     def __str__(self):
         return super(Have, self).__str__() \
             + '<piece_index={}>'.format(self.piece_index)
@@ -310,16 +370,12 @@ class Have(IDMessage):
         if len(payload) != 9:
             raise ValueError('Expected a byte string of length 9.')
 
-        unpacked_bytes = struct.unpack(Have.STRUCT, payload)
-
-        have_msg = Have(unpacked_bytes[2])
+        _, _, piece_index = Have.STRUCT.unpack(payload)
 
-        return have_msg
+        return Have(piece_index)
 
     def to_bytes(self) -> bytes:
-        return struct.pack(
-            Have.STRUCT, self.msg_len, self.msg_id, self.piece_index
-        )
+        return Have.STRUCT.pack(Have.LENGTH, Have.ID, self._piece_index)
 
 
 class Bitfield(IDMessage):
@@ -346,7 +402,8 @@ class Bitfield(IDMessage):
     """
     BASE_LENGTH = 1
     ID = 5
-    STRUCT = '>IB{}s'
+    HEADER = _ID_HEADER
+    __slots__ = ('_bitfield',)
 
     def __init__(self, bitfield: bytes):
         IDMessage.__init__(
@@ -357,6 +414,9 @@ class Bitfield(IDMessage):
         if not isinstance(bitfield, bytes):
             raise ValueError('The bitfield parameter must be bytes.')
 
+    def _key(self) -> tuple:
+        return self._bitfield,
+
     def __str__(self):
         return super(Bitfield, self).__str__() \
             + '<bitfield={}>'.format(self.bitfield)
@@ -368,32 +428,41 @@ class Bitfield(IDMessage):
 
     @classmethod
     def from_bytes(cls, payload: bytes):
-        unpacked_bytes = struct.unpack(
-            Bitfield.STRUCT.format(len(payload) - Bitfield.BASE_LENGTH - 4),
-            payload
-        )
+        if len(payload) < Bitfield.HEADER.size:
+            raise ValueError('Expected a byte string of at least length {}.'
+                             .format(Bitfield.HEADER.size))
 
-        bitfield_msg = Bitfield(unpacked_bytes[2])
-
-        return bitfield_msg
+        return Bitfield(bytes(payload[Bitfield.HEADER.size:]))
 
     def to_bytes(self) -> bytes:
-        return struct.pack(
-            Bitfield.STRUCT.format(len(self.bitfield)),
-            self.msg_len,
-            self.msg_id,
-            self.bitfield
-        )
+        return Bitfield.HEADER.pack(self.msg_len, self.msg_id) \
+            + self.bitfield
+
+    @classmethod
+    def from_bitset(cls, bitset: Bitset):
+        """Returns the Bitfield message of a bitset."""
+        return cls(bitset.tobytes())
 
-    def pieces_status(self) -> list:
+    def bitset(self, length: int) -> Bitset:
+        """This method converts the message's bitfield to a Bitset of
+        length pieces. See Bitset.from_bytes.
+
+        Raises
+        ------
+        bittorrent.exceptions.InvalidBitfieldLength
+            An InvalidBitfieldLength exception is raised if the bitfield's
+            length does not match length or if its spare bits are set.
+        """
+        return Bitset.from_bytes(self.bitfield, length)
+
+    def pieces_status(self, length: int = None) -> list:
         """Returns a list of booleans whose values correspond to whether
-        the piece at index N has been downloaded or not."""
-        pieces = []
-        for byte_ in self.bitfield:
-            bits = bin(byte_).lstrip('0b')
-            for b in bits:
-                pieces.append(True if b == '1' else False)
-        return pieces
+        the piece at index N has been downloaded or not. If length is None,
+        the spare bits at the end of the bitfield are included."""
+        if length is None:
+            length = len(self.bitfield) * 8
+
+        return list(self.bitset(length))
 
 
 class Request(IDMessage):
@@ -411,7 +480,8 @@ class Request(IDMessage):
     """
     LENGTH = 13
     ID = 6
-    STRUCT = '>IBIII'
+    STRUCT = struct.Struct('>IBIII')
+    __slots__ = ('_index', '_begin', '_length')
 
     def __init__(self, index: int, begin: int, length: int):
         IDMessage.__init__(self, Request.LENGTH, Request.ID)
@@ -419,6 +489,9 @@ class Request(IDMessage):
         self._begin = begin
         self._length = length
 
+    def _key(self) -> tuple:
+        return self._index, self._begin, self._length
+
     def __str__(self):
         return IDMessage.__str__(self) \
             + '<index={}><begin={}><length={}>'.format(
@@ -445,22 +518,17 @@ class Request(IDMessage):
         if len(payload) != 17:
             raise ValueError('Expected a byte string of length 17.')
 
-        unpacked_bytes = struct.unpack(Request.STRUCT, payload)
-
-        request_msg = Request(
-            unpacked_bytes[2], unpacked_bytes[3], unpacked_bytes[4]
-        )
+        _, _, index, begin, length = Request.STRUCT.unpack(payload)
 
-        return request_msg
+        return Request(index, begin, length)
 
     def to_bytes(self) -> bytes:
-        return struct.pack(
-            Request.STRUCT,
-            self.msg_len,
-            self.msg_id,
-            self.index,
-            self.begin,
-            self.length
+        return Request.STRUCT.pack(
+            Request.LENGTH,
+            Request.ID,
+            self._index,
+            self._begin,
+            self._length
         )
 
 
@@ -469,29 +537,54 @@ class Piece(IDMessage):
     a piece block.
         <len=0009+X><id=7><index><begin><block>
 
+    The block is held as a read-only memoryview, as such, a Piece decoded
+    from a buffer refers to the block's bytes in that buffer instead of
+    copying them. The message can be sent as a header and payload pair
+    (see Piece.to_buffers) so that the block is not copied when sending.
+    Pieces are compared by the content of their blocks but hashed on the
+    length of their blocks only, as a view of a mutable buffer cannot be
+    hashed. A pickled Piece holds a copy of its block.
+
     Attributes
     ----------
     index : int
         The zero-based index of the requested piece (4 bytes).
     begin : int
         The zero-based byte offset within the piece of the block (4 bytes).
-    block : int
+    block : memoryview
         The block of data (variable length).
     """
     BASE_LENGTH = 9
     ID = 7
-    STRUCT = '>IBII{}s'
+    HEADER = struct.Struct('>IBII')
+    __slots__ = ('_index', '_begin', '_block')
 
     def __init__(self, index: int, begin: int, block: bytes):
-        IDMessage.__init__(self, Piece.BASE_LENGTH + len(block), Piece.ID)
+        if type(block) is not memoryview:
+            block = memoryview(block)
+        if block.format != 'B' or block.ndim != 1:
+            block = block.cast('B')
+        if not block.readonly:
+            block = block.toreadonly()
+
+        IDMessage.__init__(self, Piece.BASE_LENGTH + block.nbytes, Piece.ID)
         self._index = index
         self._begin = begin
         self._block = block
 
+    def _key(self) -> tuple:
+        return self._index, self._begin, self._block
+
+    def __hash__(self):
+        return hash((Piece, self._index, self._begin, self._block.nbytes))
+
+    def __reduce__(self):
+        return Piece, (self._index, self._begin, bytes(self._block))
+
     def __str__(self):
         return IDMessage.__str__(self) \
-            + '<index={}><begin={}><block={}>'.format(
-                self.index, self.begin, self.block
+            + '<index={}><begin={}><block=<{} bytes>>'.format(
+                self.index, self.begin, self.block.nbytes
             )
 
     @property
@@ -505,29 +598,50 @@ class Piece(IDMessage):
         return self._begin
 
     @property
-    def block(self) -> bytes:
-        """Returns the piece's block."""
+    def block(self) -> memoryview:
+        """Returns the piece's block as a read-only memoryview."""
         return self._block
 
     @classmethod
     def from_bytes(cls, payload: bytes):
-        str_len = len(payload)
-        unpacked_bytes = struct.unpack(
-            Piece.STRUCT.format(str_len - Piece.BASE_LENGTH - 4), payload
+        """This method decodes a Piece message without copying its block:
+        the block is a view of payload.
+
+        Parameters
+        ----------
+        payload : bytes, bytearray, or memoryview
+            The message, length prefix included.
+        """
+        view = memoryview(payload)
+        if len(view) < Piece.HEADER.size:
+            raise ValueError('Expected a byte string of at least length {}.'
+                             .format(Piece.HEADER.size))
+
+        msg_len, _, index, begin = Piece.HEADER.unpack_from(view)
+        if msg_len != len(view) - 4:
+            raise ValueError('Expected a byte string of length {}.'.format(
+                msg_len + 4
+            ))
+
+        return cls(index, begin, view[Piece.HEADER.size:])
+
+    def header(self) -> bytes:
+        """Returns the message's length prefix, ID, index and begin fields,
+        that is the message without its block.
+        """
+        return Piece.HEADER.pack(
+            self.msg_len, self.msg_id, self.index, self.begin
         )
-        piece = cls(unpacked_bytes[2], unpacked_bytes[3], unpacked_bytes[4])
 
-        return piece
+    def to_buffers(self) -> tuple:
+        """Returns the message as a (header, block) pair. Writing both
+        buffers with socket.sendmsg or a transport's writelines method
+        avoids copying the block into a single buffer.
+        """
+        return self.header(), self._block
 
     def to_bytes(self) -> bytes:
-        return struct.pack(
-            Piece.STRUCT.format(len(self.block)),
-            self.msg_len,
-            self.msg_id,
-            self.index,
-            self.begin,
-            self.block
-        )
+        return self.header() + self._block
 
 
 class Cancel(IDMessage):
@@ -546,7 +660,8 @@ class Cancel(IDMessage):
     """
     LENGTH = 13
     ID = 8
-    STRUCT = '>IBIII'
+    STRUCT = struct.Struct('>IBIII')
+    __slots__ = ('_index', '_begin', '_length')
 
     def __init__(self, index: int, begin: int, length: int):
         IDMessage.__init__(self, Cancel.LENGTH, Cancel.ID)
@@ -554,6 +669,9 @@ class Cancel(IDMessage):
         self._begin = begin
         self._length = length
 
+    def _key(self) -> tuple:
+        return self._index, self._begin, self._length
+
     def __str__(self):
         return IDMessage.__str__(self) \
             + '<index={}><begin={}><length={}>'.format(
@@ -580,17 +698,12 @@ class Cancel(IDMessage):
         if len(payload) != 17:
             raise ValueError('Expected a byte string of length 17.')
 
-        unpacked_bytes = struct.unpack(Cancel.STRUCT, payload)
+        _, _, index, begin, length = Cancel.STRUCT.unpack(payload)
 
-        cancel_msg = Cancel(
-            unpacked_bytes[2], unpacked_bytes[3], unpacked_bytes[4]
-        )
-
-        return cancel_msg
+        return Cancel(index, begin, length)
 
     def to_bytes(self) -> bytes:
-        return struct.pack(
-            Cancel.STRUCT,
+        return Cancel.STRUCT.pack(
             self.msg_len,
             self.msg_id,
             self.index,
@@ -611,7 +724,8 @@ class Port(IDMessage):
     """
     LENGTH = 3
     ID = 9
-    STRUCT = '>IBH'
+    STRUCT = struct.Struct('>IBH')
+    __slots__ = ('_port',)
 
     def __init__(self, port: int):
         IDMessage.__init__(self, Port.LENGTH, Port.ID)
@@ -620,6 +734,9 @@ class Port(IDMessage):
         if not isinstance(port, int) and port < 0:
             raise ValueError('Invalid port argument.')
 
+    def _key(self) -> tuple:
+        return self._port,
+
     def __str__(self):
         return IDMessage.__str__(self) + '<listen-port={}>'.format(self.port)
 
@@ -633,16 +750,12 @@ class Port(IDMessage):
         if len(payload) != 7:
             raise ValueError('Expected a byte string of length 7.')
 
-        unpacked_bytes = struct.unpack(Port.STRUCT, payload)
+        _, _, port = Port.STRUCT.unpack(payload)
 
-        port_msg = Port(unpacked_bytes[2])
-
-        return port_msg
+        return Port(port)
 
     def to_bytes(self) -> bytes:
-        return struct.pack(
-            Port.STRUCT, self.msg_len, self.msg_id, self.port
-        )
+        return Port.STRUCT.pack(self.msg_len, self.msg_id, self.port)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,3 @@
-import struct
-
 import bittorrent.exceptions as exceptions
 from . import message as msg
 
@@ -27,7 +25,7 @@ class MessageDecoder(object):
 
         Parameters
         ----------
-        payload : bytes
+        payload : bytes, bytearray, or memoryview
             A message's payload as a byte string.
 
         Returns
@@ -42,7 +40,7 @@ class MessageDecoder(object):
             parameter does not conform to the BitTorrent message
             standard or has an ID attribute value that is unknown.
         """
-        if not isinstance(payload, bytes):
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
             raise exceptions.InvalidMessageStructure(
                 'Valid messages must be in bytes format to be decoded.'
             )
@@ -57,25 +55,16 @@ class MessageDecoder(object):
 
         if payload[0] == 19:
             # Check if payload is a handshake by testing the first byte
-            return msg.Handshake.from_bytes(payload)
+            return msg.Handshake.from_bytes(bytes(payload))
 
-        try:
-            msg_id, = struct.unpack('>B', payload[4:5])
-        except struct.error:
-            raise exceptions.InvalidMessageStructure(
-                'Valid messages must have their 5th byte correspond to their ID.'
-            )
-
-        try:
-            bt_msg = MessageDecoder._MESSAGE_CLASS[msg_id].from_bytes(
-                payload
-            )
-        except KeyError:
+        # The payload is longer than 4 bytes: its 5th byte is the ID.
+        message_class = MessageDecoder._MESSAGE_CLASS.get(payload[4])
+        if message_class is None:
             raise exceptions.InvalidMessageStructure(
                 'Unknown message ID.'
             )
 
-        return bt_msg
+        return message_class.from_bytes(payload)
 
 
 def decode_message(payload: bytes):
@@ -85,7 +74,7 @@ def decode_message(payload: bytes):
 
     Parameters
     ----------
-    payload : bytes
+    payload : bytes, bytearray, or memoryview
         A message's payload as a byte string.
 
     Returns
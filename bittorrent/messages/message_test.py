@@ -1,8 +1,11 @@
+import copy
+import pickle
 import random
 import string
 import unittest
 
 import bittorrent.messages.message as bt_msg
+from bittorrent.messages.frame_parser import FrameParser
 
 
 class TestMessage(unittest.TestCase):
@@ -42,6 +45,77 @@ class TestMessage(unittest.TestCase):
             self.assertTrue(msg == msg_from_bytes)
         print()
 
+    def test_piece_zero_copy(self):
+        payload = bytearray(
+            bt_msg.Piece(3, 16384, b'\x01' * 16384).to_bytes()
+        )
+        piece = bt_msg.Piece.from_bytes(payload)
+
+        self.assertEqual((piece.index, piece.begin), (3, 16384))
+        self.assertTrue(piece.block.readonly)
+        payload[-1] = 2
+        self.assertEqual(piece.block[-1], 2)
+
+        header, block = piece.to_buffers()
+        self.assertIs(block, piece.block)
+        self.assertEqual(header + block, bytes(payload))
+
+        with self.assertRaises(ValueError):
+            bt_msg.Piece.from_bytes(payload[:-1])
+
+    def test_singletons(self):
+        for cls in (bt_msg.KeepAlive, bt_msg.Choke, bt_msg.Unchoke,
+                    bt_msg.Interested, bt_msg.NotInterested):
+            msg = cls()
+            self.assertIs(cls(), msg)
+            self.assertIs(cls.from_bytes(msg.to_bytes()), msg)
+            self.assertIs(copy.deepcopy(msg), msg)
+            self.assertIs(pickle.loads(pickle.dumps(msg)), msg)
+
+        self.assertEqual(bt_msg.Choke().to_bytes(), b'\x00\x00\x00\x01\x00')
+        self.assertNotEqual(bt_msg.Choke(), bt_msg.Unchoke())
+
+    def test_fields_equality(self):
+        request = bt_msg.Request(1, 16384, 16384)
+
+        self.assertEqual(request, bt_msg.Request(1, 16384, 16384))
+        self.assertEqual(hash(request), hash(bt_msg.Request(1, 16384, 16384)))
+        self.assertNotEqual(request, bt_msg.Request(1, 0, 16384))
+        self.assertNotEqual(request, bt_msg.Cancel(1, 16384, 16384))
+        self.assertEqual(
+            len({bt_msg.Have(1), bt_msg.Have(1), bt_msg.Have(2)}), 2
+        )
+
+        with self.assertRaises(AttributeError):
+            request.foo = 1
+
+    def test_hash(self):
+        for msg in self.messages:
+            decoded = type(msg).from_bytes(msg.to_bytes())
+            self.assertEqual(hash(msg), hash(decoded), type(msg).__name__)
+            self.assertEqual(pickle.loads(pickle.dumps(msg)), msg)
+
+        self.assertEqual(len(set(self.messages)), len(self.messages))
+        self.assertEqual(
+            bt_msg.Handshake(self.info_hash, self.peer_id).info_hash,
+            bytes(self.info_hash)
+        )
+
+    def test_piece_hash_and_pickle(self):
+        data = bt_msg.Piece(3, 16384, b'\x01' * 100).to_bytes()
+        piece, = FrameParser().feed(data)
+        other = bt_msg.Piece(3, 16384, bytearray(b'\x01' * 100))
+
+        self.assertEqual(piece, other)
+        self.assertEqual(hash(piece), hash(other))
+        self.assertNotEqual(piece, bt_msg.Piece(3, 16384, b'\x02' * 100))
+        self.assertEqual(len({piece, other}), 1)
+
+        copied = pickle.loads(pickle.dumps(piece))
+        self.assertEqual(copied, piece)
+        self.assertEqual(copied.to_bytes(), data)
+        self.assertTrue(copied.block.readonly)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,279 @@
+import os
+import sqlite3
+import time
+
+import bittorrent.bencoding as bencoding
+from bittorrent.catalog import TorrentSummary
+from bittorrent.exceptions.exceptions import InvalidBencodeDataType
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    last_access REAL NOT NULL
+)
+'''
+
+
+class MetadataCache(object):
+    """The MetadataCache class is designed to persist the summaries of
+    parsed .torrent files (info hash, piece hashes, file layout, announce
+    list, ...) in an SQLite database so that they do not have to be parsed
+    again on the next start.
+
+    Entries are keyed by the .torrent file's path and are only valid as
+    long as the file's modification time and size are unchanged. When the
+    cache grows past max_entries entries or max_bytes bytes of summaries,
+    the least recently used entries are evicted.
+
+    Summaries are stored bencoded. Names and paths are stored as the
+    bytes they were decoded from with the surrogateescape error handler.
+
+    Parameters
+    ----------
+    db_path : str
+        The path of the SQLite database. ':memory:' can be used for a
+        cache that is not persisted.
+    max_entries : int
+        The maximum number of cached summaries. Unbounded if None.
+    max_bytes : int
+        The maximum size, in bytes, of the cached summaries. Unbounded
+        if None.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = None,
+                 max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._db = sqlite3.connect(db_path)
+        with self._db:
+            self._db.execute(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        """Returns the size, in bytes, of the cached summaries."""
+        return self._db.execute(
+            'SELECT COALESCE(SUM(LENGTH(data)), 0) FROM entries'
+        ).fetchone()[0]
+
+    def close(self):
+        """This method closes the database connection."""
+        self._db.close()
+
+    def get(self, path: str):
+        """This method is designed to return the cached summary of a
+        .torrent file if the file has not changed since it was cached.
+
+        Parameters
+        ----------
+        path : str
+            The file path of a .torrent file.
+
+        Returns
+        -------
+        TorrentSummary or None
+            The cached summary, or None if the file is not cached, has
+            changed, or does not exist anymore.
+        """
+        hits, _ = self.get_many([path])
+
+        return hits.get(path)
+
+    def get_many(self, paths) -> tuple:
+        """This method is designed to look up the cached summaries of
+        several .torrent files in a single transaction. Stale entries are
+        removed from the cache.
+
+        Parameters
+        ----------
+        paths : iterable of str
+            The file paths of .torrent files.
+
+        Returns
+        -------
+        dict, dict
+            A dictionary mapping paths to their cached summaries, and a
+            dictionary mapping the paths of existing files to their
+            (mtime_ns, size) file stats. The latter should be passed to
+            put_many once the cache misses have been parsed so that they
+            are stored with the stats the files had before parsing.
+        """
+        hits = {}
+        stats = {}
+        stale = []
+        now = time.time()
+
+        with self._db:
+            for path in paths:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    stale.append((path,))
+                    continue
+                stats[path] = (st.st_mtime_ns, st.st_size)
+
+                row = self._db.execute(
+                    'SELECT mtime_ns, size, data FROM entries WHERE path = ?',
+                    (path,)
+                ).fetchone()
+                if row is None:
+                    continue
+                if (row[0], row[1]) != stats[path]:
+                    stale.append((path,))
+                    continue
+
+                hits[path] = _decode_summary(path, row[2])
+
+            self._db.executemany(
+                'UPDATE entries SET last_access = ? WHERE path = ?',
+                [(now, path) for path in hits]
+            )
+            self._db.executemany('DELETE FROM entries WHERE path = ?', stale)
+
+        return hits, stats
+
+    def put(self, summary: TorrentSummary):
+        """This method is designed to cache the summary of a .torrent file
+        using the file's current stats.
+        """
+        st = os.stat(summary.path)
+        self.put_many([summary], {summary.path: (st.st_mtime_ns, st.st_size)})
+
+    def put_many(self, summaries, stats: dict):
+        """This method is designed to cache several summaries in a single
+        transaction and to evict the least recently used entries if the
+        cache is full.
+
+        Parameters
+        ----------
+        summaries : iterable of TorrentSummary
+            The summaries to cache.
+        stats : dict
+            A dictionary mapping the summaries' paths to the (mtime_ns,
+            size) stats of the files, as returned by get_many. Summaries
+            whose path is not in stats, or that cannot be encoded, are
+            not cached.
+        """
+        now = time.time()
+        rows = []
+        for s in summaries:
+            if s.path not in stats:
+                continue
+            try:
+                # SQLite stores paths as UTF-8 text.
+                s.path.encode('utf-8')
+                data = _encode_summary(s)
+            except (InvalidBencodeDataType, UnicodeEncodeError):
+                # A summary that cannot be stored is parsed again on the
+                # next load rather than aborting the whole batch.
+                continue
+            rows.append((s.path, stats[s.path][0], stats[s.path][1], data,
+                         now))
+
+        with self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO entries '
+                '(path, mtime_ns, size, data, last_access) '
+                'VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+            self._evict()
+
+    def invalidate(self, path: str):
+        """This method removes the cached summary of a .torrent file."""
+        with self._db:
+            self._db.execute('DELETE FROM entries WHERE path = ?', (path,))
+
+    def clear(self):
+        """This method removes all the cached summaries."""
+        with self._db:
+            self._db.execute('DELETE FROM entries')
+
+    def _evict(self):
+        """This method deletes the least recently used entries until the
+        cache is within its bounds.
+        """
+        if self.max_entries is not None:
+            self._db.execute(
+                'DELETE FROM entries WHERE path IN ('
+                'SELECT path FROM entries ORDER BY last_access DESC '
+                'LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+        if self.max_bytes is not None:
+            excess = self.size - self.max_bytes
+            if excess <= 0:
+                return
+
+            evicted = []
+            rows = self._db.execute(
+                'SELECT path, LENGTH(data) FROM entries '
+                'ORDER BY last_access ASC'
+            )
+            for path, size in rows:
+                if excess <= 0:
+                    break
+                evicted.append((path,))
+                excess -= size
+
+            self._db.executemany('DELETE FROM entries WHERE path = ?', evicted)
+
+
+def _encode_summary(summary):
+    return bencoding.encode({
+        b'info hash': summary.info_hash,
+        b'name': _encode_str(summary.name),
+        b'announce list': [_encode_str(a) for a in summary.announce_list],
+        b'total length': summary.total_length,
+        b'piece length': summary.piece_length,
+        b'piece count': summary.piece_count,
+        b'file count': summary.file_count,
+        b'private': summary.private,
+        b'files': [[_encode_str(path), length]
+                   for path, length in summary.files],
+        b'pieces': summary.pieces,
+    })
+
+
+def _decode_summary(path, data):
+    d = bencoding.decode(data)
+
+    return TorrentSummary(
+        path=path,
+        info_hash=d[b'info hash'],
+        name=_decode_str(d[b'name']),
+        announce_list=tuple(_decode_str(a) for a in d[b'announce list']),
+        total_length=d[b'total length'],
+        piece_length=d[b'piece length'],
+        piece_count=d[b'piece count'],
+        file_count=d[b'file count'],
+        private=d[b'private'] == 1,
+        files=tuple((_decode_str(p), length) for p, length in d[b'files']),
+        pieces=d[b'pieces'],
+    )
+
+
+def _encode_str(s):
+    return s.encode('utf-8', 'surrogateescape')
+
+
+def _decode_str(b):
+    return str(b, 'utf-8', 'surrogateescape')
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+import bittorrent.bencoding as bencoding
+from bittorrent import catalog
+from bittorrent.metadata_cache import MetadataCache
+
+
+class MetadataCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = []
+
+        for i in range(4):
+            contents = bencoding.encode({
+                b'announce': b'http://tracker.example.org/announce',
+                b'info': {
+                    b'files': [
+                        {b'length': 10, b'path': [b'a', b'b.bin']},
+                        {b'length': 20 + i, b'path': [b'c.bin']},
+                    ],
+                    b'name': 'dir-{}'.format(i).encode(),
+                    b'piece length': 16,
+                    b'pieces': hashlib.sha1(bytes([i])).digest() * 2,
+                },
+            })
+            path = os.path.join(self.directory.name, '{}.torrent'.format(i))
+            with open(path, 'wb') as f:
+                f.write(contents)
+            self.paths.append(path)
+
+        self.db_path = os.path.join(self.directory.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cached_catalog(self):
+        expected = catalog.load_catalog(self.paths, workers=1)
+
+        with MetadataCache(self.db_path) as cache:
+            result = catalog.load_catalog(self.paths, workers=1, cache=cache)
+            self.assertEqual(result, expected)
+            self.assertEqual(len(cache), 4)
+
+        with MetadataCache(self.db_path) as cache:
+            hits, _ = cache.get_many(self.paths)
+            self.assertEqual(list(hits.values()), expected.summaries)
+            self.assertEqual(
+                hits[self.paths[0]].files,
+                ((os.path.join('a', 'b.bin'), 10), ('c.bin', 20))
+            )
+
+    def test_invalidation(self):
+        with MetadataCache(self.db_path) as cache:
+            catalog.load_catalog(self.paths, workers=1, cache=cache)
+
+            with open(self.paths[0], 'ab') as f:
+                f.write(b'x')
+            os.remove(self.paths[1])
+
+            self.assertIsNone(cache.get(self.paths[0]))
+            self.assertIsNone(cache.get(self.paths[1]))
+            self.assertIsNotNone(cache.get(self.paths[2]))
+            self.assertEqual(len(cache), 2)
+
+            cache.invalidate(self.paths[2])
+            self.assertEqual(len(cache), 1)
+
+    def test_eviction(self):
+        with MetadataCache(self.db_path, max_entries=3) as cache:
+            catalog.load_catalog(self.paths, workers=1, cache=cache)
+            self.assertEqual(len(cache), 3)
+
+        with MetadataCache(self.db_path) as cache:
+            entry_size = cache.size // 3
+
+        with MetadataCache(self.db_path, max_bytes=entry_size * 2) as cache:
+            catalog.load_catalog(self.paths[:1], workers=1, cache=cache)
+            self.assertLessEqual(cache.size, entry_size * 2)
+            self.assertIsNotNone(cache.get(self.paths[0]))
+
+    def test_non_utf8_names(self):
+        contents = bencoding.encode({
+            b'announce': b'http://tracker.example.org/announce',
+            b'info': {
+                b'length': 10,
+                b'name': b'\xff\xfe.bin',
+                b'piece length': 16,
+                b'pieces': hashlib.sha1(b'x').digest(),
+            },
+        })
+        path = os.path.join(self.directory.name, 'raw.torrent')
+        with open(path, 'wb') as f:
+            f.write(contents)
+        paths = [path] + self.paths
+        expected = catalog.load_catalog(paths, workers=1)
+
+        with MetadataCache(self.db_path) as cache:
+            result = catalog.load_catalog(paths, workers=1, cache=cache)
+            self.assertEqual(result, expected)
+            self.assertEqual(len(cache), 5)
+
+            summary = cache.get(path)
+            self.assertEqual(summary, expected.summaries[0])
+            self.assertEqual(
+                summary.name.encode('utf-8', 'surrogateescape'),
+                b'\xff\xfe.bin'
+            )
+
+    def test_unencodable_summary(self):
+        with MetadataCache(self.db_path) as cache:
+            summaries = catalog.load_catalog(self.paths, workers=1).summaries
+            _, stats = cache.get_many(self.paths)
+            summaries[0] = summaries[0]._replace(total_length=1.5)
+
+            cache.put_many(summaries, stats)
+            self.assertIsNone(cache.get(self.paths[0]))
+            self.assertEqual(len(cache), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,374 @@
+import asyncio
+
+import bittorrent.exceptions as exceptions
+from bittorrent import messages
+from bittorrent.bitset import Bitset
+from bittorrent.messages.frame_parser import DEFAULT_MAX_FRAME_SIZE
+from bittorrent.messages.frame_parser import FrameParser
+
+
+# The errors raised by the data received from a peer.
+_PEER_ERRORS = (exceptions.InvalidMessageStructure,
+                exceptions.IncorrectInfoHash,
+                exceptions.InvalidBitfieldLength, ValueError)
+
+
+class PeerConnection(asyncio.BufferedProtocol):
+    """The PeerConnection class is designed to exchange BT messages with
+    a peer over an asyncio transport. As an asyncio protocol, it is driven
+    by the event loop, as such, thousands of connections can be handled
+    by a single thread.
+
+    Received bytes are written directly to the buffer of a FrameParser
+    which splits them into the handshake and the length-prefixed messages
+    that follow it. The messages are passed to the on_message callback.
+
+    Sent messages are queued and written with a single writelines call at
+    the end of the current iteration of the event loop.
+
+    Connections must be created in a coroutine or a callback of the event
+    loop, e.g. by the protocol factory of loop.create_connection.
+
+    Parameters
+    ----------
+    info_hash : bytes
+        The info hash of the torrent shared with the peer.
+    peer_id : bytes
+        The local peer ID sent in the handshake.
+    on_message : callable
+        Called as on_message(connection, message) for each message
+        received after the handshake.
+    initiator : bool
+        Whether the connection was opened locally. The initiator sends its
+        handshake as soon as the connection is made, the other side only
+        replies once it has received a valid handshake.
+    max_frame_size : int
+        The maximum length of a received message. Larger messages close
+        the connection.
+    piece_count : int
+        The number of pieces of the torrent. If given, the pieces the peer
+        has are tracked in peer_pieces and Bitfield and Have messages that
+        do not match the number of pieces close the connection.
+
+    Attributes
+    ----------
+    remote_peer_id : bytes
+        The peer ID received in the peer's handshake.
+    am_choking, am_interested, peer_choking, peer_interested : bool
+        The choking and interest state of the connection. The peer's state
+        is updated as Choke, Unchoke, Interested, and NotInterested messages
+        are received, the local state as they are sent.
+    peer_pieces : Bitset
+        The pieces the peer has, updated as Bitfield and Have messages are
+        received. None if piece_count was not given.
+    """
+
+    def __init__(self, info_hash: bytes, peer_id: bytes, on_message=None,
+                 initiator: bool = True,
+                 max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+                 piece_count: int = None):
+        self.info_hash = bytes(info_hash)
+        self.peer_id = bytes(peer_id)
+        self.on_message = on_message
+        self.initiator = initiator
+        self.max_frame_size = max_frame_size
+        self.piece_count = piece_count
+
+        self.remote_peer_id = None
+        self.am_choking = True
+        self.am_interested = False
+        self.peer_choking = True
+        self.peer_interested = False
+        self.peer_pieces = Bitset(piece_count) \
+            if piece_count is not None else None
+
+        self.transport = None
+        self.error = None
+
+        self._parser = FrameParser(
+            handshake=True, max_frame_size=max_frame_size
+        )
+
+        self._outgoing = []
+        self._flush_handle = None
+        self._write_paused = False
+        self._drain_waiters = []
+
+        loop = asyncio.get_running_loop()
+        self._handshake = loop.create_future()
+        self._closed = loop.create_future()
+
+    def __repr__(self):
+        peer = self.transport.get_extra_info('peername') \
+            if self.transport is not None else None
+        return '{}(peer={})'.format(type(self).__name__, peer)
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed.done()
+
+    # Protocol callbacks.
+
+    def connection_made(self, transport):
+        self.transport = transport
+        if self.initiator:
+            self._send_handshake()
+
+    def connection_lost(self, exc):
+        if self.error is None:
+            self.error = exc
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._outgoing.clear()
+
+        if not self._handshake.done():
+            self._handshake.set_exception(
+                self.error or ConnectionResetError(
+                    'The connection was closed during the handshake.'
+                )
+            )
+            # The exception is retrieved by wait_handshake, if awaited.
+            self._handshake.exception()
+        if not self._closed.done():
+            self._closed.set_result(None)
+        self._wake_drain()
+
+    def get_buffer(self, sizehint):
+        return self._parser.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        # Only the errors of the peer's data are handled here. The errors
+        # of on_message are raised to the event loop, which reports them.
+        try:
+            received = self._parser.buffer_updated(nbytes)
+        except _PEER_ERRORS as e:
+            self.abort(e)
+            return
+
+        for message in received:
+            if self.is_closed or self.transport.is_closing():
+                break
+            try:
+                if type(message) is messages.Handshake:
+                    self._receive_handshake(message)
+                    continue
+                self._update_state(message)
+            except _PEER_ERRORS as e:
+                self.abort(e)
+                return
+
+            if self.on_message is not None:
+                self.on_message(self, message)
+
+    def pause_writing(self):
+        self._write_paused = True
+
+    def resume_writing(self):
+        self._write_paused = False
+        self._wake_drain()
+
+    # Public API.
+
+    async def wait_handshake(self) -> bytes:
+        """This method waits until the peer's handshake is received and
+        returns the peer's ID.
+        """
+        return await asyncio.shield(self._handshake)
+
+    async def wait_closed(self):
+        """This method waits until the connection is closed."""
+        await asyncio.shield(self._closed)
+
+    async def drain(self):
+        """This method waits until the transport's write buffer is below
+        its high-water mark.
+        """
+        self._flush()
+        while self._write_paused and not self.is_closed:
+            waiter = asyncio.get_running_loop().create_future()
+            self._drain_waiters.append(waiter)
+            await waiter
+
+    def send(self, message):
+        """This method queues a message. The messages queued during an
+        iteration of the event loop are written together at its end.
+        """
+        if self.is_closed or self.transport is None:
+            return
+
+        if type(message) is messages.Choke:
+            self.am_choking = True
+        elif type(message) is messages.Unchoke:
+            self.am_choking = False
+        elif type(message) is messages.Interested:
+            self.am_interested = True
+        elif type(message) is messages.NotInterested:
+            self.am_interested = False
+
+        self._outgoing.extend(message.to_buffers())
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(
+                self._flush
+            )
+
+    def close(self):
+        """This method writes the queued messages and closes the
+        connection.
+        """
+        self._flush()
+        if self.transport is not None:
+            self.transport.close()
+
+    def abort(self, error=None):
+        """This method closes the connection immediately, discarding the
+        queued messages.
+        """
+        self.error = error
+        self._outgoing.clear()
+        if self.transport is not None:
+            self.transport.abort()
+
+    # Internals.
+
+    def _send_handshake(self):
+        self._outgoing.append(
+            messages.Handshake(self.info_hash, self.peer_id).to_bytes()
+        )
+        self._flush()
+
+    def _flush(self):
+        self._flush_handle = None
+        if self._outgoing and self.transport is not None \
+                and not self.transport.is_closing():
+            self.transport.writelines(self._outgoing)
+        self._outgoing.clear()
+
+    def _wake_drain(self):
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _receive_handshake(self, handshake):
+        if handshake.info_hash != self.info_hash:
+            raise exceptions.IncorrectInfoHash(
+                'The handshake\'s info hash does not match.'
+            )
+
+        self.remote_peer_id = handshake.peer_id
+        if not self.initiator:
+            self._send_handshake()
+        self._handshake.set_result(self.remote_peer_id)
+
+    def _update_state(self, message):
+        message_type = type(message)
+        if message_type is messages.Choke:
+            self.peer_choking = True
+        elif message_type is messages.Unchoke:
+            self.peer_choking = False
+        elif message_type is messages.Interested:
+            self.peer_interested = True
+        elif message_type is messages.NotInterested:
+            self.peer_interested = False
+        elif self.peer_pieces is not None:
+            if message_type is messages.Have:
+                if not 0 <= message.piece_index < self.piece_count:
+                    raise exceptions.InvalidMessageStructure(
+                        'Have message for an unknown piece: {}'.format(
+                            message.piece_index
+                        )
+                    )
+                self.peer_pieces.set(message.piece_index)
+            elif message_type is messages.Bitfield:
+                self.peer_pieces = message.bitset(self.piece_count)
+
+
+async def open_connection(host: str, port: int, info_hash: bytes,
+                          peer_id: bytes, on_message=None,
+                          timeout: float = 30.0, **kwargs) -> PeerConnection:
+    """This method is designed to connect to a peer and to wait for the
+    handshake to complete.
+
+    Parameters
+    ----------
+    host : str
+        The peer's IP address or host name.
+    port : int
+        The peer's port.
+    info_hash, peer_id, on_message
+        See PeerConnection.
+    timeout : float
+        The number of seconds to wait for the connection and handshake.
+
+    Returns
+    -------
+    PeerConnection
+        The connection, once the peer's handshake was received.
+
+    Raises
+    ------
+    asyncio.TimeoutError
+        An asyncio.TimeoutError is raised if the handshake did not
+        complete in time.
+    OSError
+        An OSError is raised if the connection failed.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def connect():
+        _, connection = await loop.create_connection(
+            lambda: PeerConnection(
+                info_hash, peer_id, on_message, initiator=True, **kwargs
+            ),
+            host, port
+        )
+        try:
+            await connection.wait_handshake()
+        except BaseException:
+            connection.abort()
+            raise
+        return connection
+
+    return await asyncio.wait_for(connect(), timeout)
+
+
+async def start_server(host: str, port: int, info_hash: bytes,
+                       peer_id: bytes, on_connection=None, on_message=None,
+                       **kwargs):
+    """This method is designed to accept the connections of peers.
+
+    Parameters
+    ----------
+    host : str
+        The address to listen on.
+    port : int
+        The port to listen on, 0 for any available port.
+    info_hash, peer_id, on_message
+        See PeerConnection.
+    on_connection : callable
+        Called with each PeerConnection once its handshake completed.
+
+    Returns
+    -------
+    asyncio.Server
+        The listening server.
+    """
+    loop = asyncio.get_running_loop()
+
+    def factory():
+        connection = PeerConnection(
+            info_hash, peer_id, on_message, initiator=False, **kwargs
+        )
+        if on_connection is not None:
+            def handshake_done(future):
+                if future.exception() is None:
+                    on_connection(connection)
+            connection._handshake.add_done_callback(handshake_done)
+        return connection
+
+    return await loop.create_server(factory, host, port)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,224 @@
+import asyncio
+import unittest
+
+from bittorrent import messages
+from bittorrent.peer import PeerConnection, open_connection, start_server
+
+
+class _Transport(asyncio.Transport):
+    """A transport recording the written data."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+        self.closed = False
+
+    def writelines(self, data):
+        self.writes.append(b''.join(data))
+
+    def is_closing(self):
+        return self.closed
+
+    def abort(self):
+        self.closed = True
+
+    close = abort
+
+
+class PeerConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.info_hash = b'\x01' * 20
+        self.messages = [
+            messages.Bitfield(b'\xff' * 100000),
+            messages.Unchoke(),
+            messages.KeepAlive(),
+            messages.Have(3),
+            messages.Piece(1, 16384, bytes(range(256)) * 64),
+            messages.Request(1, 0, 16384),
+        ]
+
+    def feed(self, connection, data, chunk_size):
+        for i in range(0, len(data), chunk_size):
+            chunk = data[i:i+chunk_size]
+            while chunk:
+                buffer = connection.get_buffer(-1)
+                n = min(len(buffer), len(chunk))
+                buffer[:n] = chunk[:n]
+                connection.buffer_updated(n)
+                chunk = chunk[n:]
+
+    def test_framing(self):
+        async def run():
+            data = messages.Handshake(self.info_hash, b'B' * 20).to_bytes() \
+                + b''.join(m.to_bytes() for m in self.messages)
+
+            for chunk_size in (1, 7, 4096, len(data)):
+                received = []
+                connection = PeerConnection(
+                    self.info_hash, b'A' * 20,
+                    lambda c, m: received.append(m)
+                )
+                transport = _Transport()
+                connection.connection_made(transport)
+                self.feed(connection, data, chunk_size)
+
+                self.assertEqual(await connection.wait_handshake(), b'B' * 20)
+                self.assertEqual(received, self.messages)
+                self.assertFalse(connection.peer_choking)
+                self.assertFalse(transport.closed)
+
+        asyncio.run(run())
+
+    def test_invalid_handshake(self):
+        async def run():
+            connection = PeerConnection(self.info_hash, b'A' * 20)
+            transport = _Transport()
+            connection.connection_made(transport)
+            self.feed(
+                connection,
+                messages.Handshake(b'\x02' * 20, b'B' * 20).to_bytes(), 68
+            )
+            self.assertTrue(transport.closed)
+
+            connection = PeerConnection(
+                self.info_hash, b'A' * 20, max_frame_size=1000
+            )
+            transport = _Transport()
+            connection.connection_made(transport)
+            self.feed(
+                connection,
+                messages.Handshake(self.info_hash, b'B' * 20).to_bytes()
+                + messages.Bitfield(b'\xff' * 1000).to_bytes(), 68
+            )
+            self.assertTrue(transport.closed)
+
+        asyncio.run(run())
+
+    def test_callback_errors(self):
+        def on_message(connection, message):
+            raise ValueError('application error')
+
+        async def run():
+            connection = PeerConnection(
+                self.info_hash, b'A' * 20, on_message=on_message
+            )
+            transport = _Transport()
+            connection.connection_made(transport)
+            with self.assertRaisesRegex(ValueError, 'application error'):
+                self.feed(
+                    connection,
+                    messages.Handshake(self.info_hash, b'B' * 20).to_bytes()
+                    + messages.Unchoke().to_bytes(), 1000
+                )
+            self.assertFalse(transport.closed)
+            self.assertIsNone(connection.error)
+
+        asyncio.run(run())
+
+    def test_peer_pieces(self):
+        async def run():
+            handshake = messages.Handshake(self.info_hash, b'B' * 20)
+
+            connection = PeerConnection(
+                self.info_hash, b'A' * 20, piece_count=10
+            )
+            transport = _Transport()
+            connection.connection_made(transport)
+            self.feed(connection, handshake.to_bytes() + b''.join(
+                m.to_bytes() for m in (
+                    messages.Bitfield(b'\x80\x40'), messages.Have(3)
+                )
+            ), 100)
+            self.assertEqual(list(connection.peer_pieces.indices()), [0, 3, 9])
+            self.assertFalse(transport.closed)
+
+            for message in (messages.Bitfield(b'\x80\x41'),
+                            messages.Have(10)):
+                connection = PeerConnection(
+                    self.info_hash, b'A' * 20, piece_count=10
+                )
+                transport = _Transport()
+                connection.connection_made(transport)
+                self.feed(
+                    connection, handshake.to_bytes() + message.to_bytes(), 100
+                )
+                self.assertTrue(transport.closed)
+
+        asyncio.run(run())
+
+    def test_batched_writes(self):
+        async def run():
+            connection = PeerConnection(self.info_hash, b'A' * 20)
+            transport = _Transport()
+            connection.connection_made(transport)
+
+            for message in self.messages:
+                connection.send(message)
+            self.assertEqual(len(transport.writes), 1)
+            await asyncio.sleep(0)
+
+            self.assertEqual(len(transport.writes), 2)
+            self.assertEqual(
+                transport.writes[1],
+                b''.join(m.to_bytes() for m in self.messages)
+            )
+
+        asyncio.run(run())
+
+    def test_concurrent_drains(self):
+        async def run():
+            connection = PeerConnection(self.info_hash, b'A' * 20)
+            connection.connection_made(_Transport())
+
+            connection.pause_writing()
+            drains = [asyncio.ensure_future(connection.drain())
+                      for _ in range(2)]
+            await asyncio.sleep(0)
+            self.assertFalse(any(d.done() for d in drains))
+
+            connection.resume_writing()
+            await asyncio.wait_for(asyncio.gather(*drains), 1)
+
+            connection.pause_writing()
+            drains = [asyncio.ensure_future(connection.drain())
+                      for _ in range(2)]
+            await asyncio.sleep(0)
+            connection.connection_lost(None)
+            await asyncio.wait_for(asyncio.gather(*drains), 1)
+
+        asyncio.run(run())
+
+    def test_connection(self):
+        async def run():
+            accepted = []
+            received = asyncio.Queue()
+            server = await start_server(
+                '127.0.0.1', 0, self.info_hash, b'S' * 20,
+                on_connection=accepted.append,
+                on_message=lambda c, m: received.put_nowait(m)
+            )
+            port = server.sockets[0].getsockname()[1]
+
+            client = await open_connection(
+                '127.0.0.1', port, self.info_hash, b'C' * 20
+            )
+            self.assertEqual(client.remote_peer_id, b'S' * 20)
+
+            for message in self.messages:
+                client.send(message)
+            await client.drain()
+            for message in self.messages:
+                self.assertEqual(await received.get(), message)
+            self.assertEqual(accepted[0].remote_peer_id, b'C' * 20)
+
+            client.close()
+            await client.wait_closed()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
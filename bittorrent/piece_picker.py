@@ -0,0 +1,381 @@
+import random
+
+from bittorrent.bitset import Bitset
+
+
+# The state of each piece.
+_WANTED = 0
+_STARTED = 1
+_HAVE = 2
+
+
+class PiecePicker(object):
+    """The PiecePicker class is designed to choose which piece to download
+    next from a peer: the rarest piece the peer has, that is the piece the
+    fewest connected peers have.
+
+    The availability of each piece is updated incrementally as peers
+    connect (with their Bitfield), announce pieces (with Have messages)
+    and disconnect. Seeders are counted once rather than once per piece,
+    and a peer that completes its pieces with a Have is converted to a
+    seeder by shifting the buckets.
+    The pieces that are not started yet are kept in buckets indexed by
+    availability, a piece moving to the next or previous bucket when its
+    availability changes, as such, an update costs O(1) and a pick only
+    scans the rarest pieces until one the peer has is found. Buckets are
+    scanned from a random position so that ties are broken randomly and
+    peers do not all start the same pieces. For peers with few pieces,
+    e.g. new leechers, the peer's pieces are compared instead.
+
+    Started pieces with blocks left to request (see mark_partial) are
+    picked before new pieces so that pieces are completed, and can be
+    shared, as soon as possible. Once every missing piece is started, the
+    picker is in endgame: pick returns the started pieces, so that their
+    remaining blocks can also be requested from other peers.
+
+    Parameters
+    ----------
+    piece_count : int
+        The number of pieces of the torrent.
+    have : Bitset
+        The pieces already downloaded.
+    seed : int
+        The seed of the random tie-breaking, for reproducible picks.
+    """
+
+    def __init__(self, piece_count: int, have: Bitset = None,
+                 seed: int = None):
+        self.piece_count = piece_count
+
+        self._rng = random.Random(seed)
+        self._availability = [0] * piece_count
+        self._state = bytearray(piece_count)
+        self._position = [0] * piece_count
+        self._buckets = [[]]
+        self._min_bucket = 0
+        # The number of peers converted to seeders by add_have, which are
+        # still counted in _availability but not in the buckets.
+        self._shift = 0
+        self._seeds = 0
+        self._wanted = 0
+        self._started = {}
+        self._partial = {}
+
+        wanted = []
+        for piece in range(piece_count):
+            if have is not None and have.has(piece):
+                self._state[piece] = _HAVE
+            else:
+                wanted.append(piece)
+        for i, piece in enumerate(wanted):
+            self._position[piece] = i
+        self._buckets[0] = wanted
+        self._wanted = len(wanted)
+
+    def __repr__(self):
+        return '{}(<{} wanted, {} started of {} pieces>)'.format(
+            type(self).__name__, self._wanted, len(self._started),
+            self.piece_count
+        )
+
+    @property
+    def seeds(self) -> int:
+        """Returns the number of connected seeders."""
+        return self._seeds
+
+    @property
+    def wanted(self) -> int:
+        """Returns the number of missing pieces that are not started."""
+        return self._wanted
+
+    @property
+    def endgame(self) -> bool:
+        """Returns True if every missing piece is started."""
+        return self._wanted == 0 and bool(self._started)
+
+    def availability(self, piece: int) -> int:
+        """Returns the number of connected peers that have a piece."""
+        return self._availability[piece] - self._shift + self._seeds
+
+    def has_piece(self, piece: int) -> bool:
+        """Returns True if the piece at index piece is downloaded."""
+        return self._state[piece] == _HAVE
+
+    def is_started(self, piece: int) -> bool:
+        """Returns True if the piece at index piece is started."""
+        return self._state[piece] == _STARTED
+
+    # Availability updates.
+
+    def add_peer(self, peer_pieces: Bitset):
+        """This method counts the pieces of a peer, e.g. once its Bitfield
+        is received. A seeder costs O(1), other peers O(pieces they have).
+        """
+        if peer_pieces.all():
+            self._seeds += 1
+            self._min_bucket = 0
+            return
+
+        self._update(peer_pieces.indices(), 1)
+
+    def remove_peer(self, peer_pieces: Bitset):
+        """This method uncounts the pieces of a disconnected peer. The
+        peer's pieces must have been counted with add_peer and add_have.
+        """
+        if peer_pieces.all():
+            self._seeds -= 1
+            return
+
+        self._update(peer_pieces.indices(), -1)
+
+    def add_have(self, piece: int, peer_pieces: Bitset) -> bool:
+        """This method is designed to count a piece announced by a peer in
+        a Have message. It must be called before the piece is set in the
+        peer's pieces, so that repeated Have messages, and Have messages
+        from seeders, are not counted. It costs O(1).
+
+        Parameters
+        ----------
+        piece : int
+            The index of the announced piece.
+        peer_pieces : Bitset
+            The pieces of the peer, the announced piece excluded. If the
+            announced piece makes the peer a seeder, the peer is counted
+            as a seeder from then on, so that it can be removed with
+            remove_peer once the piece is set.
+
+        Returns
+        -------
+        bool
+            True if the piece was counted, False if the peer already had
+            it.
+        """
+        if peer_pieces.has(piece):
+            return False
+
+        self._update((piece,), 1)
+
+        if peer_pieces.count() == self.piece_count - 1:
+            # Each piece was counted once for the peer, as such, every
+            # wanted piece is in a bucket above the first one, which is
+            # empty: the buckets are shifted down rather than each
+            # availability decremented. There are no buckets left once
+            # every wanted piece is downloaded or started.
+            self._seeds += 1
+            self._shift += 1
+            if self._buckets:
+                del self._buckets[0]
+            self._min_bucket = 0
+
+        return True
+
+    # Piece states.
+
+    def start_piece(self, piece: int):
+        """This method marks a piece as started: it is no longer picked as
+        a new piece and is picked as a partial piece until mark_requested
+        is called.
+        """
+        if self._state[piece] != _WANTED:
+            raise ValueError('Piece {} is not wanted.'.format(piece))
+
+        self._remove(piece)
+        self._state[piece] = _STARTED
+        self._started[piece] = None
+        self._partial[piece] = None
+
+    def mark_requested(self, piece: int):
+        """This method marks all the blocks of a started piece as
+        requested: the piece is no longer picked, except in endgame.
+        """
+        self._partial.pop(piece, None)
+
+    def mark_partial(self, piece: int):
+        """This method marks a started piece as having blocks left to
+        request, e.g. after a request timed out. The piece is picked before
+        new pieces.
+        """
+        if self._state[piece] == _STARTED:
+            self._partial[piece] = None
+
+    def abort_piece(self, piece: int):
+        """This method returns a started piece to the wanted pieces, e.g.
+        if its hash did not match or none of its blocks were received.
+        """
+        if self._state[piece] != _STARTED:
+            return
+
+        del self._started[piece]
+        self._partial.pop(piece, None)
+        self._state[piece] = _WANTED
+        self._insert(piece)
+
+    def piece_finished(self, piece: int):
+        """This method marks a piece as downloaded and verified."""
+        state = self._state[piece]
+        if state == _WANTED:
+            self._remove(piece)
+        elif state == _STARTED:
+            del self._started[piece]
+            self._partial.pop(piece, None)
+        self._state[piece] = _HAVE
+
+    # Picking.
+
+    def pick(self, peer_pieces: Bitset) -> int:
+        """This method is designed to choose the next piece to download
+        from a peer.
+
+        Parameters
+        ----------
+        peer_pieces : Bitset
+            The pieces of the peer.
+
+        Returns
+        -------
+        int or None
+            The oldest partial piece the peer has or, if there is none, the
+            rarest wanted piece the peer has. In endgame, a started piece
+            the peer has. None if the peer has no piece of interest.
+            Partial and endgame pieces remain started, a new piece should
+            be started with start_piece.
+        """
+        has = peer_pieces.has
+
+        for piece in self._partial:
+            if has(piece):
+                return piece
+
+        if self._wanted:
+            buckets = self._buckets
+            k = self._min_bucket
+            while not buckets[k]:
+                k += 1
+            self._min_bucket = k
+
+            randrange = self._rng.randrange
+            if peer_pieces.all():
+                return buckets[k][randrange(len(buckets[k]))]
+            count = peer_pieces.count()
+            if 2 * count * count < self._wanted:
+                # Scanning the buckets checks about wanted / count pieces
+                # before finding one the peer has. Going through the peer's
+                # pieces costs about twice as much per piece.
+                return self._pick_sparse(peer_pieces)
+            # The peer is not a seeder: the pieces it has are counted. Each
+            # bucket is scanned from a random position to break ties.
+            for bucket in buckets[max(k, 1):]:
+                n = len(bucket)
+                if not n:
+                    continue
+                start = randrange(n)
+                for i in range(start - n, start):
+                    if has(bucket[i]):
+                        return bucket[i]
+            return None
+
+        for piece in self._started:
+            if has(piece):
+                return piece
+
+        return None
+
+    def _pick_sparse(self, peer_pieces):
+        """This method returns the rarest wanted piece of a peer that has
+        few pieces by going through the peer's pieces rather than the
+        buckets. Ties are broken randomly.
+        """
+        availability = self._availability
+        state = self._state
+        randrange = self._rng.randrange
+
+        best = None
+        best_availability = None
+        ties = 0
+        for piece in peer_pieces.indices():
+            if state[piece] != _WANTED:
+                continue
+            k = availability[piece]
+            if best is None or k < best_availability:
+                best, best_availability, ties = piece, k, 1
+            elif k == best_availability:
+                ties += 1
+                if not randrange(ties):
+                    best = piece
+
+        return best
+
+    def is_interesting(self, peer_pieces: Bitset) -> bool:
+        """Returns True if the peer has a piece that is not downloaded."""
+        if peer_pieces.all():
+            return self._wanted > 0 or bool(self._started)
+
+        for piece in peer_pieces.indices():
+            if self._state[piece] != _HAVE:
+                return True
+
+        return False
+
+    # Buckets.
+
+    def _insert(self, piece):
+        """This method adds a wanted piece to the bucket of its
+        availability.
+        """
+        k = self._availability[piece] - self._shift
+        while len(self._buckets) <= k:
+            self._buckets.append([])
+        bucket = self._buckets[k]
+
+        self._position[piece] = len(bucket)
+        bucket.append(piece)
+        if k < self._min_bucket:
+            self._min_bucket = k
+        self._wanted += 1
+
+    def _remove(self, piece):
+        bucket = self._buckets[self._availability[piece] - self._shift]
+        last = bucket.pop()
+        if last != piece:
+            i = self._position[piece]
+            bucket[i] = last
+            self._position[last] = i
+        self._wanted -= 1
+
+    def _update(self, pieces, delta):
+        """This method adds delta (1 or -1) to the availability of pieces,
+        moving the wanted ones to the next or previous bucket.
+        """
+        availability = self._availability
+        buckets = self._buckets
+        position = self._position
+        state = self._state
+        shift = self._shift
+
+        for piece in pieces:
+            k = availability[piece]
+            availability[piece] = k + delta
+            if state[piece] != _WANTED:
+                continue
+            k -= shift
+
+            # Swap-remove the piece from its bucket.
+            bucket = buckets[k]
+            last = bucket.pop()
+            if last != piece:
+                i = position[piece]
+                bucket[i] = last
+                position[last] = i
+
+            k += delta
+            if k == len(buckets):
+                buckets.append([])
+            bucket = buckets[k]
+            position[piece] = len(bucket)
+            bucket.append(piece)
+            if k < self._min_bucket:
+                self._min_bucket = k
+
+
+if __name__ == "__main__":
+    pass
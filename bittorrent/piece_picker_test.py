@@ -0,0 +1,205 @@
+import unittest
+
+from bittorrent.bitset import Bitset
+from bittorrent.piece_picker import PiecePicker
+
+
+def bitset(length, pieces):
+    b = Bitset(length)
+    for piece in pieces:
+        b.set(piece)
+    return b
+
+
+class PiecePickerTest(unittest.TestCase):
+
+    def test_rarest_first(self):
+        picker = PiecePicker(10, seed=0)
+        a = bitset(10, range(0, 10, 2))
+        b = bitset(10, [0, 2, 4, 5])
+        picker.add_peer(a)
+        picker.add_peer(b)
+        picker.add_peer(Bitset.full(10))
+
+        self.assertEqual(picker.seeds, 1)
+        self.assertEqual(picker.availability(0), 3)
+        self.assertEqual(picker.availability(1), 1)
+        self.assertIn(picker.pick(a), (6, 8))
+        self.assertEqual(picker.pick(b), 5)
+        self.assertIn(picker.pick(Bitset.full(10)), (1, 3, 7, 9))
+
+        self.assertTrue(picker.add_have(9, b))
+        b.set(9)
+        self.assertIn(picker.pick(Bitset.full(10)), (1, 3, 7))
+
+        picker.remove_peer(a)
+        self.assertEqual(picker.availability(0), 2)
+        self.assertIn(picker.pick(b), (0, 2, 4, 5))
+
+    def test_sparse_peer(self):
+        picker = PiecePicker(100, have=bitset(100, [7]), seed=0)
+        picker.add_peer(bitset(100, range(50)))
+        picker.add_peer(bitset(100, range(0, 100, 2)))
+
+        sparse = bitset(100, [2, 7, 31, 61])
+        self.assertEqual(picker.pick(sparse), 61)
+        picker.start_piece(61)
+        picker.mark_requested(61)
+        self.assertEqual(picker.pick(sparse), 31)
+        self.assertIsNone(picker.pick(bitset(100, [7, 61])))
+
+        # Ties are broken randomly.
+        ties = bitset(100, [51, 53, 55])
+        self.assertEqual(
+            {PiecePicker(100, seed=seed).pick(ties) for seed in range(20)},
+            {51, 53, 55}
+        )
+
+    def test_peer_becomes_seed(self):
+        picker = PiecePicker(3, seed=0)
+        peer = bitset(3, [0, 1])
+        picker.add_peer(peer)
+        picker.add_have(2, peer)
+        peer.set(2)
+
+        self.assertEqual(picker.seeds, 1)
+        self.assertEqual(
+            [picker.availability(p) for p in range(3)], [1, 1, 1]
+        )
+        picker.remove_peer(peer)
+        self.assertEqual(
+            [picker.availability(p) for p in range(3)], [0, 0, 0]
+        )
+
+    def test_peers_become_seeds_without_wanted_pieces(self):
+        # While seeding, no piece is wanted.
+        picker = PiecePicker(2, have=Bitset.full(2), seed=0)
+        peers = [bitset(2, [0]), bitset(2, [0])]
+        for peer in peers:
+            picker.add_peer(peer)
+        for peer in peers:
+            self.assertTrue(picker.add_have(1, peer))
+            peer.set(1)
+        self.assertEqual(picker.seeds, 2)
+        self.assertIsNone(picker.pick(peers[0]))
+
+        # Every missing piece is started.
+        picker = PiecePicker(2, seed=0)
+        peers = [bitset(2, [0]), bitset(2, [0])]
+        for peer in peers:
+            picker.add_peer(peer)
+        for piece in range(2):
+            picker.start_piece(piece)
+            picker.mark_requested(piece)
+        for peer in peers:
+            self.assertTrue(picker.add_have(1, peer))
+            peer.set(1)
+        self.assertEqual(picker.seeds, 2)
+        self.assertEqual(
+            [picker.availability(p) for p in range(2)], [2, 2]
+        )
+
+        picker.abort_piece(1)
+        self.assertEqual(picker.pick(peers[0]), 1)
+
+    def test_repeated_have(self):
+        picker = PiecePicker(3, seed=0)
+        seeder = Bitset.full(3)
+        leecher = bitset(3, [0])
+        picker.add_peer(seeder)
+        picker.add_peer(leecher)
+
+        # Repeated Have messages and Have messages from a seeder are not
+        # counted.
+        for _ in range(3):
+            self.assertFalse(picker.add_have(2, seeder))
+            self.assertFalse(picker.add_have(0, leecher))
+        self.assertTrue(picker.add_have(1, leecher))
+        leecher.set(1)
+        self.assertFalse(picker.add_have(1, leecher))
+
+        self.assertEqual(picker.seeds, 1)
+        self.assertEqual(
+            [picker.availability(p) for p in range(3)], [2, 2, 1]
+        )
+        self.assertEqual(picker.pick(seeder), 2)
+
+        # The leecher becomes a seeder once.
+        self.assertTrue(picker.add_have(2, leecher))
+        leecher.set(2)
+        self.assertFalse(picker.add_have(2, leecher))
+        self.assertEqual(picker.seeds, 2)
+        self.assertEqual(
+            [picker.availability(p) for p in range(3)], [2, 2, 2]
+        )
+        self.assertIn(picker.pick(seeder), (0, 1, 2))
+
+        picker.remove_peer(leecher)
+        picker.remove_peer(seeder)
+        self.assertEqual(
+            [picker.availability(p) for p in range(3)], [0, 0, 0]
+        )
+
+        # The buckets are consistent after the shift.
+        leecher = bitset(3, [1])
+        picker.add_peer(leecher)
+        picker.start_piece(0)
+        picker.abort_piece(0)
+        self.assertEqual(picker.pick(leecher), 1)
+        self.assertIn(picker.pick(Bitset.full(3)), (0, 2))
+
+    def test_random_ties(self):
+        picked = set()
+        for seed in range(20):
+            picker = PiecePicker(100, seed=seed)
+            picker.add_peer(Bitset.full(100))
+            picked.add(picker.pick(Bitset.full(100)))
+
+        self.assertGreater(len(picked), 5)
+
+    def test_partial_pieces_first(self):
+        picker = PiecePicker(4, seed=0)
+        peer = bitset(4, [0, 1, 2])
+        picker.add_peer(peer)
+        picker.add_peer(bitset(4, [0, 1]))
+
+        picker.start_piece(0)
+        self.assertEqual(picker.pick(peer), 0)
+        picker.mark_requested(0)
+        self.assertEqual(picker.pick(peer), 2)
+        picker.mark_partial(0)
+        self.assertEqual(picker.pick(peer), 0)
+
+        picker.piece_finished(0)
+        self.assertTrue(picker.has_piece(0))
+        self.assertEqual(picker.pick(peer), 2)
+        self.assertIsNone(picker.pick(bitset(4, [0, 3])))
+
+        with self.assertRaises(ValueError):
+            picker.start_piece(0)
+
+    def test_endgame(self):
+        picker = PiecePicker(3, have=bitset(3, [0]), seed=0)
+        peer = Bitset.full(3)
+        picker.add_peer(peer)
+
+        for _ in range(2):
+            piece = picker.pick(peer)
+            picker.start_piece(piece)
+            picker.mark_requested(piece)
+        self.assertTrue(picker.endgame)
+        self.assertIn(picker.pick(peer), (1, 2))
+
+        picker.abort_piece(1)
+        self.assertFalse(picker.endgame)
+        self.assertEqual(picker.pick(peer), 1)
+
+        picker.piece_finished(1)
+        picker.piece_finished(2)
+        self.assertFalse(picker.endgame)
+        self.assertIsNone(picker.pick(peer))
+        self.assertFalse(picker.is_interesting(peer))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,477 @@
+import collections
+import hashlib
+import queue
+import threading
+import time
+
+from bittorrent.messages import Piece
+from bittorrent.pieces import PieceHashes
+from bittorrent.resume import BLOCK_LENGTH
+from bittorrent.storage import FileStorage
+
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+
+# Verified pieces are written as soon as they are verified.
+FLUSH_IMMEDIATE = 'immediate'
+# Verified pieces are kept in the cache until they fill half of it and are
+# then written together, consecutive pieces being written at once.
+FLUSH_WHEN_FULL = 'when_full'
+
+FlushEvent = collections.namedtuple(
+    'FlushEvent', ['pieces', 'bytes', 'writes', 'duration']
+)
+FlushEvent.__doc__ = """A batch of pieces written by a PieceStore.
+
+Attributes
+----------
+pieces : tuple of int
+    The indices of the written pieces, in order.
+bytes : int
+    The number of bytes written.
+writes : int
+    The number of write system calls, one per file segment.
+duration : float
+    The time, in seconds, taken to write (and sync) the batch.
+"""
+
+
+class _PendingPiece(object):
+    """A piece whose blocks are being received. The received blocks, and
+    those held in the buffer, are flagged per block.
+    """
+    __slots__ = ('buffer', 'received', 'in_memory', 'on_disk', 'missing')
+
+    def __init__(self, count):
+        self.buffer = None
+        self.received = bytearray(count)
+        self.in_memory = bytearray(count)
+        self.on_disk = False
+        self.missing = count
+
+
+class PieceStore(object):
+    """The PieceStore class is designed to store the blocks received in
+    Piece messages. Blocks are buffered per piece in a bounded write cache
+    and a piece is only written once it is complete and matches its hash,
+    with one write per file segment instead of one write per block.
+
+    Writes are made by a background thread. When the cache is full,
+    adding a block for a new piece waits for queued writes to complete or,
+    if the cache only holds incomplete pieces, writes the received blocks
+    of the least recently updated incomplete piece to disk. Such a piece
+    is verified by reading it back once it is complete. A piece is only
+    reported by has_piece once it is verified and written.
+
+    The pieces are split into blocks of block_length bytes and a received
+    block covers one or more of them, as such, duplicate and overlapping
+    blocks are only counted once. Blocks should be added from a single
+    thread.
+
+    Parameters
+    ----------
+    storage : FileStorage
+        A writable storage the pieces are written to.
+    pieces : PieceHashes
+        The expected hashes of the pieces.
+    cache_size : int
+        The maximum number of bytes of buffered pieces.
+    block_length : int
+        The length of the blocks the pieces are split into. Received
+        blocks must start at a block boundary and end at a block boundary
+        or at the end of their piece.
+    flush_policy : str
+        FLUSH_IMMEDIATE or FLUSH_WHEN_FULL.
+    fsync : bool
+        If True, the files are synced to disk after each batch of writes.
+    on_flush : callable
+        Called from the background thread with a FlushEvent after each
+        batch of writes.
+
+    Raises
+    ------
+    ValueError
+        A ValueError is raised if the storage is not writable, if the
+        number of hashes does not match the layout, or if the flush policy
+        is unknown.
+    """
+
+    def __init__(self, storage: FileStorage, pieces: PieceHashes,
+                 cache_size: int = DEFAULT_CACHE_SIZE,
+                 block_length: int = BLOCK_LENGTH,
+                 flush_policy: str = FLUSH_IMMEDIATE, fsync: bool = False,
+                 on_flush=None):
+        if not storage.writable:
+            raise ValueError('The storage must be writable.')
+        if len(pieces) != storage.layout.piece_count:
+            raise ValueError(
+                'The number of piece hashes ({}) does not match the number '
+                'of pieces of the layout ({}).'.format(
+                    len(pieces), storage.layout.piece_count
+                )
+            )
+        if flush_policy not in (FLUSH_IMMEDIATE, FLUSH_WHEN_FULL):
+            raise ValueError(
+                'Unknown flush policy: {}'.format(flush_policy)
+            )
+
+        self.storage = storage
+        self.pieces = pieces
+        self.cache_size = cache_size
+        self.block_length = block_length
+        self.flush_policy = flush_policy
+        self.fsync = fsync
+        self.on_flush = on_flush
+
+        self._layout = storage.layout
+        # Pieces verified and written, and pieces verified whose writes
+        # may still be queued.
+        self._verified = bytearray(self._layout.piece_count)
+        self._complete_pieces = bytearray(self._layout.piece_count)
+        self._pending = collections.OrderedDict()
+        self._dirty = {}
+        self._dirty_bytes = 0
+
+        self._cond = threading.Condition()
+        self._cache_bytes = 0
+        self._flushing_bytes = 0
+        self._error = None
+        self._stats = collections.Counter()
+
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._run, name='PieceStore', daemon=True
+        )
+        self._worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def stats(self) -> dict:
+        """Returns the store's counters: blocks, duplicate_blocks,
+        pieces_verified, pieces_failed, evictions, flushes, writes,
+        bytes_written, and the current cache_bytes.
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['cache_bytes'] = self._cache_bytes
+
+        return stats
+
+    def has_piece(self, piece: int) -> bool:
+        """Returns True if the piece at index piece has been verified and
+        written to the storage.
+        """
+        return bool(self._verified[piece])
+
+    def add_block(self, message: Piece):
+        """This method is designed to buffer the block of a Piece message.
+
+        Parameters
+        ----------
+        message : Piece
+            The received Piece message.
+
+        Returns
+        -------
+        bool or None
+            True if the block completed a piece that matches its hash,
+            False if it completed a piece that does not (the piece's blocks
+            are discarded), and None otherwise.
+
+        Raises
+        ------
+        ValueError
+            A ValueError is raised if the block does not fit in its piece
+            or is not aligned to the blocks of the piece.
+        OSError
+            An OSError is raised if a previous write failed.
+        """
+        self._raise_error()
+
+        piece, begin, block = message.index, message.begin, message.block
+        size = self._layout.piece_size(piece)
+        length = len(block)
+        end = begin + length
+        if begin < 0 or not length or end > size:
+            raise ValueError(
+                'The block (begin={}, length={}) does not fit in piece {} '
+                'of length {}.'.format(begin, length, piece, size)
+            )
+        block_length = self.block_length
+        if begin % block_length or (end % block_length and end != size):
+            raise ValueError(
+                'The block (begin={}, length={}) is not aligned to blocks '
+                'of {} bytes.'.format(begin, length, block_length)
+            )
+
+        if self._complete_pieces[piece]:
+            self._count('duplicate_blocks')
+            return None
+
+        pending = self._pending.get(piece)
+        if pending is None:
+            pending = self._pending[piece] = _PendingPiece(
+                -(-size // block_length)
+            )
+        else:
+            self._pending.move_to_end(piece)
+
+        if pending.buffer is None:
+            self._reserve(size, piece)
+            pending.buffer = bytearray(size)
+
+        first, last = begin // block_length, -(-end // block_length)
+        pending.buffer[begin:end] = block
+        pending.in_memory[first:last] = b'\x01' * (last - first)
+        new = last - first - sum(pending.received[first:last])
+        if not new:
+            self._count('duplicate_blocks')
+            return None
+        pending.received[first:last] = b'\x01' * (last - first)
+        pending.missing -= new
+        self._count('blocks')
+
+        if pending.missing:
+            return None
+
+        del self._pending[piece]
+        return self._complete(piece, pending)
+
+    def flush(self):
+        """This method is designed to write the verified pieces held in
+        the cache and to wait until all the queued writes are complete.
+
+        Raises
+        ------
+        OSError
+            An OSError is raised if a write failed.
+        """
+        self._submit_dirty()
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """This method flushes the cache and stops the background thread.
+        The blocks of incomplete pieces are discarded.
+        """
+        if not self._worker.is_alive():
+            return
+
+        try:
+            self.flush()
+        finally:
+            self._queue.put(None)
+            self._worker.join()
+
+    def _count(self, name, n=1):
+        with self._cond:
+            self._stats[name] += n
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _release(self, size):
+        with self._cond:
+            self._cache_bytes -= size
+            self._cond.notify_all()
+
+    def _reserve(self, size, piece):
+        """This method waits until size bytes can be added to the cache,
+        making room if needed, and adds them.
+        """
+        with self._cond:
+            while self._cache_bytes + size > self.cache_size:
+                if self._dirty:
+                    self._cond.release()
+                    try:
+                        self._submit_dirty()
+                    finally:
+                        self._cond.acquire()
+                elif self._flushing_bytes:
+                    self._cond.wait()
+                else:
+                    victim = next((
+                        p for p, pending in self._pending.items()
+                        if pending.buffer is not None and p != piece
+                    ), None)
+                    if victim is None:
+                        # A piece larger than the cache.
+                        break
+                    self._cond.release()
+                    try:
+                        self._evict(victim)
+                    finally:
+                        self._cond.acquire()
+
+            self._cache_bytes += size
+
+    def _evict(self, piece):
+        """This method writes the received blocks of an incomplete piece
+        and removes it from the cache.
+        """
+        pending = self._pending[piece]
+        writes = self._write_runs(piece, pending)
+
+        self._release(len(pending.buffer))
+        pending.buffer = None
+        pending.in_memory = bytearray(len(pending.in_memory))
+        pending.on_disk = True
+
+        self._count('evictions')
+        self._count('writes', writes)
+
+    def _write_runs(self, piece, pending):
+        """This method writes the blocks of a piece held in memory, one
+        write per run of contiguous blocks and file segment, and returns
+        the number of writes.
+        """
+        view = memoryview(pending.buffer)
+        in_memory = pending.in_memory
+        block_length = self.block_length
+        writes = 0
+
+        block = in_memory.find(1)
+        while block != -1:
+            end = in_memory.find(0, block)
+            if end == -1:
+                end = len(in_memory)
+            run_start = block * block_length
+            run_end = min(end * block_length, len(view))
+
+            offset = piece * self._layout.piece_length + run_start
+            writes += len(
+                self._layout.segments_at(offset, run_end - run_start)
+            )
+            self.storage.write(piece, view[run_start:run_end], run_start)
+            self._count('bytes_written', run_end - run_start)
+            block = in_memory.find(1, end)
+
+        return writes
+
+    def _complete(self, piece, pending):
+        size = len(pending.buffer)
+
+        if pending.on_disk:
+            # Some blocks were evicted: write the others and verify the
+            # piece from disk.
+            self._count('writes', self._write_runs(piece, pending))
+            self._release(size)
+            buffer = bytearray(size)
+            read = self.storage.readinto(piece, buffer)
+            valid = read == size and \
+                self.pieces[piece] == hashlib.sha1(buffer).digest()
+        else:
+            buffer = pending.buffer
+            valid = self.pieces[piece] == hashlib.sha1(buffer).digest()
+
+        if not valid:
+            if not pending.on_disk:
+                self._release(size)
+            self._count('pieces_failed')
+            return False
+
+        self._complete_pieces[piece] = 1
+        self._count('pieces_verified')
+
+        if pending.on_disk:
+            # The piece was written (and read back) above.
+            if self.fsync:
+                self.storage.sync()
+            self._verified[piece] = 1
+        else:
+            self._dirty[piece] = buffer
+            self._dirty_bytes += size
+            if self.flush_policy == FLUSH_IMMEDIATE \
+                    or self._dirty_bytes >= self.cache_size // 2:
+                self._submit_dirty()
+
+        return True
+
+    def _submit_dirty(self):
+        """This method queues the verified pieces of the cache for
+        writing.
+        """
+        if not self._dirty:
+            return
+
+        batch, self._dirty = self._dirty, {}
+        size, self._dirty_bytes = self._dirty_bytes, 0
+
+        with self._cond:
+            self._flushing_bytes += size
+        self._queue.put(batch)
+
+    def _run(self):
+        """The background thread's loop writing the queued batches."""
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                self._queue.task_done()
+                return
+
+            size = sum(len(buffer) for buffer in batch.values())
+            try:
+                event = self._write_batch(batch)
+            except Exception as e:
+                self._error = e
+                event = None
+                # The pieces can be received again.
+                for piece in batch:
+                    self._complete_pieces[piece] = 0
+            else:
+                for piece in batch:
+                    self._verified[piece] = 1
+            finally:
+                with self._cond:
+                    self._cache_bytes -= size
+                    self._flushing_bytes -= size
+                    self._cond.notify_all()
+                self._queue.task_done()
+
+            if event is not None and self.on_flush is not None:
+                self.on_flush(event)
+
+    def _write_batch(self, batch):
+        start = time.monotonic()
+        piece_length = self._layout.piece_length
+        pieces = sorted(batch)
+        writes = 0
+        written = 0
+
+        # Consecutive pieces are written together.
+        i = 0
+        while i < len(pieces):
+            j = i + 1
+            while j < len(pieces) and pieces[j] == pieces[j-1] + 1:
+                j += 1
+
+            buffers = [batch[p] for p in pieces[i:j]]
+            offset = pieces[i] * piece_length
+            length = sum(len(buffer) for buffer in buffers)
+            writes += len(self._layout.segments_at(offset, length))
+            written += self.storage.write_at(offset, buffers)
+            i = j
+
+        if self.fsync:
+            self.storage.sync()
+
+        event = FlushEvent(
+            tuple(pieces), written, writes, time.monotonic() - start
+        )
+        with self._cond:
+            self._stats['flushes'] += 1
+            self._stats['writes'] += writes
+            self._stats['bytes_written'] += written
+
+        return event
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from bittorrent.layout import FileLayout
+from bittorrent.messages import Piece
+from bittorrent.pieces import PieceHashes
+from bittorrent.piece_store import FLUSH_WHEN_FULL, PieceStore
+from bittorrent.storage import FileStorage
+
+
+class PieceStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = os.urandom(10 * 4096 - 100)
+        self.layout = FileLayout(
+            [('a', 5000), (os.path.join('d', 'b'), 0),
+             (os.path.join('d', 'c'), len(self.data) - 5000)],
+            piece_length=4096
+        )
+        self.pieces = PieceHashes(b''.join(
+            hashlib.sha1(self.data[i:i+4096]).digest()
+            for i in range(0, len(self.data), 4096)
+        ))
+        self.storage = FileStorage(
+            self.layout, self.directory.name, writable=True
+        )
+        self.events = []
+
+    def tearDown(self):
+        self.storage.close()
+        self.directory.cleanup()
+
+    def blocks(self, piece, block_length=1024):
+        size = self.layout.piece_size(piece)
+        offset = piece * 4096
+        return [
+            Piece(piece, begin, self.data[
+                offset+begin:offset+min(begin+block_length, size)
+            ])
+            for begin in range(0, size, block_length)
+        ]
+
+    def stored(self):
+        data = b''
+        for f in self.layout.files:
+            if not f.length:
+                continue
+            with open(os.path.join(self.directory.name, f.path), 'rb') as fp:
+                data += fp.read()
+        return data
+
+    def test_store(self):
+        store = PieceStore(
+            self.storage, self.pieces, block_length=1024,
+            on_flush=self.events.append
+        )
+        with store:
+            for piece in reversed(range(self.layout.piece_count)):
+                results = [store.add_block(b) for b in self.blocks(piece)]
+                self.assertEqual(results[:-1], [None] * (len(results) - 1))
+                self.assertTrue(results[-1])
+            self.assertIsNone(store.add_block(self.blocks(0)[0]))
+            store.flush()
+            self.assertTrue(all(
+                store.has_piece(piece)
+                for piece in range(self.layout.piece_count)
+            ))
+
+        self.assertEqual(self.stored(), self.data)
+        self.assertEqual(len(self.events), 10)
+        self.assertEqual(store.stats['pieces_verified'], 10)
+        self.assertEqual(store.stats['duplicate_blocks'], 1)
+        self.assertEqual(store.stats['cache_bytes'], 0)
+        # Piece 1 spans the files a and d/c.
+        self.assertEqual(self.events[-2].writes, 2)
+
+    def test_coalesced_flush(self):
+        store = PieceStore(
+            self.storage, self.pieces, cache_size=1 << 20, block_length=1024,
+            flush_policy=FLUSH_WHEN_FULL, on_flush=self.events.append
+        )
+        with store:
+            for piece in range(self.layout.piece_count):
+                for block in self.blocks(piece):
+                    store.add_block(block)
+            self.assertEqual(self.events, [])
+            # The pieces are verified but not written yet.
+            self.assertFalse(store.has_piece(0))
+
+        self.assertEqual(self.stored(), self.data)
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual(self.events[0].pieces, tuple(range(10)))
+        self.assertEqual(self.events[0].writes, 2)
+
+    def test_failed_piece(self):
+        with PieceStore(self.storage, self.pieces, block_length=1024) as store:
+            blocks = self.blocks(3)
+            blocks[1] = Piece(3, 1024, b'\x00' * 1024)
+            self.assertEqual(
+                [store.add_block(b) for b in blocks], [None] * 3 + [False]
+            )
+            self.assertFalse(store.has_piece(3))
+            self.assertEqual(store.stats['cache_bytes'], 0)
+
+            for block in self.blocks(3):
+                store.add_block(block)
+            store.flush()
+            self.assertTrue(store.has_piece(3))
+
+            with self.assertRaises(ValueError):
+                store.add_block(Piece(9, 4000, b'\x00' * 100))
+            with self.assertRaises(ValueError):
+                store.add_block(Piece(4, 512, b'\x00' * 1024))
+            with self.assertRaises(ValueError):
+                store.add_block(Piece(4, 0, b'\x00' * 1000))
+
+    def test_overlapping_blocks(self):
+        data = self.data[4096:8192]
+        with PieceStore(self.storage, self.pieces, block_length=1024) as store:
+            self.assertIsNone(store.add_block(Piece(1, 0, data[:2048])))
+            # Duplicate and overlapping blocks are counted once.
+            self.assertIsNone(store.add_block(Piece(1, 1024, data[1024:2048])))
+            self.assertIsNone(store.add_block(Piece(1, 0, data[:2048])))
+            self.assertIsNone(store.add_block(Piece(1, 1024, data[1024:3072])))
+            self.assertEqual(store.stats['duplicate_blocks'], 2)
+            self.assertTrue(store.add_block(Piece(1, 3072, data[3072:])))
+
+        self.assertTrue(store.has_piece(1))
+        self.assertEqual(store.stats['blocks'], 3)
+
+    def test_eviction(self):
+        store = PieceStore(
+            self.storage, self.pieces, cache_size=2 * 4096, block_length=1024,
+            flush_policy=FLUSH_WHEN_FULL
+        )
+        with store:
+            # Three pieces are received in parallel.
+            blocks = [self.blocks(piece) for piece in (0, 1, 2)]
+            for i in range(4):
+                for piece_blocks in blocks:
+                    result = store.add_block(piece_blocks[i])
+                    self.assertEqual(result, True if i == 3 else None)
+            self.assertGreater(store.stats['evictions'], 0)
+
+            for piece in range(3, self.layout.piece_count):
+                for block in self.blocks(piece):
+                    store.add_block(block)
+
+        self.assertEqual(self.stored(), self.data)
+        self.assertEqual(store.stats['pieces_verified'], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import collections.abc
+
+
+HASH_LENGTH = 20
+
+
+class PieceHashes(collections.abc.Sequence):
+    """The PieceHashes class is designed to give indexed access to the
+    20-byte SHA1 hashes of a torrent's pieces without splitting the
+    info dictionary's pieces string. The hashes are read-only memoryview
+    slices of the original buffer, as such, no copy of the pieces string
+    is made and a hash is only materialized when it is accessed.
+
+    Parameters
+    ----------
+    pieces : bytes, bytearray, memoryview, or mmap.mmap
+        The concatenated SHA1 hashes of the pieces.
+
+    Raises
+    ------
+    ValueError
+        A ValueError is raised if the length of pieces is not a multiple
+        of 20.
+    """
+
+    __slots__ = ('_view', '_count')
+
+    def __init__(self, pieces):
+        view = memoryview(pieces)
+        if view.format != 'B' or view.ndim != 1:
+            view = view.cast('B')
+
+        if len(view) % HASH_LENGTH:
+            raise ValueError(
+                'The length of the pieces string ({}) is not a multiple '
+                'of {}.'.format(len(view), HASH_LENGTH)
+            )
+
+        self._view = view.toreadonly()
+        self._count = len(view) // HASH_LENGTH
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            if step == 1:
+                return PieceHashes(
+                    self._view[start*HASH_LENGTH:max(start, stop)*HASH_LENGTH]
+                )
+            return [self[i] for i in range(start, stop, step)]
+
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('Piece index out of range.')
+
+        offset = index * HASH_LENGTH
+        return self._view[offset:offset+HASH_LENGTH]
+
+    def __iter__(self):
+        view = self._view
+        for offset in range(0, len(view), HASH_LENGTH):
+            yield view[offset:offset+HASH_LENGTH]
+
+    def __eq__(self, other):
+        if isinstance(other, PieceHashes):
+            return self._view == other._view
+        if isinstance(other, collections.abc.Sequence) \
+                and not isinstance(other, (bytes, bytearray, str)):
+            return len(self) == len(other) \
+                and all(a == b for a, b in zip(self, other))
+
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._view.tobytes())
+
+    def __repr__(self):
+        return '{}(<{} pieces>)'.format(type(self).__name__, self._count)
+
+    def digest(self, index: int) -> bytes:
+        """Returns the hash of the piece at index as a bytes string."""
+        return self[index].tobytes()
+
+    def matches(self, index: int, digest: bytes) -> bool:
+        """Returns True if digest is the hash of the piece at index."""
+        return self[index] == digest
+
+    def compare(self, digests, start: int = 0) -> list:
+        """This method is designed to check a batch of computed digests
+        against the hashes of consecutive pieces. The batch is compared in
+        a single operation and the digests are only compared one by one
+        if at least one of them does not match.
+
+        Parameters
+        ----------
+        digests : iterable of bytes
+            The 20-byte SHA1 digests of the pieces start, start + 1, ...
+        start : int
+            The index of the piece the first digest belongs to.
+
+        Returns
+        -------
+        list of bool
+            Whether each digest matches the hash of its piece.
+
+        Raises
+        ------
+        ValueError
+            A ValueError is raised if a digest is not 20 bytes long.
+        IndexError
+            An IndexError is raised if the batch goes past the last piece.
+        """
+        digests = list(digests)
+        for digest in digests:
+            if len(digest) != HASH_LENGTH:
+                raise ValueError('Digests must be {} bytes long.'.format(
+                    HASH_LENGTH
+                ))
+
+        batch = b''.join(digests)
+        count = len(digests)
+        if start < 0 or start + count > self._count:
+            raise IndexError('Piece index out of range.')
+
+        begin = start * HASH_LENGTH
+        expected = self._view[begin:begin+len(batch)]
+        if expected == batch:
+            return [True] * count
+
+        return [
+            expected[i:i+HASH_LENGTH] == batch[i:i+HASH_LENGTH]
+            for i in range(0, len(batch), HASH_LENGTH)
+        ]
+
+    def tobytes(self) -> bytes:
+        """Returns the concatenated hashes as a bytes string."""
+        return self._view.tobytes()
+
+
+if __name__ == "__main__":
+    pass
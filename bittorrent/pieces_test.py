@@ -0,0 +1,49 @@
+import hashlib
+import unittest
+
+from bittorrent.pieces import PieceHashes
+
+
+class PieceHashesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.digests = [hashlib.sha1(bytes([i])).digest() for i in range(10)]
+        self.pieces = PieceHashes(b''.join(self.digests))
+
+    def test_access(self):
+        self.assertEqual(len(self.pieces), 10)
+        self.assertEqual(list(self.pieces), self.digests)
+        self.assertEqual(self.pieces[3], self.digests[3])
+        self.assertEqual(self.pieces[-1], self.digests[-1])
+        self.assertIsInstance(self.pieces[0], memoryview)
+        self.assertEqual(self.pieces.digest(2), self.digests[2])
+        self.assertEqual(list(self.pieces[2:5]), self.digests[2:5])
+        self.assertEqual(self.pieces[::3], self.digests[::3])
+        self.assertEqual(self.pieces, self.digests)
+        self.assertTrue(self.pieces.matches(4, self.digests[4]))
+
+        with self.assertRaises(IndexError):
+            self.pieces[10]
+        with self.assertRaises(TypeError):
+            self.pieces[0][0] = 0
+        with self.assertRaises(ValueError):
+            PieceHashes(b'\x00' * 21)
+
+    def test_compare(self):
+        self.assertEqual(self.pieces.compare(self.digests), [True] * 10)
+        self.assertEqual(
+            self.pieces.compare([self.digests[5], b'\x00' * 20], start=5),
+            [True, False]
+        )
+        self.assertEqual(self.pieces.compare([]), [])
+
+        with self.assertRaises(IndexError):
+            self.pieces.compare(self.digests, start=1)
+        with self.assertRaises(ValueError):
+            self.pieces.compare([b'\x00'])
+        with self.assertRaises(ValueError):
+            PieceHashes(b'\x00' * 40).compare([b'\x00' * 19, b'\x00' * 21])
+
+
+if __name__ == "__main__":
+    unittest.main()
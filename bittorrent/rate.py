@@ -0,0 +1,74 @@
+import math
+import time
+
+
+DEFAULT_TIME_CONSTANT = 5.0
+
+
+class RateEstimator(object):
+    """The RateEstimator class is designed to measure a transfer rate,
+    e.g. the download rate from a peer, over the last few seconds. The
+    transferred bytes are summed with an exponential decay of time constant
+    seconds, as such, an update and a query cost O(1) whatever the number
+    of samples and the rate falls back to zero once transfers stop.
+
+    During the first time constant seconds, the sum is scaled to the
+    elapsed time so that a new estimator is not biased towards zero.
+
+    Parameters
+    ----------
+    time_constant : float
+        The number of seconds after which a sample's weight is divided by e.
+    now : float
+        The time the measure starts at, time.monotonic() if None.
+    """
+
+    __slots__ = ('time_constant', '_start', '_last', '_sum', 'total')
+
+    def __init__(self, time_constant: float = DEFAULT_TIME_CONSTANT,
+                 now: float = None):
+        if now is None:
+            now = time.monotonic()
+
+        self.time_constant = time_constant
+        self.total = 0
+        self._start = now
+        self._last = now
+        self._sum = 0.0
+
+    def __repr__(self):
+        return '{}(<{:.0f} B/s>)'.format(type(self).__name__, self.rate())
+
+    def update(self, nbytes: int, now: float = None):
+        """This method adds nbytes transferred at time now."""
+        if now is None:
+            now = time.monotonic()
+
+        self._decay(now)
+        self._sum += nbytes
+        self.total += nbytes
+
+    def rate(self, now: float = None) -> float:
+        """Returns the transfer rate at time now in bytes per second."""
+        if now is None:
+            now = time.monotonic()
+
+        self._decay(now)
+        elapsed = now - self._start
+        if elapsed <= 0:
+            return 0.0
+
+        # The weight of the elapsed time, time_constant once warmed up.
+        window = self.time_constant \
+            * -math.expm1(-elapsed / self.time_constant)
+
+        return self._sum / window
+
+    def _decay(self, now):
+        if now > self._last:
+            self._sum *= math.exp((self._last - now) / self.time_constant)
+            self._last = now
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,27 @@
+import unittest
+
+from bittorrent.rate import RateEstimator
+
+
+class RateEstimatorTest(unittest.TestCase):
+
+    def test_constant_rate(self):
+        rate = RateEstimator(time_constant=5.0, now=0.0)
+        for i in range(1, 101):
+            rate.update(1000, now=i * 0.1)
+
+        self.assertAlmostEqual(rate.rate(now=10.0), 10000, delta=500)
+        self.assertEqual(rate.total, 100000)
+
+    def test_warm_up_and_decay(self):
+        rate = RateEstimator(time_constant=5.0, now=0.0)
+        rate.update(1000, now=0.5)
+        rate.update(1000, now=1.0)
+
+        self.assertAlmostEqual(rate.rate(now=1.0), 2000, delta=300)
+        self.assertLess(rate.rate(now=30.0), 10)
+        self.assertEqual(RateEstimator(now=0.0).rate(now=0.0), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+import collections
+import threading
+
+from bittorrent.messages import Request
+from bittorrent.storage import FileStorage
+
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class BlockReadCache(object):
+    """The BlockReadCache class is designed to serve the blocks requested
+    by peers from a cache of whole pieces. A cache miss reads the whole
+    piece, and optionally the read_ahead following pieces, with a single
+    read per file segment, as such, the requests for the other blocks of
+    the piece (which peers usually request in order) are served from
+    memory.
+
+    Blocks are returned as read-only memoryview slices of the cached
+    pieces. The pieces are never modified once cached, as such, a block
+    stays valid after its piece is evicted.
+
+    The cache is shared by torrents: entries are keyed by (info_hash,
+    piece) and bounded by max_bytes, the least recently used pieces are
+    evicted first.
+
+    Requests for pieces the torrent's has_piece predicate reports as
+    missing are rejected, and read-ahead stops at the first such piece,
+    as such, pieces that are not downloaded and verified yet are never
+    cached.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The maximum number of bytes of cached pieces.
+    read_ahead : int
+        The number of pieces following a missed piece that are read along
+        with it.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES,
+                 read_ahead: int = 0):
+        self.max_bytes = max_bytes
+        self.read_ahead = read_ahead
+
+        self._storages = {}
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = collections.Counter()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Returns the number of bytes of cached pieces."""
+        return self._bytes
+
+    @property
+    def stats(self) -> dict:
+        """Returns the cache's counters: hits, misses, read_ahead (the
+        number of pieces read ahead), reads (the number of read
+        operations), bytes_read, and evictions.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def add_torrent(self, info_hash: bytes, storage: FileStorage,
+                    has_piece=None):
+        """This method registers the storage the pieces of a torrent are
+        read from.
+
+        Parameters
+        ----------
+        info_hash : bytes
+            The info hash of the torrent.
+        storage : FileStorage
+            The storage the torrent's pieces are read from.
+        has_piece : callable
+            A function taking a piece index and returning whether the
+            piece is downloaded and verified, e.g. PieceStore.has_piece.
+            Only these pieces are served and read ahead. If None, every
+            piece is assumed to be complete, as when seeding.
+        """
+        with self._lock:
+            self._storages[bytes(info_hash)] = (storage, has_piece)
+
+    def remove_torrent(self, info_hash: bytes):
+        """This method unregisters a torrent and drops its cached pieces."""
+        info_hash = bytes(info_hash)
+        with self._lock:
+            self._storages.pop(info_hash, None)
+            for key in [k for k in self._entries if k[0] == info_hash]:
+                self._bytes -= len(self._entries.pop(key))
+
+    def invalidate(self, info_hash: bytes, piece: int):
+        """This method drops a cached piece, e.g. after it was rewritten."""
+        with self._lock:
+            entry = self._entries.pop((bytes(info_hash), piece), None)
+            if entry is not None:
+                self._bytes -= len(entry)
+
+    def get_block(self, info_hash: bytes, piece: int, begin: int,
+                  length: int) -> memoryview:
+        """This method is designed to return a block of a piece, reading
+        the piece from disk if it is not cached.
+
+        Parameters
+        ----------
+        info_hash : bytes
+            The info hash of the torrent.
+        piece : int
+            The index of the piece.
+        begin : int
+            The offset of the block within the piece.
+        length : int
+            The length of the block.
+
+        Returns
+        -------
+        memoryview
+            A read-only view of the block.
+
+        Raises
+        ------
+        KeyError
+            A KeyError is raised if the torrent was not added.
+        ValueError
+            A ValueError is raised, before anything is read, if the piece
+            is out of range or not verified, or if the block does not fit
+            in the piece.
+        OSError
+            An OSError is raised if the piece could not be read entirely.
+        """
+        info_hash = bytes(info_hash)
+        key = (info_hash, piece)
+
+        with self._lock:
+            storage, has_piece = self._storages[info_hash]
+            layout = storage.layout
+            if not 0 <= piece < layout.piece_count:
+                raise ValueError('Piece {} is out of range (0-{}).'.format(
+                    piece, layout.piece_count - 1
+                ))
+            if has_piece is not None and not has_piece(piece):
+                raise ValueError('Piece {} is not verified.'.format(piece))
+            size = layout.piece_size(piece)
+            if begin < 0 or length < 0 or begin + length > size:
+                raise ValueError(
+                    'The block (begin={}, length={}) does not fit in piece '
+                    '{} of length {}.'.format(begin, length, piece, size)
+                )
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+            else:
+                self._stats['misses'] += 1
+
+        if entry is None:
+            entry = self._load(info_hash, storage, has_piece, piece)
+
+        return entry[begin:begin+length]
+
+    def get_request(self, info_hash: bytes, request: Request) -> memoryview:
+        """This method returns the block requested by a Request message.
+        See BlockReadCache.get_block.
+        """
+        return self.get_block(
+            info_hash, request.index, request.begin, request.length
+        )
+
+    def _load(self, info_hash, storage, has_piece, piece):
+        """This method reads a piece along with the read-ahead pieces that
+        are verified and not cached, caches them, and returns the piece.
+        """
+        layout = storage.layout
+        pieces = [piece]
+        with self._lock:
+            for following in range(piece + 1, min(
+                    piece + 1 + self.read_ahead, layout.piece_count)):
+                if (info_hash, following) in self._entries:
+                    break
+                if has_piece is not None and not has_piece(following):
+                    break
+                pieces.append(following)
+
+        buffers = [bytearray(layout.piece_size(p)) for p in pieces]
+        read = storage.readinto_at(piece * layout.piece_length, buffers)
+
+        if read < len(buffers[0]):
+            raise OSError(
+                'Could not read piece {} ({} of {} bytes read).'.format(
+                    piece, read, len(buffers[0])
+                )
+            )
+
+        entries = []
+        for p, buffer in zip(pieces, buffers):
+            # Incomplete read-ahead pieces are not cached.
+            if read < len(buffer):
+                break
+            read -= len(buffer)
+            entries.append((p, memoryview(buffer).toreadonly()))
+
+        with self._lock:
+            self._stats['reads'] += 1
+            self._stats['bytes_read'] += sum(len(b) for b in buffers)
+            self._stats['read_ahead'] += len(entries) - 1
+            for p, entry in entries:
+                old = self._entries.pop((info_hash, p), None)
+                if old is not None:
+                    self._bytes -= len(old)
+                self._entries[(info_hash, p)] = entry
+                self._bytes += len(entry)
+            # The requested piece is the most recently used.
+            self._entries.move_to_end((info_hash, piece))
+            self._evict()
+
+        return entries[0][1]
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= len(entry)
+            self._stats['evictions'] += 1
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from bittorrent.layout import FileLayout
+from bittorrent.messages import Piece, Request
+from bittorrent.piece_store import PieceStore
+from bittorrent.pieces import PieceHashes
+from bittorrent.read_cache import BlockReadCache
+from bittorrent.storage import FileStorage
+
+
+class BlockReadCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = os.urandom(10 * 4096 - 100)
+        self.layout = FileLayout(
+            [('a', 5000), ('b', len(self.data) - 5000)], piece_length=4096
+        )
+        for f in self.layout.files:
+            with open(os.path.join(self.directory.name, f.path), 'wb') as fp:
+                fp.write(self.data[f.offset:f.offset+f.length])
+
+        self.info_hash = b'\x01' * 20
+        self.storage = FileStorage(self.layout, self.directory.name)
+
+    def tearDown(self):
+        self.storage.close()
+        self.directory.cleanup()
+
+    def test_get_block(self):
+        cache = BlockReadCache()
+        cache.add_torrent(self.info_hash, self.storage)
+
+        for begin in range(0, 4096, 1024):
+            block = cache.get_block(self.info_hash, 1, begin, 1024)
+            self.assertIsInstance(block, memoryview)
+            self.assertTrue(block.readonly)
+            self.assertEqual(block, self.data[4096+begin:4096+begin+1024])
+
+        block = cache.get_request(self.info_hash, Request(9, 3900, 96))
+        self.assertEqual(block, self.data[-96:])
+
+        self.assertEqual(cache.stats['hits'], 3)
+        self.assertEqual(cache.stats['misses'], 2)
+        self.assertEqual(len(cache), 2)
+
+        # Invalid blocks are rejected before anything is read.
+        for piece, begin, length in [(9, 3000, 1024), (2, -1, 16),
+                                     (2, 0, -1), (10, 0, 16), (-1, 0, 16)]:
+            with self.assertRaises(ValueError):
+                cache.get_block(self.info_hash, piece, begin, length)
+        self.assertEqual(cache.stats['reads'], 2)
+        self.assertEqual(len(cache), 2)
+        with self.assertRaises(KeyError):
+            cache.get_block(b'\x00' * 20, 0, 0, 1)
+
+        cache.remove_torrent(self.info_hash)
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+    def test_read_ahead_and_eviction(self):
+        cache = BlockReadCache(max_bytes=3 * 4096, read_ahead=2)
+        cache.add_torrent(self.info_hash, self.storage)
+
+        for piece in range(10):
+            self.assertEqual(
+                cache.get_block(self.info_hash, piece, 0, 16),
+                self.data[piece*4096:piece*4096+16]
+            )
+
+        stats = cache.stats
+        self.assertEqual(stats['misses'], 4)
+        self.assertEqual(stats['hits'], 6)
+        self.assertEqual(stats['reads'], 4)
+        self.assertLessEqual(cache.size, 3 * 4096)
+
+    def test_verified_pieces(self):
+        pieces = PieceHashes(b''.join(
+            hashlib.sha1(self.data[i:i+4096]).digest()
+            for i in range(0, len(self.data), 4096)
+        ))
+        with FileStorage(self.layout, self.directory.name,
+                         writable=True) as storage:
+            # Piece 1 is not downloaded yet, its bytes are stale on disk.
+            storage.write(1, bytes(4096))
+            store = PieceStore(storage, pieces, block_length=4096)
+            with store:
+                for piece in (0, 2):
+                    offset = piece * 4096
+                    self.assertTrue(store.add_block(
+                        Piece(piece, 0, self.data[offset:offset+4096])
+                    ))
+                store.flush()
+
+                cache = BlockReadCache(read_ahead=4)
+                cache.add_torrent(self.info_hash, storage, store.has_piece)
+                with self.assertRaises(ValueError):
+                    cache.get_block(self.info_hash, 1, 0, 16)
+                self.assertEqual(len(cache), 0)
+                self.assertEqual(
+                    cache.get_block(self.info_hash, 0, 0, 16), self.data[:16]
+                )
+                self.assertEqual(len(cache), 1)
+                self.assertEqual(cache.stats['read_ahead'], 0)
+
+                self.assertTrue(store.add_block(
+                    Piece(1, 0, self.data[4096:8192])
+                ))
+                store.flush()
+                self.assertEqual(
+                    cache.get_block(self.info_hash, 1, 0, 4096),
+                    self.data[4096:8192]
+                )
+                # Piece 2 was verified, piece 3 was not.
+                self.assertEqual(cache.stats['read_ahead'], 1)
+
+    def test_missing_data(self):
+        os.remove(os.path.join(self.directory.name, 'b'))
+        cache = BlockReadCache(read_ahead=4)
+        cache.add_torrent(self.info_hash, self.storage)
+
+        self.assertEqual(
+            cache.get_block(self.info_hash, 0, 0, 16), self.data[:16]
+        )
+        self.assertEqual(len(cache), 1)
+        with self.assertRaises(OSError):
+            cache.get_block(self.info_hash, 2, 0, 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,528 @@
+import collections
+import math
+import time
+
+from bittorrent.bitset import Bitset
+from bittorrent.layout import FileLayout
+from bittorrent.messages import Cancel, Request
+from bittorrent.piece_picker import PiecePicker
+from bittorrent.rate import RateEstimator
+from bittorrent.resume import BLOCK_LENGTH
+
+
+DEFAULT_MIN_DEPTH = 2
+DEFAULT_MAX_DEPTH = 500
+DEFAULT_REQUEST_TIMEOUT = 30.0
+DEFAULT_ENDGAME_COPIES = 2
+
+# The pipeline holds this many times the bandwidth-delay product, so that
+# the measured rate is not capped by the depth and the depth can grow.
+_DEPTH_GAIN = 2
+
+# The state of each block of a started piece.
+_FREE = 0
+_REQUESTED = 1
+_RECEIVED = 2
+
+
+class _PieceProgress(object):
+    """The blocks of a started piece."""
+    __slots__ = ('size', 'state', 'free', 'received', 'next')
+
+    def __init__(self, size, block_length):
+        count = -(-size // block_length)
+        self.size = size
+        self.state = bytearray(count)
+        self.free = count
+        self.received = 0
+        # No block before next is free.
+        self.next = 0
+
+
+class PeerPipeline(object):
+    """The requests in flight to a peer.
+
+    Attributes
+    ----------
+    peer : object
+        The key the peer was added with, e.g. its PeerConnection.
+    pieces : Bitset
+        The pieces the peer has.
+    choked : bool
+        Whether the peer is choking the local peer. No blocks are requested
+        from a choking peer.
+    outstanding : collections.OrderedDict
+        The (piece, begin) keys of the requested blocks mapped to the time
+        they were requested, oldest first.
+    depth : int
+        The number of requests to keep in flight.
+    rtt : float
+        The estimated round-trip time of a request in seconds, None until
+        a block is received. See RequestScheduler.
+    rate : RateEstimator
+        The download rate from the peer.
+    """
+
+    __slots__ = ('peer', 'pieces', 'choked', 'outstanding', 'depth', 'rtt',
+                 'rate', '_probe', '_cap')
+
+    def __init__(self, peer, pieces: Bitset, depth: int, now: float):
+        self.peer = peer
+        self.pieces = pieces
+        self.choked = True
+        self.outstanding = collections.OrderedDict()
+        self.depth = depth
+        self.rtt = None
+        self.rate = RateEstimator(now=now)
+        # A request sent while no other request was in flight.
+        self._probe = None
+        # The bound of the depth after a timeout, None if there is none.
+        self._cap = None
+
+    def __repr__(self):
+        return '{}(peer={}, outstanding={}, depth={})'.format(
+            type(self).__name__, self.peer, len(self.outstanding), self.depth
+        )
+
+
+class RequestScheduler(object):
+    """The RequestScheduler class is designed to decide which blocks to
+    request from each peer. Pieces are chosen by a PiecePicker and split
+    into blocks of block_length bytes, the blocks of a piece being
+    requested in order and, if possible, from the same peer.
+
+    Each peer has a pipeline of requests in flight whose depth follows the
+    peer's bandwidth-delay product: the download rate from the peer times
+    the round-trip time of a request. Without enough requests in flight,
+    the peer idles between a block and the next request and the transfer
+    rate is capped at depth * block_length / RTT. The depth is twice the
+    product so that the measured rate is not capped by the depth itself
+    and the depth can grow.
+
+    The time a block takes to arrive includes the time it waits behind the
+    other requests in flight, which grows with the depth. As such, the RTT
+    is measured with the requests sent while the pipeline was empty
+    (after an unchoke or a timeout) and only lowered by the others.
+
+    A request that times out is cancelled, its block is requested again
+    and the peer's depth is halved. The halved depth caps the depth
+    computed from the bandwidth-delay product. The cap grows by about one
+    block per round trip, and it is lifted when the next request sent
+    while the pipeline was empty is answered.
+
+    Once every remaining block is requested (the picker is in endgame),
+    the blocks in flight are also requested from the other peers that
+    have them, so that the last pieces do not wait for the slowest peer.
+    A block is requested from at most endgame_copies peers at once and
+    the duplicates fill the peers' pipelines like other requests, as such,
+    endgame requests are bounded by the peers' depth. When a copy arrives,
+    the other requests of the block are cancelled. The bytes of the copies
+    that arrive anyway are counted as redundant_bytes.
+
+    The scheduler does not send messages: fill returns the Request
+    messages to send to a peer, check_timeouts the Cancel messages of the
+    timed out requests, and the Cancel messages of the duplicate requests
+    are passed to the on_cancel callback.
+
+    Parameters
+    ----------
+    layout : FileLayout
+        The layout of the torrent, which gives the size of the pieces.
+    picker : PiecePicker
+        The picker choosing the pieces to start.
+    block_length : int
+        The length of the requested blocks.
+    min_depth, max_depth : int
+        The bounds of the pipelines' depth.
+    request_timeout : float
+        The number of seconds after which a request is cancelled.
+    endgame_copies : int
+        The maximum number of peers a block is requested from in endgame.
+    on_cancel : callable
+        Called as on_cancel(peer, message) with the Cancel messages to send
+        when a block requested from several peers is received.
+    """
+
+    def __init__(self, layout: FileLayout, picker: PiecePicker,
+                 block_length: int = BLOCK_LENGTH,
+                 min_depth: int = DEFAULT_MIN_DEPTH,
+                 max_depth: int = DEFAULT_MAX_DEPTH,
+                 request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                 endgame_copies: int = DEFAULT_ENDGAME_COPIES,
+                 on_cancel=None):
+        self.layout = layout
+        self.picker = picker
+        self.block_length = block_length
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.request_timeout = request_timeout
+        self.endgame_copies = endgame_copies
+        self.on_cancel = on_cancel
+
+        self._peers = {}
+        self._pieces = {}
+        # The pipelines each requested block was requested from.
+        self._owners = {}
+        self._stats = collections.Counter()
+
+    def __len__(self):
+        return len(self._peers)
+
+    @property
+    def stats(self) -> dict:
+        """Returns the scheduler's counters: requests, endgame_requests
+        (the duplicate requests), blocks (the number of requested blocks
+        received), redundant_blocks and redundant_bytes (the blocks
+        received after a copy), unexpected_blocks, timeouts and cancels.
+        """
+        return dict(self._stats)
+
+    def pipeline(self, peer) -> PeerPipeline:
+        """Returns the pipeline of a peer."""
+        return self._peers[peer]
+
+    def add_peer(self, peer, pieces: Bitset,
+                 now: float = None) -> PeerPipeline:
+        """This method adds a peer, choked, whose pieces are pieces. The
+        pieces are not counted by the picker, see PiecePicker.add_peer.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        pipeline = PeerPipeline(peer, pieces, self.min_depth, now)
+        self._peers[peer] = pipeline
+
+        return pipeline
+
+    def remove_peer(self, peer):
+        """This method removes a peer, its requests are requested again
+        from other peers.
+        """
+        pipeline = self._peers.pop(peer)
+        self._drop(pipeline)
+
+    def set_choked(self, peer, choked: bool):
+        """This method updates the choking state of a peer. A peer that
+        chokes discards the requests it received, as such, their blocks
+        are requested again.
+        """
+        pipeline = self._peers[peer]
+        pipeline.choked = choked
+        if choked:
+            self._drop(pipeline)
+
+    def fill(self, peer, now: float = None) -> list:
+        """This method is designed to choose the blocks to request from a
+        peer so that its pipeline is full.
+
+        Parameters
+        ----------
+        peer : object
+            The peer's key.
+        now : float
+            The current time, time.monotonic() if None.
+
+        Returns
+        -------
+        list of Request
+            The Request messages to send to the peer, in order.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        pipeline = self._peers[peer]
+        if pipeline.choked:
+            return []
+
+        requests = []
+        while len(pipeline.outstanding) < pipeline.depth:
+            piece = self.picker.pick(pipeline.pieces)
+            if piece is None:
+                break
+
+            progress = self._pieces.get(piece)
+            if progress is None:
+                self.picker.start_piece(piece)
+                progress = self._pieces[piece] = _PieceProgress(
+                    self.layout.piece_size(piece), self.block_length
+                )
+            if not progress.free:
+                break
+
+            self._request_blocks(pipeline, piece, progress, requests, now)
+
+        if self.picker.endgame \
+                and len(pipeline.outstanding) < pipeline.depth:
+            self._request_duplicates(pipeline, requests, now)
+
+        self._stats['requests'] += len(requests)
+        return requests
+
+    def block_received(self, peer, index: int, begin: int, length: int,
+                       now: float = None) -> bool:
+        """This method is designed to record a block received from a peer
+        and to adapt the peer's pipeline depth.
+
+        Parameters
+        ----------
+        peer : object
+            The peer's key.
+        index, begin, length : int
+            The piece, offset, and length of the block, as in the Piece
+            message.
+        now : float
+            The current time, time.monotonic() if None.
+
+        Returns
+        -------
+        bool
+            True if the block was requested and not received yet, False
+            otherwise (the block should then be discarded).
+        """
+        if now is None:
+            now = time.monotonic()
+
+        pipeline = self._peers.get(peer)
+
+        if not 0 <= index < self.layout.piece_count:
+            self._stats['unexpected_blocks'] += 1
+            return False
+
+        progress = self._pieces.get(index)
+        key = (index, begin)
+        if progress is None and self.picker.has_piece(index) \
+                or progress is not None and begin < progress.size \
+                and progress.state[begin // self.block_length] == _RECEIVED:
+            if pipeline is not None:
+                pipeline.outstanding.pop(key, None)
+            self._stats['redundant_blocks'] += 1
+            self._stats['redundant_bytes'] += length
+            return False
+        if progress is None or begin % self.block_length \
+                or begin >= progress.size:
+            self._stats['unexpected_blocks'] += 1
+            return False
+
+        block = begin // self.block_length
+        expected = min(self.block_length, progress.size - begin)
+        if length != expected:
+            self._stats['unexpected_blocks'] += 1
+            return False
+
+        if pipeline is not None:
+            # Only the accepted blocks count towards the peer's rate, and
+            # as such, its depth.
+            pipeline.rate.update(length, now)
+            sent = pipeline.outstanding.pop(key, None)
+            if sent is not None:
+                probe = key == pipeline._probe
+                if probe:
+                    pipeline._probe = None
+                self._update_depth(pipeline, now - sent, probe, now)
+
+        for owner in self._owners.pop(key, ()):
+            if owner is not pipeline:
+                # The block was also requested from another peer.
+                owner.outstanding.pop(key, None)
+                self._cancel(owner.peer, key, length)
+
+        if progress.state[block] == _FREE:
+            # A block received after its request timed out.
+            progress.free -= 1
+            if not progress.free:
+                self.picker.mark_requested(index)
+        progress.state[block] = _RECEIVED
+        progress.received += 1
+        self._stats['blocks'] += 1
+
+        return True
+
+    def is_complete(self, piece: int) -> bool:
+        """Returns True if all the blocks of a started piece were
+        received.
+        """
+        progress = self._pieces.get(piece)
+        return progress is not None \
+            and progress.received == len(progress.state)
+
+    def piece_finished(self, piece: int):
+        """This method forgets a piece that was verified."""
+        self._forget(piece)
+        self.picker.piece_finished(piece)
+
+    def piece_failed(self, piece: int):
+        """This method forgets a piece that did not match its hash, the
+        piece is downloaded again.
+        """
+        self._forget(piece)
+        self.picker.abort_piece(piece)
+
+    def check_timeouts(self, now: float = None) -> list:
+        """This method is designed to cancel the requests that were not
+        answered within request_timeout seconds. Their blocks are requested
+        again, from any peer, and the depth of the peers that did not answer
+        is halved.
+
+        Returns
+        -------
+        list of (object, Cancel)
+            The peers' keys and the Cancel messages to send to them.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        deadline = now - self.request_timeout
+        cancels = []
+        for pipeline in self._peers.values():
+            outstanding = pipeline.outstanding
+            timed_out = False
+            # The requests are ordered by time.
+            while outstanding:
+                key, sent = next(iter(outstanding.items()))
+                if sent > deadline:
+                    break
+                del outstanding[key]
+                self._release(key, pipeline)
+                cancels.append((pipeline.peer, Cancel(
+                    key[0], key[1], self._block_size(key)
+                )))
+                timed_out = True
+
+            if timed_out:
+                pipeline.depth = max(self.min_depth, pipeline.depth // 2)
+                pipeline._cap = pipeline.depth
+                self._stats['timeouts'] += 1
+
+        self._stats['cancels'] += len(cancels)
+        return cancels
+
+    def _cancel(self, peer, key, length):
+        self._stats['cancels'] += 1
+        if self.on_cancel is not None:
+            self.on_cancel(peer, Cancel(key[0], key[1], length))
+
+    def _block_size(self, key):
+        piece, begin = key
+        return min(self.block_length, self._pieces[piece].size - begin)
+
+    def _request_blocks(self, pipeline, piece, progress, requests, now):
+        """This method requests the free blocks of a piece from a peer
+        until its pipeline is full.
+        """
+        state = progress.state
+        i = progress.next
+        while progress.free and len(pipeline.outstanding) < pipeline.depth:
+            while state[i] != _FREE:
+                i += 1
+            state[i] = _REQUESTED
+            progress.free -= 1
+
+            begin = i * self.block_length
+            key = (piece, begin)
+            if not pipeline.outstanding:
+                pipeline._probe = key
+            pipeline.outstanding[key] = now
+            self._owners[key] = [pipeline]
+            requests.append(Request(
+                piece, begin, min(self.block_length, progress.size - begin)
+            ))
+            i += 1
+        progress.next = i
+
+        if not progress.free:
+            self.picker.mark_requested(piece)
+
+    def _request_duplicates(self, pipeline, requests, now):
+        """This method requests from a peer the blocks in flight to fewer
+        than endgame_copies other peers, until its pipeline is full.
+        """
+        count = 0
+        for piece, progress in self._pieces.items():
+            if not pipeline.pieces.has(piece):
+                continue
+
+            state = progress.state
+            for block in range(len(state)):
+                if state[block] != _REQUESTED:
+                    continue
+                begin = block * self.block_length
+                key = (piece, begin)
+                owners = self._owners[key]
+                if len(owners) >= self.endgame_copies or pipeline in owners:
+                    continue
+
+                owners.append(pipeline)
+                pipeline.outstanding[key] = now
+                requests.append(Request(
+                    piece, begin, min(self.block_length, progress.size - begin)
+                ))
+                count += 1
+                if len(pipeline.outstanding) >= pipeline.depth:
+                    self._stats['endgame_requests'] += count
+                    return
+
+        self._stats['endgame_requests'] += count
+
+    def _update_depth(self, pipeline, sample, probe, now):
+        if probe or pipeline.rtt is None or sample < pipeline.rtt:
+            pipeline.rtt = sample
+
+        bdp = pipeline.rate.rate(now) * pipeline.rtt / self.block_length
+        depth = min(self.max_depth, max(
+            self.min_depth, math.ceil(_DEPTH_GAIN * bdp) + 1
+        ))
+
+        if pipeline._cap is not None:
+            if probe:
+                pipeline._cap = None
+            else:
+                # One more block after about depth blocks, that is, after
+                # about a round trip.
+                pipeline._cap += 1 / pipeline._cap
+                depth = min(depth, int(pipeline._cap))
+
+        pipeline.depth = depth
+
+    def _release(self, key, pipeline):
+        """This method frees a requested block so that it is requested
+        again.
+        """
+        owners = self._owners.get(key)
+        if owners is not None and pipeline in owners:
+            owners.remove(pipeline)
+            if owners:
+                # The block is still requested from another peer.
+                return
+            del self._owners[key]
+
+        piece, begin = key
+        progress = self._pieces.get(piece)
+        if progress is None:
+            return
+        block = begin // self.block_length
+        if progress.state[block] != _REQUESTED:
+            return
+
+        progress.state[block] = _FREE
+        progress.free += 1
+        progress.next = min(progress.next, block)
+        self.picker.mark_partial(piece)
+
+    def _drop(self, pipeline):
+        for key in pipeline.outstanding:
+            self._release(key, pipeline)
+        pipeline.outstanding.clear()
+
+    def _forget(self, piece):
+        progress = self._pieces.pop(piece, None)
+        if progress is None:
+            return
+
+        for block in range(len(progress.state)):
+            key = (piece, block * self.block_length)
+            for owner in self._owners.pop(key, ()):
+                owner.outstanding.pop(key, None)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,234 @@
+import heapq
+import unittest
+
+from bittorrent.bitset import Bitset
+from bittorrent.layout import FileLayout
+from bittorrent.messages import Cancel, Request
+from bittorrent.piece_picker import PiecePicker
+from bittorrent.request_scheduler import RequestScheduler
+
+
+BLOCK = 16 * 1024
+
+
+class RequestSchedulerTest(unittest.TestCase):
+
+    def make_scheduler(self, total_length, piece_length=4 * BLOCK, **kwargs):
+        layout = FileLayout([('a', total_length)], piece_length)
+        picker = PiecePicker(layout.piece_count, seed=0)
+        return RequestScheduler(layout, picker, **kwargs)
+
+    def add_peer(self, scheduler, peer, now=0.0):
+        pieces = Bitset.full(scheduler.layout.piece_count)
+        scheduler.picker.add_peer(pieces)
+        scheduler.add_peer(peer, pieces, now=now)
+        scheduler.set_choked(peer, False)
+
+    def test_blocks(self):
+        scheduler = self.make_scheduler(6 * BLOCK + 100, max_depth=100)
+        self.add_peer(scheduler, 'a')
+
+        requests = scheduler.fill('a', now=0.0)
+        index = requests[0].index
+        # The depth is min_depth until a block is received.
+        self.assertEqual(
+            requests, [Request(index, 0, BLOCK), Request(index, BLOCK, BLOCK)]
+        )
+
+        now = 0.0
+        while scheduler.pipeline('a').outstanding:
+            now += 0.01
+            index, begin = next(iter(scheduler.pipeline('a').outstanding))
+            length = min(BLOCK, scheduler.layout.piece_size(index) - begin)
+            self.assertTrue(
+                scheduler.block_received('a', index, begin, length, now=now)
+            )
+            if scheduler.is_complete(index):
+                scheduler.piece_finished(index)
+            requests.extend(scheduler.fill('a', now=now))
+
+        self.assertEqual(
+            sorted((r.index, r.begin, r.length) for r in requests), [
+                (0, 0, BLOCK), (0, BLOCK, BLOCK), (0, 2 * BLOCK, BLOCK),
+                (0, 3 * BLOCK, BLOCK), (1, 0, BLOCK), (1, BLOCK, BLOCK),
+                (1, 2 * BLOCK, 100)
+            ]
+        )
+        self.assertTrue(all(scheduler.picker.has_piece(p) for p in range(2)))
+        self.assertFalse(scheduler.block_received('a', 0, 0, BLOCK))
+        self.assertEqual(scheduler.stats['blocks'], 7)
+
+    def test_choke_and_timeout(self):
+        scheduler = self.make_scheduler(
+            8 * BLOCK, min_depth=4, request_timeout=10.0
+        )
+        self.add_peer(scheduler, 'a')
+        first = scheduler.fill('a', now=0.0)
+        self.assertEqual(len(first), 4)
+
+        scheduler.set_choked('a', True)
+        self.assertEqual(scheduler.fill('a'), [])
+        scheduler.set_choked('a', False)
+        # The dropped requests are requested again.
+        self.assertEqual(scheduler.fill('a', now=1.0), first)
+
+        self.assertEqual(scheduler.check_timeouts(now=5.0), [])
+        cancels = scheduler.check_timeouts(now=11.0)
+        self.assertEqual(cancels, [
+            ('a', Cancel(r.index, r.begin, r.length)) for r in first
+        ])
+        self.assertEqual(scheduler.pipeline('a').outstanding, {})
+
+        # A block received after its request timed out is kept.
+        r = first[0]
+        self.assertTrue(
+            scheduler.block_received('a', r.index, r.begin, r.length, 12.0)
+        )
+        self.assertNotIn(
+            (r.index, r.begin),
+            [(m.index, m.begin) for m in scheduler.fill('a', now=12.0)]
+        )
+
+    def test_rate_counts_accepted_blocks(self):
+        scheduler = self.make_scheduler(8 * BLOCK, min_depth=2)
+        self.add_peer(scheduler, 'a')
+        requests = scheduler.fill('a', now=0.0)
+        pipeline = scheduler.pipeline('a')
+
+        r = requests[0]
+        self.assertTrue(
+            scheduler.block_received('a', r.index, r.begin, r.length, 1.0)
+        )
+        rate = pipeline.rate.rate(1.0)
+        self.assertGreater(rate, 0)
+
+        # Redundant and unexpected blocks.
+        self.assertFalse(
+            scheduler.block_received('a', r.index, r.begin, r.length, 1.0)
+        )
+        self.assertFalse(scheduler.block_received('a', 1, 100, BLOCK, 1.0))
+        self.assertFalse(scheduler.block_received('a', 99, 0, BLOCK, 1.0))
+        self.assertEqual(pipeline.rate.rate(1.0), rate)
+
+    def test_timeout_caps_depth(self):
+        scheduler = self.make_scheduler(
+            64 * BLOCK, min_depth=2, request_timeout=1.0
+        )
+        self.add_peer(scheduler, 'a')
+        pipeline = scheduler.pipeline('a')
+        pipeline.depth = 16
+        requests = scheduler.fill('a', now=0.0)
+        self.assertEqual(len(requests), 16)
+
+        # The peer's rate and RTT allow a deep pipeline.
+        now = 0.49
+        for r in requests[:8]:
+            now += 0.01
+            scheduler.block_received('a', r.index, r.begin, r.length, now)
+        later = scheduler.fill('a', now=now)
+        depth = pipeline.depth
+        self.assertGreater(depth, 8)
+
+        # The other first requests time out.
+        scheduler.check_timeouts(now=1.05)
+        self.assertEqual(pipeline.depth, depth // 2)
+
+        # The later requests are answered at the same rate, the halved
+        # depth persists and only grows slowly.
+        now = 1.06
+        for r in later[:4]:
+            now += 0.01
+            scheduler.block_received('a', r.index, r.begin, r.length, now)
+        self.assertEqual(pipeline.depth, depth // 2)
+
+    def test_endgame(self):
+        cancels = []
+        scheduler = self.make_scheduler(
+            4 * BLOCK, min_depth=4, endgame_copies=2,
+            on_cancel=lambda peer, message: cancels.append((peer, message))
+        )
+        for peer in ('a', 'b', 'c'):
+            self.add_peer(scheduler, peer)
+
+        first = scheduler.fill('a', now=0.0)
+        self.assertEqual(len(first), 4)
+        self.assertTrue(scheduler.picker.endgame)
+
+        # The blocks in flight to a are requested once more, from b only.
+        self.assertEqual(scheduler.fill('b', now=0.0), first)
+        self.assertEqual(scheduler.fill('c', now=0.0), [])
+        self.assertEqual(scheduler.stats['endgame_requests'], 4)
+
+        # b answers first, a's requests are cancelled.
+        r = first[0]
+        self.assertTrue(
+            scheduler.block_received('b', r.index, r.begin, r.length, 1.0)
+        )
+        self.assertEqual(cancels, [('a', Cancel(r.index, r.begin, r.length))])
+        self.assertNotIn(
+            (r.index, r.begin), scheduler.pipeline('a').outstanding
+        )
+
+        # A copy sent by a before the Cancel arrived is redundant.
+        self.assertFalse(
+            scheduler.block_received('a', r.index, r.begin, r.length, 1.1)
+        )
+        self.assertEqual(scheduler.stats['redundant_bytes'], BLOCK)
+
+        # b is choked: its blocks are still requested from a.
+        scheduler.set_choked('b', True)
+        self.assertEqual(len(scheduler.pipeline('a').outstanding), 3)
+        # c replaces b.
+        self.assertEqual(scheduler.fill('c', now=2.0), first[1:])
+
+        for r in first[1:]:
+            self.assertTrue(
+                scheduler.block_received('a', r.index, r.begin, r.length, 3.0)
+            )
+        self.assertTrue(scheduler.is_complete(r.index))
+        self.assertEqual(len(cancels), 4)
+        self.assertEqual(scheduler.pipeline('c').outstanding, {})
+
+    def test_depth_follows_bandwidth_delay_product(self):
+        bandwidth = 4e6
+        rtt = 0.2
+        scheduler = self.make_scheduler(
+            1024 * 1024 * 1024, piece_length=256 * 1024
+        )
+        self.add_peer(scheduler, 'a')
+
+        # A peer serving the requests in order over a link of the given
+        # bandwidth and round-trip time.
+        arrivals = []
+        link_free = 0.0
+        received = 0
+
+        def send(requests, now):
+            nonlocal link_free
+            for r in requests:
+                link_free = max(now + rtt / 2, link_free) \
+                    + r.length / bandwidth
+                heapq.heappush(
+                    arrivals, (link_free + rtt / 2, r.index, r.begin, r.length)
+                )
+
+        send(scheduler.fill('a', now=0.0), 0.0)
+        while arrivals:
+            now, index, begin, length = heapq.heappop(arrivals)
+            if now > 20.0:
+                break
+            scheduler.block_received('a', index, begin, length, now=now)
+            if now > 10.0:
+                received += length
+            send(scheduler.fill('a', now=now), now)
+
+        pipeline = scheduler.pipeline('a')
+        bdp = bandwidth * rtt / BLOCK
+        self.assertAlmostEqual(pipeline.rtt, rtt, delta=0.02)
+        self.assertGreater(pipeline.depth, bdp)
+        self.assertLess(pipeline.depth, 3 * bdp)
+        self.assertGreater(received / 10.0, 0.95 * bandwidth)
+
+
+if __name__ == "__main__":
+    unittest.main()
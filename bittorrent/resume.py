@@ -0,0 +1,262 @@
+import os
+import tempfile
+
+import bittorrent.bencoding as bencoding
+from bittorrent.exceptions import InvalidTorrentFileBencoding
+from bittorrent.layout import FileLayout
+
+
+BLOCK_LENGTH = 16 * 1024
+
+_FORMAT = b'bittorrent resume'
+_VERSION = 1
+
+
+class ResumeState(object):
+    """The ResumeState class is designed to hold the completion state of
+    a torrent so that it can be saved and trusted after a restart instead
+    of rehashing all the pieces. The state is made of:
+        the bitfield of the verified pieces;
+
+        the block maps of the partially downloaded pieces, one bit per
+        block of BLOCK_LENGTH bytes;
+
+        the modification time and size of each file when the state was
+        saved. When the state is loaded, the pieces overlapping a file
+        whose stats changed are no longer trusted.
+
+    Updates are made in memory and only mark the state as dirty, saving
+    it rewrites the resume file atomically.
+
+    Parameters
+    ----------
+    info_hash : bytes
+        The info hash of the torrent.
+    layout : FileLayout
+        The layout of the torrent's files.
+    """
+
+    def __init__(self, info_hash: bytes, layout: FileLayout):
+        self.info_hash = bytes(info_hash)
+        self.layout = layout
+
+        self.bitfield = bytearray(-(-layout.piece_count // 8))
+        self.partial = {}
+        self.file_stats = [None] * len(layout.files)
+        self.dirty = False
+
+    @property
+    def completed(self) -> int:
+        """Returns the number of verified pieces."""
+        return int.from_bytes(self.bitfield, 'big').bit_count()
+
+    def has_piece(self, piece: int) -> bool:
+        """Returns True if the piece at index piece is verified."""
+        return bool(self.bitfield[piece >> 3] & (0x80 >> (piece & 7)))
+
+    def set_piece(self, piece: int, have: bool = True):
+        """This method marks a piece as verified, or as missing if have is
+        False. The piece's block map is discarded.
+        """
+        if not 0 <= piece < self.layout.piece_count:
+            raise IndexError('Piece index out of range: {}'.format(piece))
+
+        if have:
+            self.bitfield[piece >> 3] |= 0x80 >> (piece & 7)
+        else:
+            self.bitfield[piece >> 3] &= ~(0x80 >> (piece & 7)) & 0xff
+        self.partial.pop(piece, None)
+        self.dirty = True
+
+    def set_block(self, piece: int, begin: int):
+        """This method marks the block starting at offset begin of a piece
+        that is not verified yet as received. begin must be a multiple of
+        BLOCK_LENGTH within the piece, otherwise a ValueError is raised.
+        """
+        if not 0 <= piece < self.layout.piece_count:
+            raise IndexError('Piece index out of range: {}'.format(piece))
+
+        piece_size = self.layout.piece_size(piece)
+        if not 0 <= begin < piece_size or begin % BLOCK_LENGTH:
+            raise ValueError(
+                'Invalid block offset {} for piece {}.'.format(begin, piece)
+            )
+
+        if self.has_piece(piece):
+            return
+
+        blocks = self.partial.get(piece)
+        if blocks is None:
+            block_count = -(-piece_size // BLOCK_LENGTH)
+            blocks = self.partial[piece] = bytearray(-(-block_count // 8))
+
+        block = begin // BLOCK_LENGTH
+        blocks[block >> 3] |= 0x80 >> (block & 7)
+        self.dirty = True
+
+    def blocks(self, piece: int) -> list:
+        """Returns the offsets of the received blocks of a piece that is
+        not verified yet.
+        """
+        blocks = self.partial.get(piece)
+        if blocks is None:
+            return []
+
+        block_count = -(-self.layout.piece_size(piece) // BLOCK_LENGTH)
+        return [
+            block * BLOCK_LENGTH for block in range(block_count)
+            if blocks[block >> 3] & (0x80 >> (block & 7))
+        ]
+
+    def save(self, path: str, directory: str):
+        """This method is designed to write the state to a resume file.
+        The file is written to a temporary file that replaces the resume
+        file once it is complete, as such, a crash while saving leaves the
+        previous resume file intact.
+
+        Parameters
+        ----------
+        path : str
+            The path of the resume file.
+        directory : str
+            The download directory the layout's paths are relative to. The
+            stats of the files are read when the state is saved.
+        """
+        self.file_stats = _file_stats(self.layout, directory)
+        contents = bencoding.encode({
+            b'file-format': _FORMAT,
+            b'file-version': _VERSION,
+            b'info-hash': self.info_hash,
+            b'pieces': self.bitfield,
+            b'partial': [
+                [piece, blocks]
+                for piece, blocks in sorted(self.partial.items())
+            ],
+            b'files': [
+                list(stats) if stats else [] for stats in self.file_stats
+            ],
+        })
+
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)),
+            prefix='.' + os.path.basename(path), suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(contents)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self.dirty = False
+
+    def save_if_dirty(self, path: str, directory: str) -> bool:
+        """This method saves the state only if it changed since it was
+        last saved or loaded and returns whether it was saved.
+        """
+        if not self.dirty:
+            return False
+
+        self.save(path, directory)
+        return True
+
+    @classmethod
+    def load(cls, path: str, info_hash: bytes, layout: FileLayout,
+             directory: str):
+        """This method is designed to load the state of a torrent from a
+        resume file and to check it against the files on disk. The pieces
+        and block maps overlapping a file whose modification time or size
+        changed since the state was saved are discarded.
+
+        Parameters
+        ----------
+        path : str
+            The path of the resume file.
+        info_hash : bytes
+            The info hash of the torrent.
+        layout : FileLayout
+            The layout of the torrent's files.
+        directory : str
+            The download directory the layout's paths are relative to.
+
+        Returns
+        -------
+        ResumeState
+            The loaded state. An empty state is returned if the resume
+            file does not exist, is invalid (e.g. a block map does not
+            have one bit per block of its piece), or belongs to another
+            torrent.
+        """
+        state = cls(info_hash, layout)
+
+        try:
+            with open(path, 'rb') as f:
+                d = bencoding.decode(f.read())
+            if d[b'file-format'] != _FORMAT \
+                    or d[b'file-version'] != _VERSION \
+                    or d[b'info-hash'] != state.info_hash \
+                    or len(d[b'pieces']) != len(state.bitfield) \
+                    or len(d[b'files']) != len(layout.files):
+                return state
+            bitfield = bytearray(d[b'pieces'])
+            partial = {}
+            for piece, blocks in d[b'partial']:
+                if not 0 <= piece < layout.piece_count:
+                    continue
+                block_count = -(-layout.piece_size(piece) // BLOCK_LENGTH)
+                if len(blocks) != -(-block_count // 8):
+                    raise ValueError(
+                        'Invalid block map for piece {}.'.format(piece)
+                    )
+                partial[piece] = bytearray(blocks)
+            saved_stats = [tuple(stats) or None for stats in d[b'files']]
+        except (OSError, InvalidTorrentFileBencoding, KeyError, TypeError,
+                ValueError):
+            return state
+
+        state.bitfield = bitfield
+        state.partial = partial
+        state.file_stats = _file_stats(layout, directory)
+
+        for entry, saved, current in zip(layout.files, saved_stats,
+                                         state.file_stats):
+            if saved != current:
+                for piece in layout.piece_range(entry.index):
+                    state.bitfield[piece >> 3] &= ~(0x80 >> (piece & 7)) & 0xff
+                    state.partial.pop(piece, None)
+
+        # The spare bits of the last byte must be cleared.
+        if layout.piece_count % 8:
+            state.bitfield[-1] &= (0xff << (8 - layout.piece_count % 8)) & 0xff
+
+        return state
+
+
+def resume_path(directory: str, info_hash: bytes) -> str:
+    """Returns the path of the resume file of a torrent in directory. The
+    file is named after the hex digest of the torrent's info hash.
+    """
+    return os.path.join(directory, '{}.resume'.format(bytes(info_hash).hex()))
+
+
+def _file_stats(layout, directory):
+    """Returns the (mtime_ns, size) stats of the layout's files, or None
+    for the files that do not exist.
+    """
+    stats = []
+    for entry in layout.files:
+        try:
+            st = os.stat(os.path.join(directory, entry.path))
+        except OSError:
+            stats.append(None)
+        else:
+            stats.append((st.st_mtime_ns, st.st_size))
+
+    return stats
+
+
+if __name__ == "__main__":
+    pass
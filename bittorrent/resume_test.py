@@ -0,0 +1,103 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from bittorrent.layout import FileLayout
+from bittorrent.resume import BLOCK_LENGTH, ResumeState, resume_path
+
+
+class ResumeStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.info_hash = hashlib.sha1(b'torrent').digest()
+        self.layout = FileLayout(
+            [('a', 100000), ('b', 0), ('c', 200000)], piece_length=32768
+        )
+        for f in self.layout.files:
+            path = os.path.join(self.directory.name, f.path)
+            with open(path, 'wb') as fp:
+                fp.truncate(f.length)
+
+        self.path = resume_path(self.directory.name, self.info_hash)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self, info_hash=None):
+        return ResumeState.load(
+            self.path, info_hash or self.info_hash, self.layout,
+            self.directory.name
+        )
+
+    def test_round_trip(self):
+        state = ResumeState(self.info_hash, self.layout)
+        for piece in (0, 1, 5, 9):
+            state.set_piece(piece)
+        state.set_block(4, BLOCK_LENGTH)
+        state.set_block(9, 0)
+        self.assertTrue(state.save_if_dirty(self.path, self.directory.name))
+        self.assertFalse(state.save_if_dirty(self.path, self.directory.name))
+
+        loaded = self.load()
+        self.assertEqual(loaded.bitfield, state.bitfield)
+        self.assertEqual(loaded.completed, 4)
+        self.assertEqual(loaded.blocks(4), [BLOCK_LENGTH])
+        self.assertEqual(loaded.blocks(9), [])
+        self.assertFalse(loaded.dirty)
+
+        self.assertEqual(self.load(b'\x00' * 20).completed, 0)
+
+    def test_invalid_block(self):
+        state = ResumeState(self.info_hash, self.layout)
+        # The last piece is shorter than a block.
+        for piece, begin in ((0, -BLOCK_LENGTH), (0, 2 * BLOCK_LENGTH),
+                             (0, 1), (9, BLOCK_LENGTH)):
+            with self.assertRaises(ValueError):
+                state.set_block(piece, begin)
+        with self.assertRaises(IndexError):
+            state.set_block(10, 0)
+
+        state.set_block(9, 0)
+        self.assertEqual(state.blocks(9), [0])
+        self.assertEqual(list(state.partial), [9])
+
+    def test_changed_file(self):
+        state = ResumeState(self.info_hash, self.layout)
+        for piece in range(self.layout.piece_count):
+            state.set_piece(piece)
+        state.set_piece(8, False)
+        state.set_block(8, 0)
+        state.save(self.path, self.directory.name)
+
+        with open(os.path.join(self.directory.name, 'c'), 'ab') as f:
+            f.write(b'\x00')
+
+        loaded = self.load()
+        self.assertEqual(
+            [loaded.has_piece(p) for p in range(self.layout.piece_count)],
+            [True, True, True] + [False] * 7
+        )
+        self.assertEqual(loaded.blocks(8), [])
+
+    def test_invalid_file(self):
+        self.assertEqual(self.load().completed, 0)
+
+        with open(self.path, 'wb') as f:
+            f.write(b'd4:spam')
+        self.assertEqual(self.load().completed, 0)
+
+        # A block map of the wrong length.
+        state = ResumeState(self.info_hash, self.layout)
+        state.set_piece(0)
+        state.set_block(4, BLOCK_LENGTH)
+        state.partial[4] = bytearray(2)
+        state.save(self.path, self.directory.name)
+        loaded = self.load()
+        self.assertEqual(loaded.completed, 0)
+        self.assertEqual(loaded.blocks(4), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,422 @@
+import concurrent.futures
+import errno
+import os
+import re
+import shutil
+import threading
+
+from bittorrent.layout import _DRIVE
+from bittorrent.layout import FileLayout
+
+
+# The maximum number of buffers passed to a single os.preadv or os.pwritev
+# call.
+_IOV_MAX = 1024
+
+# Files are created with their length but without allocating their
+# blocks, which are allocated when they are written.
+ALLOCATE_SPARSE = 'sparse'
+# The blocks of the files are allocated when they are created.
+ALLOCATE_FULL = 'full'
+
+# A path separator, which the components of a file's path must not
+# contain.
+_SEPARATOR = re.compile(r'[\\/]')
+
+
+class FileStorage(object):
+    """The FileStorage class is designed to read and write the pieces of
+    a torrent from and to the files they are stored in. File descriptors
+    are opened on first use and kept open until the storage is closed.
+
+    Reads and writes are positional (os.preadv and os.pwritev), as such, a
+    FileStorage instance can be shared by several threads without any
+    locking around the reads and writes.
+
+    Parameters
+    ----------
+    layout : FileLayout
+        The layout of the torrent's files.
+    directory : str
+        The download directory the layout's paths are relative to.
+    writable : bool
+        If True, the files are opened for writing and are created, along
+        with their directories, if they do not exist.
+    """
+
+    def __init__(self, layout: FileLayout, directory: str,
+                 writable: bool = False):
+        self.layout = layout
+        self.directory = directory
+        self.writable = writable
+
+        self._fds = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_torrent(cls, torrent, directory: str, writable: bool = False):
+        """This method returns the FileStorage of a Torrent instance."""
+        return cls(torrent.layout, directory, writable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def path(self, file_index: int) -> str:
+        """This method is designed to return the path of the file at
+        file_index, which is checked to be inside the download directory.
+
+        Raises
+        ------
+        ValueError
+            A ValueError is raised if the file's path is absolute, has a
+            drive, an empty, '.' or '..' component, or resolves, e.g.
+            through a symbolic link, to a path outside of the download
+            directory.
+        """
+        relative = self.layout.files[file_index].path
+        if os.path.isabs(relative) or _DRIVE.match(relative) or any(
+                part in ('', '.', '..')
+                for part in _SEPARATOR.split(relative)):
+            raise ValueError('Unsafe file path: {!r}'.format(relative))
+
+        path = os.path.join(self.directory, relative)
+        root = os.path.realpath(self.directory)
+        if os.path.commonpath([root, os.path.realpath(path)]) != root:
+            raise ValueError(
+                'File path outside of the download directory: {!r}'.format(
+                    relative
+                )
+            )
+
+        return path
+
+    def close(self):
+        """This method closes the open file descriptors."""
+        with self._lock:
+            fds, self._fds = self._fds, {}
+        for fd in fds.values():
+            os.close(fd)
+
+    def allocate(self, mode: str = ALLOCATE_SPARSE,
+                 workers: int = None) -> list:
+        """This method is designed to create the files and directories of
+        the layout with their final length. Files that already have the
+        right length are skipped and the others are created, extended, or
+        truncated. Files are allocated in parallel by a pool of threads.
+
+        In ALLOCATE_FULL mode, the blocks of the files are allocated with
+        os.posix_fallocate where it is available (and supported by the
+        file system), which reduces fragmentation and makes a lack of disk
+        space fail before the download starts.
+
+        Parameters
+        ----------
+        mode : str
+            ALLOCATE_SPARSE or ALLOCATE_FULL.
+        workers : int
+            The number of threads. Defaults to the number of CPUs.
+
+        Returns
+        -------
+        list of int
+            The indices of the files that were created or resized.
+
+        Raises
+        ------
+        ValueError
+            A ValueError is raised if the mode is unknown.
+        OSError
+            An OSError is raised if a file could not be allocated. In
+            ALLOCATE_FULL mode, an OSError with errno ENOSPC is raised
+            before any file is allocated if the disk does not have enough
+            free space.
+        """
+        if mode not in (ALLOCATE_SPARSE, ALLOCATE_FULL):
+            raise ValueError('Unknown allocation mode: {}'.format(mode))
+
+        missing = []
+        for entry in self.layout.files:
+            try:
+                size = os.stat(self.path(entry.index)).st_size
+            except FileNotFoundError:
+                size = 0
+                missing.append(entry.index)
+            else:
+                if size != entry.length:
+                    missing.append(entry.index)
+
+        if mode == ALLOCATE_FULL and missing:
+            needed = sum(self.layout.files[i].length for i in missing)
+            directory = self.directory
+            while not os.path.isdir(directory):
+                directory = os.path.dirname(os.path.abspath(directory))
+            if needed > shutil.disk_usage(directory).free:
+                raise OSError(
+                    errno.ENOSPC,
+                    '{} bytes are needed to allocate the files.'.format(
+                        needed
+                    )
+                )
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            list(pool.map(
+                lambda index: self._allocate_file(index, mode), missing
+            ))
+
+        return missing
+
+    def _allocate_file(self, file_index, mode):
+        path = self.path(file_index)
+        length = self.layout.files[file_index].length
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fd = os.open(
+            path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644
+        )
+        try:
+            if os.fstat(fd).st_size > length:
+                os.ftruncate(fd, length)
+            if mode == ALLOCATE_FULL and length \
+                    and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(fd, 0, length)
+                    return
+                except OSError as e:
+                    if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                        raise
+            os.ftruncate(fd, length)
+        finally:
+            os.close(fd)
+
+    def sync(self):
+        """This method flushes the written data of the open files to
+        disk.
+        """
+        with self._lock:
+            fds = list(self._fds.values())
+        for fd in fds:
+            os.fsync(fd)
+
+    def _fd(self, file_index):
+        """Returns the file descriptor of the file at file_index or None
+        if the file does not exist and the storage is not writable.
+        """
+        fd = self._fds.get(file_index)
+        if fd is not None:
+            return fd
+
+        with self._lock:
+            fd = self._fds.get(file_index)
+            if fd is None:
+                path = self.path(file_index)
+                flags = getattr(os, 'O_BINARY', 0)
+                if self.writable:
+                    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                    flags |= os.O_RDWR | os.O_CREAT
+                else:
+                    flags |= os.O_RDONLY
+                try:
+                    fd = os.open(path, flags, 0o644)
+                except FileNotFoundError:
+                    return None
+                self._fds[file_index] = fd
+
+        return fd
+
+    def readinto(self, piece: int, buffer, begin: int = 0,
+                 length: int = None) -> int:
+        """This method is designed to read a block of a piece into a
+        caller-supplied buffer so that the same buffer can be reused for
+        each piece.
+
+        Parameters
+        ----------
+        piece : int
+            The index of the piece.
+        buffer : bytearray or writable memoryview
+            The buffer the block is read into, at its start.
+        begin : int
+            The offset of the block within the piece.
+        length : int
+            The length of the block. Defaults to the rest of the piece.
+
+        Returns
+        -------
+        int
+            The number of bytes read. It is smaller than the block's length
+            if a file is missing or shorter than expected.
+        """
+        if length is None:
+            length = self.layout.piece_size(piece) - begin
+        # Validates the block.
+        self.layout.segments(piece, begin, length)
+
+        return self.readinto_at(
+            piece * self.layout.piece_length + begin,
+            [memoryview(buffer)[:length]]
+        )
+
+    def readinto_at(self, offset: int, buffers) -> int:
+        """This method is designed to read contiguous data, which may span
+        several pieces and files, into a list of buffers with a single
+        system call per file segment.
+
+        Parameters
+        ----------
+        offset : int
+            The offset of the data in the torrent's concatenated data.
+        buffers : list of bytearray or writable memoryview
+            The buffers the data is read into, in order. They are filled
+            entirely.
+
+        Returns
+        -------
+        int
+            The number of bytes read. It is smaller than the total length
+            of the buffers if a file is missing or shorter than expected.
+        """
+        views = [memoryview(b).cast('B') for b in buffers]
+        length = sum(len(view) for view in views)
+        read = 0
+
+        for segment in self.layout.segments_at(offset, length):
+            fd = self._fd(segment.file.index)
+            if fd is None:
+                break
+
+            n = _preadv(fd, _take(views, segment.length), segment.file_offset)
+            read += n
+            if n < segment.length:
+                break
+
+        return read
+
+    def read(self, piece: int, begin: int = 0, length: int = None) -> bytes:
+        """This method reads a block of a piece and returns it as a bytes
+        string. See FileStorage.readinto.
+        """
+        if length is None:
+            length = self.layout.piece_size(piece) - begin
+        buffer = bytearray(length)
+
+        return bytes(buffer[:self.readinto(piece, buffer, begin, length)])
+
+    def write(self, piece: int, data, begin: int = 0) -> int:
+        """This method writes a block of a piece. See FileStorage.write_at.
+        """
+        return self.write_at(
+            piece * self.layout.piece_length + begin, [data]
+        )
+
+    def write_at(self, offset: int, buffers) -> int:
+        """This method is designed to write contiguous data, which may
+        span several pieces and files, with a single system call per file
+        segment.
+
+        Parameters
+        ----------
+        offset : int
+            The offset of the data in the torrent's concatenated data.
+        buffers : list of bytes-like objects
+            The data, in order.
+
+        Returns
+        -------
+        int
+            The number of bytes written.
+
+        Raises
+        ------
+        OSError
+            An OSError is raised if the storage is not writable or if a
+            write fails.
+        """
+        views = [memoryview(b).cast('B') for b in buffers]
+        length = sum(len(view) for view in views)
+        written = 0
+
+        for segment in self.layout.segments_at(offset, length):
+            fd = self._fd(segment.file.index)
+            if fd is None:
+                raise FileNotFoundError(self.path(segment.file.index))
+
+            written += _pwritev(
+                fd, _take(views, segment.length), segment.file_offset
+            )
+
+        return written
+
+
+def _take(views, length):
+    """Removes the first length bytes of views, a list of memoryviews,
+    and returns them as a list of memoryviews.
+    """
+    taken = []
+    while length:
+        view = views[0]
+        if len(view) <= length:
+            taken.append(view)
+            length -= len(view)
+            views.pop(0)
+        else:
+            taken.append(view[:length])
+            views[0] = view[length:]
+            length = 0
+
+    return taken
+
+
+def _preadv(fd, views, offset):
+    """Reads into views from fd at offset until they are full or the end
+    of the file is reached, and returns the number of bytes read.
+    """
+    length = sum(len(view) for view in views)
+    read = 0
+    while read < length:
+        if hasattr(os, 'preadv'):
+            n = os.preadv(fd, views[:_IOV_MAX], offset + read)
+        else:
+            chunk = os.pread(fd, len(views[0]), offset + read)
+            n = len(chunk)
+            views[0][:n] = chunk
+        if n == 0:
+            break
+        read += n
+        if read < length:
+            views = _skip(views, n)
+
+    return read
+
+
+def _pwritev(fd, views, offset):
+    """Writes views to fd at offset, retrying partial writes, and returns
+    the number of bytes written.
+    """
+    length = sum(len(view) for view in views)
+    written = 0
+    while written < length:
+        if hasattr(os, 'pwritev'):
+            n = os.pwritev(fd, views[:_IOV_MAX], offset + written)
+        else:
+            n = os.pwrite(fd, b''.join(views), offset + written)
+        written += n
+        if written < length:
+            views = _skip(views, n)
+
+    return written
+
+
+def _skip(views, n):
+    """Returns views without their first n bytes."""
+    while n >= len(views[0]):
+        n -= len(views[0])
+        views = views[1:]
+
+    return [views[0][n:]] + views[1:]
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+from bittorrent.layout import FileLayout
+from bittorrent.storage import ALLOCATE_FULL, FileStorage
+
+
+class FileStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = bytes(range(256)) * 2
+        self.layout = FileLayout(
+            [('a', 100), (os.path.join('d', 'b'), 0),
+             (os.path.join('d', 'c'), 412)],
+            piece_length=64
+        )
+
+        os.mkdir(os.path.join(self.directory.name, 'd'))
+        for f in self.layout.files:
+            with open(os.path.join(self.directory.name, f.path), 'wb') as fp:
+                fp.write(self.data[f.offset:f.offset+f.length])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read(self):
+        with FileStorage(self.layout, self.directory.name) as storage:
+            for piece in range(self.layout.piece_count):
+                self.assertEqual(
+                    storage.read(piece), self.data[piece*64:(piece+1)*64]
+                )
+            self.assertEqual(storage.read(1, 30, 10), self.data[94:104])
+
+            buffer = bytearray(64)
+            self.assertEqual(storage.readinto(7, buffer), 64)
+            self.assertEqual(buffer, self.data[448:])
+
+    def test_missing_file(self):
+        os.remove(os.path.join(self.directory.name, 'd', 'c'))
+
+        with FileStorage(self.layout, self.directory.name) as storage:
+            self.assertEqual(storage.read(1), self.data[64:100])
+            self.assertEqual(storage.read(2), b'')
+
+    def test_allocate(self):
+        with open(os.path.join(self.directory.name, 'a'), 'wb') as f:
+            f.write(b'\x00' * 200)
+        os.remove(os.path.join(self.directory.name, 'd', 'c'))
+        os.remove(os.path.join(self.directory.name, 'd', 'b'))
+        os.rmdir(os.path.join(self.directory.name, 'd'))
+
+        storage = FileStorage(self.layout, self.directory.name)
+        self.assertEqual(storage.allocate(workers=2), [0, 1, 2])
+        self.assertEqual(storage.allocate(ALLOCATE_FULL), [])
+        os.remove(storage.path(2))
+        self.assertEqual(storage.allocate(ALLOCATE_FULL), [2])
+        for f in self.layout.files:
+            self.assertEqual(os.path.getsize(storage.path(f.index)), f.length)
+
+        layout = FileLayout([('e', 1 << 62)], piece_length=1 << 20)
+        with self.assertRaises(OSError):
+            FileStorage(layout, self.directory.name).allocate(ALLOCATE_FULL)
+        with self.assertRaises(ValueError):
+            storage.allocate('compact')
+
+    def test_unsafe_paths(self):
+        root = self.directory.name
+        directory = os.path.join(root, 'download')
+        os.mkdir(directory)
+        os.symlink(root, os.path.join(directory, 'link'))
+
+        for path in [os.path.join(os.pardir, 'escaped'),
+                     os.path.join('x', os.pardir, os.pardir, 'escaped'),
+                     os.path.join(root, 'escaped'),
+                     os.path.join('link', 'escaped'),
+                     'C:escaped', '']:
+            layout = FileLayout([('ok', 10), (path, 10)], piece_length=16)
+            storage = FileStorage(layout, directory, writable=True)
+            with self.assertRaises(ValueError, msg=path):
+                storage.allocate()
+            with self.assertRaises(ValueError, msg=path):
+                storage.write(1, b'\xff' * 4)
+            storage.close()
+
+            self.assertFalse(os.path.exists(os.path.join(root, 'escaped')))
+            self.assertFalse(os.path.exists(os.path.join(directory, 'ok')))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,10 @@
-import copy
 import hashlib
-import math
 import pprint
 
 import bittorrent.bencoding as bencoding
 from bittorrent import utils
+from bittorrent.layout import FileLayout
+from bittorrent.pieces import PieceHashes
 
 
 class Torrent(object):
@@ -32,6 +32,8 @@ class Torrent(object):
 
         self._info_hash = None
         self._announce_list = []
+        self._pieces = None
+        self._layout = None
 
     def __getitem__(self, item):
         if item not in self._meta_info:
@@ -43,37 +45,59 @@ class Torrent(object):
         return self.__str__()
 
     def __str__(self):
-        d = dict(copy.deepcopy(self._meta_info))
+        d = dict(self._meta_info)
         d[b'info'] = dict(d[b'info'])
-        d[b'info'][b'pieces'] = d[b'info'][b'pieces'][:30] + b' ...'
+        d[b'info'][b'pieces'] = bytes(d[b'info'][b'pieces'][:30]) + b' ...'
 
-        return pprint.pformat(d)
+        return pprint.pformat(_printable(d))
 
     @classmethod
-    def from_bytes(cls, torrent_contents: bytes) ->:
+    def from_bytes(cls, torrent_contents: bytes, zero_copy: bool = False,
+                   raw_info_hash: bool = True):
         """This method is designed to return a Torrent instance
         given a bytes string that corresponds to the contents of
         a .torrent file.
 
         Parameters
         ----------
-        torrent_contents : bytes
+        torrent_contents : bytes, bytearray, memoryview, or mmap.mmap
             A bytes string corresponding to the contents of .torrent
             file.
+        zero_copy : bool
+            If True, the metainformation's strings (e.g. the pieces) are
+            kept as memoryview slices of torrent_contents instead of being
+            copied. The torrent_contents buffer is kept alive as long as
+            the Torrent instance exists.
+        raw_info_hash : bool
+            If True, the default, the info hash is computed from the info
+            dictionary's bytes as they appear in torrent_contents, which
+            is the correct hash even if the info dictionary is not
+            canonically encoded. If False, the info hash is computed from
+            the re-encoded info dictionary.
 
         Returns
         -------
         Torrent
             A Torrent instance containing the .torrent data
         """
-        torrent_meta = bencoding.decode(torrent_contents)
+        decoder = bencoding.Decoder(
+            torrent_contents, zero_copy, record_spans=raw_info_hash
+        )
+        torrent_meta = decoder.decode()
 
         torrent = cls(torrent_meta)
 
+        if raw_info_hash:
+            start, end = decoder.spans[b'info']
+            torrent._info_hash = hashlib.sha1(
+                decoder._view[start:end]
+            ).digest()
+
         return torrent
 
     @classmethod
-    def from_path(cls, torrent_fpath: str) -> str:
+    def from_path(cls, torrent_fpath: str, raw_info_hash: bool = True,
+                  use_mmap: bool = False):
         """This method is designed to return a Torrent instance
         given the file path of a .torrent file.
 
@@ -82,6 +106,16 @@ class Torrent(object):
         torrent_fpath : str
             A string corresponding to the file path of a .torrent
             file.
+        raw_info_hash : bool
+            If True, the default, the info hash is computed from the info
+            dictionary's bytes as they appear in the file rather than from
+            the re-encoded info dictionary. See Torrent.from_bytes.
+        use_mmap : bool
+            If True, the file is memory mapped and decoded in zero copy
+            mode: the metainformation's strings are views of the mapped
+            file rather than copies on the heap. The map is closed once
+            the Torrent instance and the views obtained from it are
+            garbage collected.
 
         Returns
         -------
@@ -94,10 +128,14 @@ class Torrent(object):
             A FileNotFoundError is raised if the file path parameter
             is invalid.
         """
-        contents = utils.read(torrent_fpath)
-        torrent_meta = bencoding.decode(contents)
+        if use_mmap:
+            contents = utils.read_mmap(torrent_fpath)
+        else:
+            contents = utils.read(torrent_fpath)
 
-        torrent = cls(torrent_meta)
+        torrent = cls.from_bytes(
+            contents, zero_copy=use_mmap, raw_info_hash=raw_info_hash
+        )
         torrent._path = torrent_fpath
 
         return torrent
@@ -111,7 +149,7 @@ class Torrent(object):
                 item for sublist in self[b'announce-list'] for item in sublist
             ]
             self._announce_list = [
-                announce.decode() for announce in self._announce_list
+                str(announce, 'utf-8') for announce in self._announce_list
             ]
 
         return self._announce_list
@@ -119,16 +157,19 @@ class Torrent(object):
     @property
     def announce_url(self) -> str:
         """Returns the announce's URL as a UTF-8 encoded string."""
-        return self[b'announce'].decode('utf-8')
+        return str(self[b'announce'], 'utf-8')
 
     @property
     def created_by(self) -> str:
         """Returns the torrent's creator name if it exists."""
-        return self[b'created by'].decode()
+        return str(self[b'created by'], 'utf-8')
 
     @property
     def info_hash(self) -> bytes:
         """Returns the bencoded info dictionary's SHA1 hash as a bytes string.
+        If the torrent was created with the constructor, or with
+        raw_info_hash set to False, the hash is computed from the re-encoded
+        info dictionary.
         """
         if not self._info_hash:
             self._info_hash = hashlib.sha1(
@@ -157,7 +198,7 @@ class Torrent(object):
     @property
     def file_name(self) -> str:
         """Returns the torrent's name."""
-        return self[b'info'][b'name'].decode()
+        return str(self[b'info'][b'name'], 'utf-8')
 
     @property
     def piece_length(self) -> int:
@@ -165,24 +206,47 @@ class Torrent(object):
 
     @property
     def pieces_total_length(self) -> int:
-        if b'files' not in self[b'info']:
-            return self[b'info'][b'length']
-        total_length = 0
-        for file_ in self[b'info'][b'files']:
-            self.total_length += file_[b'length']
-        return total_length
+        """Returns the total length, in bytes, of the torrent's pieces,
+        that is the sum of the lengths of its files.
+        """
+        return self.file_size
 
     @property
-    def pieces(self) -> list:
-        """Returns the pieces as a list of 20-byte hash digests."""
-        n = 20
-        pieces = self[b'info'][b'pieces']
-        return [pieces[i:i+n] for i in range(0, len(pieces), n)]
+    def pieces(self) -> PieceHashes:
+        """Returns the pieces' 20-byte hash digests as a PieceHashes
+        sequence backed by the info dictionary's pieces string. The
+        sequence is built once and reused on every access.
+        """
+        if self._pieces is None:
+            self._pieces = PieceHashes(self[b'info'][b'pieces'])
+        return self._pieces
 
     @property
     def pieces_count(self) -> int:
         """Returns the number of pieces in the torrent file."""
-        return math.ceil(self.pieces_total_length / self.piece_length)
+        return -(-self.pieces_total_length // self.piece_length)
+
+    @property
+    def layout(self) -> FileLayout:
+        """Returns the FileLayout mapping the torrent's pieces to its
+        files. The layout is built once and reused on every access.
+        """
+        if self._layout is None:
+            self._layout = FileLayout.from_torrent(self)
+        return self._layout
+
+
+def _printable(value):
+    """Returns a copy of a decoded value in which memoryview slices are
+    replaced by bytes so that it may be pretty printed.
+    """
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    if isinstance(value, dict):
+        return {k: _printable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_printable(v) for v in value]
+    return value
 
 
 if __name__ == "__main__":
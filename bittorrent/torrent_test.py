@@ -0,0 +1,139 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+import bittorrent.bencoding as bencoding
+from bittorrent.torrent import Torrent
+
+
+class TorrentTest(unittest.TestCase):
+
+    def setUp(self):
+        single_file = {
+            b'announce': b'http://tracker.example.org/announce',
+            b'info': {
+                b'length': 1048576,
+                b'name': b'file.iso',
+                b'piece length': 262144,
+                b'pieces': hashlib.sha1(b'0').digest() * 4,
+            },
+        }
+        multi_file = {
+            b'announce': b'udp://tracker.example.org:6969/announce',
+            b'announce-list': [
+                [b'udp://tracker.example.org:6969/announce'],
+                [b'http://tracker.example.com/announce'],
+            ],
+            b'created by': b'bittorrent',
+            b'info': {
+                b'files': [
+                    {b'length': 100000, b'path': [b'dir', b'a.bin']},
+                    {b'length': 300000, b'path': [b'b.bin']},
+                ],
+                b'name': b'dir',
+                b'piece length': 65536,
+                b'pieces': b''.join(
+                    hashlib.sha1(bytes([i])).digest() for i in range(7)
+                ),
+                b'private': 1,
+            },
+        }
+        self.corpus = [
+            bencoding.encode(single_file), bencoding.encode(multi_file)
+        ]
+
+        # The info dictionary's keys are not sorted.
+        self.non_canonical_info = (
+            b'd4:name8:file.iso6:lengthi16e12:piece lengthi16e'
+            b'6:pieces20:' + b'\x01' * 20 + b'e'
+        )
+        self.non_canonical = (
+            b'd8:announce17:http://a/announce4:info'
+            + self.non_canonical_info + b'e'
+        )
+
+    def test_raw_info_hash(self):
+        for contents in self.corpus:
+            raw_torrent = Torrent.from_bytes(contents)
+            torrent = Torrent.from_bytes(contents, raw_info_hash=False)
+
+            # The corpus is canonically encoded.
+            self.assertEqual(torrent.info_hash, raw_torrent.info_hash)
+            self.assertEqual(len(raw_torrent.info_hash), 20)
+
+    def test_layout(self):
+        single_file, multi_file = (
+            Torrent.from_bytes(contents) for contents in self.corpus
+        )
+
+        self.assertEqual(single_file.pieces_total_length, 1048576)
+        self.assertEqual(single_file.pieces_count, 4)
+        self.assertEqual(multi_file.pieces_total_length, 400000)
+        self.assertEqual(multi_file.pieces_count, 7)
+        self.assertEqual(
+            [f.path for f in multi_file.layout.files],
+            [os.path.join('dir', 'dir', 'a.bin'), os.path.join('dir', 'b.bin')]
+        )
+        self.assertIs(multi_file.layout, multi_file.layout)
+
+    def test_counts_without_layout(self):
+        for name in (b'\xff\xfe.bin', b'..'):
+            torrent = Torrent.from_bytes(bencoding.encode({
+                b'announce': b'http://tracker.example.org/announce',
+                b'info': {
+                    b'length': 10,
+                    b'name': name,
+                    b'piece length': 4,
+                    b'pieces': b'\x01' * 60,
+                },
+            }))
+
+            self.assertEqual(torrent.file_size, 10)
+            self.assertEqual(torrent.pieces_total_length, 10)
+            self.assertEqual(torrent.pieces_count, 3)
+
+    def test_raw_info_hash_non_canonical(self):
+        info_hash = hashlib.sha1(self.non_canonical_info).digest()
+
+        self.assertEqual(Torrent.from_bytes(self.non_canonical).info_hash,
+                         info_hash)
+        self.assertEqual(
+            Torrent.from_bytes(
+                self.non_canonical, zero_copy=True, raw_info_hash=True
+            ).info_hash,
+            info_hash
+        )
+
+    def test_zero_copy(self):
+        for contents in self.corpus:
+            torrent = Torrent.from_bytes(contents)
+            zero_copy_torrent = Torrent.from_bytes(contents, zero_copy=True)
+
+            self.assertEqual(torrent.info_hash, zero_copy_torrent.info_hash)
+            self.assertEqual(torrent.pieces, zero_copy_torrent.pieces)
+            self.assertEqual(torrent.file_name, zero_copy_torrent.file_name)
+            self.assertEqual(
+                torrent.announce_list, zero_copy_torrent.announce_list
+            )
+            self.assertEqual(str(torrent), str(zero_copy_torrent))
+
+    def test_from_path(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.torrent')
+            with open(path, 'wb') as f:
+                f.write(self.corpus[1])
+
+            torrent = Torrent.from_path(path)
+            mapped_torrent = Torrent.from_path(
+                path, raw_info_hash=True, use_mmap=True
+            )
+
+            self.assertEqual(torrent.info_hash, mapped_torrent.info_hash)
+            self.assertEqual(torrent.pieces, mapped_torrent.pieces)
+            self.assertIsInstance(mapped_torrent.pieces[0], memoryview)
+            del mapped_torrent
+
+
+if __name__ == "__main__":
+    unittest.main()
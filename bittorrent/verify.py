@@ -0,0 +1,161 @@
+import collections
+import concurrent.futures
+import hashlib
+import os
+
+from bittorrent.pieces import PieceHashes
+from bittorrent.storage import FileStorage
+
+
+VerifyResult = collections.namedtuple(
+    'VerifyResult', ['valid', 'checked', 'cancelled']
+)
+VerifyResult.__doc__ = """The result of a verification.
+
+Attributes
+----------
+valid : list of bool
+    Whether each piece of the torrent matches its hash. Pieces that were
+    not checked are marked as invalid.
+checked : int
+    The number of pieces that were checked.
+cancelled : bool
+    Whether the verification was cancelled before all the requested
+    pieces were checked.
+"""
+
+
+class PieceVerifier(object):
+    """The PieceVerifier class is designed to check the data stored on
+    disk against the hashes of a torrent's pieces.
+
+    Pieces are read and hashed by a pool of threads: os.preadv and
+    hashlib.sha1 both release the GIL on large buffers, as such, several
+    pieces are hashed concurrently. The number of pieces in flight is
+    bounded by read_ahead and each of them is read into a buffer taken
+    from a pool of read_ahead reusable buffers.
+
+    Parameters
+    ----------
+    storage : FileStorage
+        The storage the pieces are read from.
+    pieces : PieceHashes
+        The expected hashes of the pieces.
+    workers : int
+        The number of threads. Defaults to the number of CPUs.
+    read_ahead : int
+        The maximum number of pieces read or hashed at once. Defaults to
+        twice the number of workers.
+    """
+
+    def __init__(self, storage: FileStorage, pieces: PieceHashes,
+                 workers: int = None, read_ahead: int = None):
+        if len(pieces) != storage.layout.piece_count:
+            raise ValueError(
+                'The number of piece hashes ({}) does not match the number '
+                'of pieces of the layout ({}).'.format(
+                    len(pieces), storage.layout.piece_count
+                )
+            )
+
+        self.storage = storage
+        self.pieces = pieces
+        self.workers = workers or os.cpu_count() or 1
+        self.read_ahead = max(read_ahead or 2 * self.workers, 1)
+
+    def verify_piece(self, piece: int, buffer: bytearray = None) -> bool:
+        """This method is designed to check a single piece.
+
+        Parameters
+        ----------
+        piece : int
+            The index of the piece.
+        buffer : bytearray
+            A buffer of at least the piece length the piece is read into.
+            A new buffer is allocated if None.
+
+        Returns
+        -------
+        bool
+            True if the piece is stored and matches its hash; False
+            otherwise.
+        """
+        size = self.storage.layout.piece_size(piece)
+        if buffer is None:
+            buffer = bytearray(size)
+
+        view = memoryview(buffer)[:size]
+        if self.storage.readinto(piece, view) != size:
+            return False
+
+        return self.pieces[piece] == hashlib.sha1(view).digest()
+
+    def verify(self, pieces=None, progress=None, cancel=None) -> VerifyResult:
+        """This method is designed to check several pieces, by default
+        all of them (a full recheck).
+
+        Parameters
+        ----------
+        pieces : iterable of int
+            The indices of the pieces to check. Defaults to all pieces.
+        progress : callable
+            Called in the calling thread as progress(piece, valid, checked,
+            total) after each piece is checked, in the order of pieces.
+        cancel : threading.Event
+            If set, no new piece is checked. The pieces in flight are
+            completed and the partial result is returned.
+
+        Returns
+        -------
+        VerifyResult
+            Whether each piece is valid and how many pieces were checked.
+        """
+        layout = self.storage.layout
+        if pieces is None:
+            pieces = range(layout.piece_count)
+        pieces = list(pieces)
+
+        valid = [False] * layout.piece_count
+        checked = 0
+        cancelled = False
+        buffers = [
+            bytearray(layout.piece_length)
+            for _ in range(min(self.read_ahead, len(pieces)))
+        ]
+        in_flight = collections.deque()
+
+        def complete():
+            nonlocal checked
+            piece, ok, buffer = in_flight.popleft().result()
+            buffers.append(buffer)
+            valid[piece] = ok
+            checked += 1
+            if progress is not None:
+                progress(piece, ok, checked, len(pieces))
+
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            try:
+                for piece in pieces:
+                    if not buffers:
+                        complete()
+                    if cancel is not None and cancel.is_set():
+                        cancelled = True
+                        break
+                    in_flight.append(
+                        pool.submit(self._check, piece, buffers.pop())
+                    )
+
+                while in_flight:
+                    complete()
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+        return VerifyResult(valid, checked, cancelled)
+
+    def _check(self, piece, buffer):
+        return piece, self.verify_piece(piece, buffer), buffer
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+
+from bittorrent.layout import FileLayout
+from bittorrent.pieces import PieceHashes
+from bittorrent.storage import FileStorage
+from bittorrent.verify import PieceVerifier
+
+
+class PieceVerifierTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        data = os.urandom(10000)
+        self.layout = FileLayout(
+            [('a', 3000), ('b', 0), ('c', 7000)], piece_length=1024
+        )
+        self.pieces = PieceHashes(b''.join(
+            hashlib.sha1(data[i:i+1024]).digest()
+            for i in range(0, len(data), 1024)
+        ))
+
+        for f in self.layout.files:
+            with open(os.path.join(self.directory.name, f.path), 'wb') as fp:
+                fp.write(data[f.offset:f.offset+f.length])
+
+        self.storage = FileStorage(self.layout, self.directory.name)
+
+    def tearDown(self):
+        self.storage.close()
+        self.directory.cleanup()
+
+    def test_verify(self):
+        verifier = PieceVerifier(self.storage, self.pieces, 4, read_ahead=3)
+        events = []
+
+        result = verifier.verify(
+            progress=lambda *args: events.append(args)
+        )
+        self.assertEqual(result.valid, [True] * 10)
+        self.assertEqual(result.checked, 10)
+        self.assertFalse(result.cancelled)
+        self.assertEqual(
+            events, [(i, True, i + 1, 10) for i in range(10)]
+        )
+
+    def test_corrupted(self):
+        with open(os.path.join(self.directory.name, 'c'), 'r+b') as f:
+            f.seek(5000)
+            f.write(b'\x00' * 8)
+        with open(os.path.join(self.directory.name, 'a'), 'r+b') as f:
+            f.truncate(2500)
+
+        verifier = PieceVerifier(self.storage, self.pieces, 2)
+
+        valid = [True] * 10
+        valid[2] = valid[7] = False
+        self.assertEqual(verifier.verify().valid, valid)
+        self.assertFalse(verifier.verify_piece(7))
+        self.assertTrue(verifier.verify_piece(9))
+        self.assertEqual(
+            verifier.verify([7, 8]).valid, [False] * 8 + [True, False]
+        )
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        verifier = PieceVerifier(self.storage, self.pieces, 2, read_ahead=1)
+
+        def progress(piece, valid, checked, total):
+            if checked == 4:
+                cancel.set()
+
+        result = verifier.verify(progress=progress, cancel=cancel)
+        self.assertTrue(result.cancelled)
+        self.assertEqual(result.checked, 4)
+        self.assertEqual(result.valid, [True] * 4 + [False] * 6)
+
+
+if __name__ == "__main__":
+    unittest.main()